@@ -0,0 +1,126 @@
+"""
+Measures bulk insert and scan throughput and point-lookup latency for each driver profile against
+a local server. Every run uses the same deterministic rows and a scratch table (or collection)
+named bench_profiles, which is dropped afterwards.
+
+Connection settings come from the environment (defaults in brackets):
+    postgres: BENCH_PG_HOST [localhost] BENCH_PG_PORT [5432] BENCH_PG_USER [postgres]
+              BENCH_PG_PASSWORD [postgres] BENCH_PG_DATABASE [postgres]
+    mssql:    BENCH_MSSQL_HOST [localhost] BENCH_MSSQL_PORT [1433] BENCH_MSSQL_USER [sa]
+              BENCH_MSSQL_PASSWORD [] BENCH_MSSQL_DATABASE [master]
+              BENCH_MSSQL_DRIVER [ODBC Driver 18 for SQL Server]
+    mongodb:  BENCH_MONGO_HOST [localhost] BENCH_MONGO_PORT [27017] BENCH_MONGO_DATABASE [bench]
+
+Run from the repository root:
+    python -m MultiDBLib.benchmarks.bench_profiles postgres|mssql|mongodb [rows] [lookups]
+
+No results are checked in: they depend on the server, network and hardware, so record them together
+with that environment. On PostgreSQL, 'bulk-load' and 'analytics' only set application_name and
+keepalives and are expected to measure the same as the default (see the notes in profiles.py).
+"""
+import logging
+import os
+import sys
+import time
+
+from MultiDBLib.src.databaseconnector.profiles import PROFILES
+
+TABLE = 'bench_profiles'
+
+
+def env(name, default):
+    return os.environ.get(name, default)
+
+
+def make_client(backend, profile):
+    if backend == 'postgres':
+        from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+        return PostgresClient(env('BENCH_PG_HOST', 'localhost'), int(env('BENCH_PG_PORT', '5432')),
+                              env('BENCH_PG_USER', 'postgres'), env('BENCH_PG_PASSWORD', 'postgres'),
+                              env('BENCH_PG_DATABASE', 'postgres'), profile=profile)
+    if backend == 'mssql':
+        from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+        return MSSQLClient(env('BENCH_MSSQL_HOST', 'localhost'), int(env('BENCH_MSSQL_PORT', '1433')),
+                           env('BENCH_MSSQL_USER', 'sa'), env('BENCH_MSSQL_PASSWORD', ''),
+                           env('BENCH_MSSQL_DATABASE', 'master'),
+                           env('BENCH_MSSQL_DRIVER', 'ODBC Driver 18 for SQL Server'), profile=profile)
+    from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+    return MongoDBClient(env('BENCH_MONGO_HOST', 'localhost'), int(env('BENCH_MONGO_PORT', '27017')),
+                         env('BENCH_MONGO_DATABASE', 'bench'), TABLE, profile=profile)
+
+
+def synthetic_rows(n_rows):
+    """Yields deterministic rows of an int key, a short text, a float and a 200-character payload."""
+    for i in range(n_rows):
+        yield i, f"name-{i % 997}", float(i) * 0.5, ('x' * 190) + f"{i:010d}"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_sql(client, n_rows, n_lookups):
+    ph = client.placeholder
+    text = 'TEXT' if ph == '%s' else 'NVARCHAR(MAX)'
+    client.update_data(f"DROP TABLE IF EXISTS {TABLE}")
+    client.update_data(f"CREATE TABLE {TABLE} (id INT PRIMARY KEY, name {text}, score FLOAT, payload {text})")
+    try:
+        start = time.perf_counter()
+        client.insert_many(f"INSERT INTO {TABLE} VALUES ({ph}, {ph}, {ph}, {ph})", synthetic_rows(n_rows),
+                           batch_size=5000)
+        insert = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = sum(len(batch) for batch in client.iter_data(f"SELECT * FROM {TABLE}", batch_size=5000))
+        scan = time.perf_counter() - start
+        latencies = []
+        for i in range(n_lookups):
+            start = time.perf_counter()
+            client.fetch_data(f"SELECT * FROM {TABLE} WHERE id = {ph}", ((i * 7919) % n_rows,))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        client.update_data(f"DROP TABLE {TABLE}")
+    return insert, scan, scanned, latencies
+
+
+def run_mongo(client, n_rows, n_lookups):
+    client.collection.drop()
+    try:
+        documents = ({'_id': i, 'name': name, 'score': score, 'payload': payload}
+                     for i, name, score, payload in synthetic_rows(n_rows))
+        start = time.perf_counter()
+        client.insert_many(documents, batch_size=5000)
+        insert = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = len(client.fetch_data({}))
+        scan = time.perf_counter() - start
+        latencies = []
+        for i in range(n_lookups):
+            start = time.perf_counter()
+            client.fetch_data({'_id': (i * 7919) % n_rows})
+            latencies.append(time.perf_counter() - start)
+    finally:
+        client.collection.drop()
+    return insert, scan, scanned, latencies
+
+
+def main(backend, n_rows=100000, n_lookups=1000):
+    logging.getLogger().setLevel(env('BENCH_LOG_LEVEL', 'WARNING'))
+    print(f"{backend}: {n_rows} rows, {n_lookups} point lookups")
+    print(f"{'profile':<18} {'insert rows/s':>14} {'scan rows/s':>14} {'p50 ms':>9} {'p99 ms':>9}")
+    for profile in [None] + sorted(PROFILES):
+        client = make_client(backend, profile)
+        client.connect()
+        try:
+            run = run_mongo if backend == 'mongodb' else run_sql
+            insert, scan, scanned, latencies = run(client, n_rows, n_lookups)
+        finally:
+            client.close()
+        print(f"{profile or 'default':<18} {n_rows / insert:>14,.0f} {scanned / scan:>14,.0f} "
+              f"{percentile(latencies, 0.5) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('postgres', 'mssql', 'mongodb'):
+        sys.exit(__doc__)
+    main(sys.argv[1], *(int(arg) for arg in sys.argv[2:4]))
@@ -0,0 +1,46 @@
+"""
+Measures memory and build time of each fetch_data row representation on a synthetic result set.
+Memory covers the rows and their values; time covers only the conversion from driver tuples.
+
+Run from the repository root:
+    python -m MultiDBLib.benchmarks.bench_row_factories [rows] [columns]
+"""
+import sys
+import time
+import tracemalloc
+
+from MultiDBLib.src.databaseconnector.rows import build_rows
+
+
+def synthetic_rows(n_rows, n_columns):
+    """Yields freshly allocated rows, standing in for rows decoded by the driver."""
+    for r in range(n_rows):
+        yield tuple((r * n_columns + c) if c % 2 == 0 else float(r + c) for c in range(n_columns))
+
+
+def measure(label, build, n_rows, n_columns):
+    source = list(synthetic_rows(n_rows, n_columns))
+    start = time.perf_counter()
+    build(iter(source))
+    elapsed = time.perf_counter() - start
+    del source
+    tracemalloc.start()
+    result = build(synthetic_rows(n_rows, n_columns))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} {current / 2 ** 20:>9.1f} MiB {peak / 2 ** 20:>9.1f} MiB {elapsed * 1000:>9.1f} ms")
+    return result
+
+
+def main(n_rows=100000, n_columns=20):
+    fields = tuple(f"col_{i}" for i in range(n_columns))
+    print(f"{n_rows} rows x {n_columns} columns, half int and half float")
+    print(f"{'factory':<8} {'retained':>13} {'peak':>13} {'time':>12}")
+    measure('dict', lambda rows: [dict(zip(fields, row)) for row in rows], n_rows, n_columns)
+    measure('tuple', lambda rows: build_rows(fields, list(rows), 'tuple'), n_rows, n_columns)
+    measure('record', lambda rows: build_rows(fields, list(rows), 'record'), n_rows, n_columns)
+    measure('columns', lambda rows: build_rows(fields, list(rows), 'columns'), n_rows, n_columns)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
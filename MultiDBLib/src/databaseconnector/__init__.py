@@ -2,3 +2,25 @@ from .mongodb_client import MongoDBClient
 from .postgres_client import PostgresClient
 from .mssql_client import MSSQLClient
 from .dbconnect import DBConnect
+from .partitioned import PartitionedReader
+from .rows import ColumnarResult, record_type
+from .subscriptions import ChangeEvent
+from .batch import Batch
+from .blobs import ChunkedBlobReader
+from .registry import ClientRegistry, shared_registry
+from .admission import Bulkhead, AsyncBulkhead, CircuitBreaker
+from .workload import WorkloadRecorder, WorkloadReplayer
+from .metadata import MetadataCache, TableMetadata, shared_metadata_cache
+from .index_advisor import QueryShapeTracker
+from .export import RollingFileWriter, export_batches
+from .mutations import ChunkedMutationRunner, LatencyThrottle, ReplicaLagThrottle
+from .hedging import HedgedReads
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .joins import HashJoin, LookupJoin
+from .snapshot import Snapshot, SnapshotPublisher, write_snapshot
+from .tenancy import TenantRouter
+from .diff import TableDiff
+from .autotune import BatchSizeTuner
+from .profiles import PROFILES, resolve_options
+from .sqlite_client import SQLiteClient
+from .mirror import TableMirror
@@ -0,0 +1,240 @@
+from collections import deque
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+from .exceptions import AdmissionError, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class Bulkhead:
+    """
+    Limits the number of concurrent calls to one backend. Callers beyond ``max_concurrent`` wait in a
+    queue of at most ``max_queue`` for up to ``timeout`` seconds; anything beyond that is shed immediately
+    with AdmissionError.
+    """
+
+    def __init__(self, max_concurrent, max_queue=0, timeout=None, name='bulkhead'):
+        """
+        :param max_concurrent: int, the maximum number of calls running at once.
+        :param max_queue: int, the maximum number of callers waiting for a slot.
+        :param timeout: float or None, seconds a caller waits for a slot (None waits indefinitely).
+        :param name: str, used in error messages and logs.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.name = name
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    def acquire(self):
+        """
+        Takes a slot, waiting in the queue if necessary.
+        Raises AdmissionError if the queue is full or the wait times out.
+        """
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionError(f"{self.name}: queue is full ({self.max_queue} waiting)")
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise AdmissionError(f"{self.name}: timed out after {self.timeout}s waiting for a slot")
+
+    def release(self):
+        """Returns a slot taken with acquire()."""
+        self._slots.release()
+
+    @property
+    def waiting(self):
+        """int, the number of callers currently queued."""
+        return self._waiting
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs ``func`` while holding a slot.
+        :return: the result of ``func``.
+        """
+        with self:
+            return func(*args, **kwargs)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class AsyncBulkhead:
+    """
+    asyncio variant of Bulkhead. Blocking functions are run in the event loop's default executor
+    while holding a slot; coroutine functions are awaited directly.
+    """
+
+    def __init__(self, max_concurrent, max_queue=0, timeout=None, name='bulkhead'):
+        """
+        :param max_concurrent: int, the maximum number of calls running at once.
+        :param max_queue: int, the maximum number of callers waiting for a slot.
+        :param timeout: float or None, seconds a caller waits for a slot (None waits indefinitely).
+        :param name: str, used in error messages and logs.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.name = name
+        self.rejected = 0
+        self._slots = None
+        self._waiting = 0
+
+    async def acquire(self):
+        """
+        Takes a slot, waiting in the queue if necessary.
+        Raises AdmissionError if the queue is full or the wait times out.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        if self._waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionError(f"{self.name}: queue is full ({self.max_queue} waiting)")
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionError(f"{self.name}: timed out after {self.timeout}s waiting for a slot")
+        finally:
+            self._waiting -= 1
+
+    def release(self):
+        """Returns a slot taken with acquire()."""
+        self._slots.release()
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Runs ``func`` while holding a slot.
+        :return: the result of ``func``.
+        """
+        await self.acquire()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+        finally:
+            self.release()
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a backend is unhealthy. The breaker opens when, over the last ``window``
+    calls, the share of errors reaches ``failure_rate`` or the share of calls slower than
+    ``slow_call_duration`` reaches ``slow_call_rate``. After ``reset_timeout`` seconds one trial call is
+    let through; its outcome closes the breaker or opens it again. Thread-safe and usable from asyncio code.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate=0.5, slow_call_duration=None, slow_call_rate=0.5, window=20,
+                 min_calls=10, reset_timeout=30.0, name='circuit', clock=time.monotonic):
+        """
+        :param failure_rate: float, the share of failed calls that opens the breaker.
+        :param slow_call_duration: float or None, seconds after which a call counts as slow.
+        :param slow_call_rate: float, the share of slow calls that opens the breaker.
+        :param window: int, the number of recent calls considered.
+        :param min_calls: int, the number of calls required before the breaker can open.
+        :param reset_timeout: float, seconds the breaker stays open before a trial call.
+        :param name: str, used in error messages and logs.
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = self.CLOSED
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Checks whether a call may proceed.
+        Raises CircuitOpenError while the breaker is open or a trial call is already running.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name}: circuit is open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError(f"{self.name}: circuit is half-open, trial call in progress")
+                self._trial_running = True
+
+    def record(self, succeeded, duration):
+        """
+        Records the outcome of a call admitted by allow().
+
+        :param succeeded: bool, whether the call completed without an error.
+        :param duration: float, how long the call took in seconds.
+        """
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_running = False
+                if succeeded and not slow:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"{self.name}: circuit closed")
+                else:
+                    self._open()
+                return
+            self._outcomes.append((not succeeded, slow))
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._outcomes if failed) / len(self._outcomes)
+                slow_calls = sum(1 for _, was_slow in self._outcomes if was_slow) / len(self._outcomes)
+                if failures >= self.failure_rate or (self.slow_call_duration is not None and slow_calls >= self.slow_call_rate):
+                    self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        logger.warning(f"{self.name}: circuit opened")
+
+    def call(self, func, *args, **kwargs):
+        """
+        Runs ``func`` if the breaker allows it and records the outcome.
+        :return: the result of ``func``.
+        """
+        self.allow()
+        start = self._clock()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False, self._clock() - start)
+            raise
+        self.record(True, self._clock() - start)
+        return result
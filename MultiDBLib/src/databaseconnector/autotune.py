@@ -0,0 +1,131 @@
+from itertools import islice
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BatchSizeTuner:
+    """
+    Learns a batch size per table, collection or query with additive-increase/multiplicative-decrease.
+    While batches finish within ``target_latency`` and throughput (rows per second) keeps up, the size
+    grows by ``step``; a slow or failed batch halves it, and a throughput drop of more than
+    ``tolerance`` steps it back. Sizes stay within [min_size, max_size], where ``max_size`` bounds
+    the rows held in memory per batch. Learned sizes can be persisted to a JSON file and are
+    loaded again on the next run.
+    """
+
+    def __init__(self, initial=1000, min_size=100, max_size=50000, step=None, decrease=0.5, target_latency=1.0,
+                 tolerance=0.1, state_path=None, save_every=20):
+        """
+        :param initial: int, the batch size for keys without a learned size.
+        :param min_size: int, the smallest batch size.
+        :param max_size: int, the largest batch size (the memory bound).
+        :param step: int or None, the additive increase (defaults to half of ``initial``).
+        :param decrease: float, the factor applied after a slow or failed batch.
+        :param target_latency: float, the slowest acceptable batch in seconds (the lock/timeout bound).
+        :param tolerance: float, the relative throughput drop tolerated before stepping back.
+        :param state_path: str or None, a JSON file the learned sizes are loaded from and saved to.
+        :param save_every: int, save the state after this many adjustments.
+        """
+        self.initial = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step or max(1, initial // 2)
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.state_path = state_path
+        self.save_every = save_every
+        self._states = {}
+        self._updates = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as state:
+                for key, size in json.load(state).items():
+                    self._states[key] = {'size': self._bounded(size), 'throughput': None}
+
+    def _bounded(self, size):
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def size(self, key):
+        """
+        :param key: str, the table, collection or query.
+        :return: int, the batch size to use next.
+        """
+        with self._lock:
+            state = self._states.get(key)
+            return state['size'] if state else self._bounded(self.initial)
+
+    def record(self, key, rows, duration, error=False):
+        """
+        Adjusts the batch size after a batch.
+
+        :param key: str, the table, collection or query.
+        :param rows: int, the rows in the batch.
+        :param duration: float, the batch duration in seconds.
+        :param error: bool, True if the batch failed (e.g. a lock timeout).
+        :return: int, the new batch size.
+        """
+        with self._lock:
+            state = self._states.setdefault(key, {'size': self._bounded(self.initial), 'throughput': None})
+            size = state['size']
+            if error or duration > self.target_latency:
+                size = self._bounded(size * self.decrease)
+                state['throughput'] = None
+            elif rows >= size:
+                throughput = rows / duration if duration > 0 else float('inf')
+                previous = state['throughput']
+                if previous is not None and throughput < previous * (1 - self.tolerance):
+                    size = self._bounded(size - self.step)
+                else:
+                    size = self._bounded(size + self.step)
+                state['throughput'] = throughput
+            if size != state['size']:
+                logger.debug(f"Batch size for {key}: {state['size']} -> {size}")
+            state['size'] = size
+            self._updates += 1
+            save = self.state_path and self._updates % self.save_every == 0
+        if save:
+            self.save()
+        return size
+
+    def save(self):
+        """Writes the learned sizes to ``state_path``."""
+        if not self.state_path:
+            return
+        # One save at a time, so an older copy of the sizes never replaces a newer one.
+        with self._save_lock:
+            with self._lock:
+                sizes = {key: state['size'] for key, state in self._states.items()}
+            descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(self.state_path) + '.',
+                                                     suffix='.tmp', dir=os.path.dirname(self.state_path) or '.')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as state:
+                    json.dump(sizes, state, indent=1, sort_keys=True)
+                os.replace(temporary, self.state_path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+
+
+def batches(rows, batch_size, tuner=None, key=None):
+    """
+    Cuts an iterable into lists, asking the tuner for the size of every batch.
+
+    :param rows: iterable, the rows or documents.
+    :param batch_size: int, the size used without a tuner.
+    :param tuner: BatchSizeTuner or None.
+    :param key: str, the tuner key.
+    :return: generator of list.
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, tuner.size(key) if tuner is not None else batch_size))
+        if not batch:
+            return
+        yield batch
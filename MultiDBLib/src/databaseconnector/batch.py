@@ -0,0 +1,79 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+# Data-modifying statements inside a WITH query; UPDATE preceded by FOR is a row lock in a read.
+_WRITE_KEYWORD = re.compile(r'\b(INSERT|DELETE|MERGE)\b|(?<!\bFOR )\bUPDATE\b', re.IGNORECASE)
+
+
+def is_read_statement(query):
+    """
+    Returns True for statements that only read (SELECT, or WITH ... SELECT without data-modifying parts).
+
+    :param query: str, the SQL statement.
+    :return: bool
+    """
+    if not query.strip():
+        return False
+    first = query.lstrip().split(None, 1)[0].upper()
+    if first == 'WITH':
+        return not _WRITE_KEYWORD.search(query)
+    return first == 'SELECT'
+
+
+class Batch:
+    """
+    Collects independent statements and runs them as one unit through the client's execute_batch().
+    SQL Server sends them in a single round trip; PostgreSQL runs them one after another in one
+    transaction (a round trip each, as psycopg2 has no pipeline mode), and MongoDB one by one.
+    Results are returned positionally: the fetched rows for reads, the affected row count for writes.
+
+    Usage::
+
+        with db.batch() as batch:
+            batch.add("SELECT * FROM users WHERE id = %s", (1,))
+            batch.add("SELECT count(*) FROM orders")
+        users, order_count = batch.results
+    """
+
+    def __init__(self, db):
+        """
+        :param db: Database, the client that executes the batch.
+        """
+        self.db = db
+        self.statements = []
+        self.results = None
+
+    def add(self, query, params=None):
+        """
+        Adds a statement to the batch.
+
+        :param query: str or dict, the statement (or MongoDB filter) to run.
+        :param params: tuple or None, parameters for the statement.
+        :return: int, the position of the statement's result.
+        """
+        self.statements.append((query, params))
+        return len(self.statements) - 1
+
+    def execute(self):
+        """
+        Sends all collected statements and clears the batch.
+
+        :return: list, one result per statement in the order they were added.
+        """
+        statements, self.statements = self.statements, []
+        self.results = self.db.execute_batch(statements) if statements else []
+        logger.info(f"Executed a batch of {len(statements)} statements.")
+        return self.results
+
+    def __len__(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
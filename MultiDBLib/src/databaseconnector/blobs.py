@@ -0,0 +1,105 @@
+import io
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ChunkedBlobReader(io.RawIOBase):
+    """
+    Read-only, seekable stream over a large column value that is fetched from the server in chunks.
+    Use ``readinto()`` with a caller-owned buffer or ``iter_chunks()`` to process the value without
+    holding it in memory; wrap it in ``io.BufferedReader`` or pass it to ``shutil.copyfileobj`` as needed.
+    """
+
+    def __init__(self, read_chunk, length, chunk_size=DEFAULT_CHUNK_SIZE, on_close=None):
+        """
+        :param read_chunk: callable, ``read_chunk(offset, size)`` returns up to ``size`` bytes starting at the 0-based ``offset``.
+        :param length: int, the total size of the value in bytes.
+        :param chunk_size: int, the chunk size used by ``iter_chunks()``.
+        :param on_close: callable or None, called once when the reader is closed.
+        """
+        super().__init__()
+        self._read_chunk = read_chunk
+        self.length = length
+        self.chunk_size = chunk_size
+        self._position = 0
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.length
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        """
+        Reads the next chunk directly into ``buffer``.
+
+        :param buffer: bytearray or writable memoryview, the destination.
+        :return: int, the number of bytes written to ``buffer``; 0 at the end of the value.
+        """
+        view = memoryview(buffer).cast('B')
+        size = min(len(view), self.length - self._position)
+        if size <= 0:
+            return 0
+        chunk = self._read_chunk(self._position, size)
+        read = len(chunk)
+        view[:read] = chunk
+        self._position += read
+        return read
+
+    def iter_chunks(self, buffer=None):
+        """
+        Yields the remaining value chunk by chunk, reusing one buffer.
+        Each yielded memoryview is only valid until the next iteration.
+
+        :param buffer: bytearray or None, the buffer to reuse (defaults to one of ``chunk_size`` bytes).
+        :return: generator of memoryview
+        """
+        buffer = buffer if buffer is not None else bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        while True:
+            read = self.readinto(view)
+            if not read:
+                break
+            yield view[:read]
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+
+def copy_in_chunks(source, write_chunk, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a file-like source to ``write_chunk`` using one reusable buffer.
+
+    :param source: a binary file-like object supporting ``readinto()`` or ``read()``.
+    :param write_chunk: callable, ``write_chunk(offset, chunk)`` stores a memoryview chunk at the 0-based offset.
+    :param chunk_size: int, the size of each chunk.
+    :return: int, the total number of bytes written.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    offset = 0
+    while True:
+        if hasattr(source, 'readinto'):
+            read = source.readinto(view)
+        else:
+            data = source.read(chunk_size)
+            read = len(data)
+            view[:read] = data
+        if not read:
+            return offset
+        write_chunk(offset, view[:read])
+        offset += read
@@ -0,0 +1,37 @@
+import re
+
+_QUERY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_MSSQL_ESTIMATE = re.compile(r'StatementEstRows="([0-9.Ee+-]+)"')
+
+
+def is_query(target):
+    """
+    Returns True when a count target is a query rather than a table name.
+
+    :param target: str, a table name or a SELECT/WITH query.
+    :return: bool
+    """
+    return bool(_QUERY.match(target))
+
+
+def counted_source(target, filter=None):
+    """
+    Builds the FROM ... WHERE part of a count over a table or a query.
+
+    :param target: str, a table name or a SELECT/WITH query.
+    :param filter: str or None, a SQL predicate.
+    :return: str
+    """
+    source = f"({target.strip().rstrip(';')}) AS counted" if is_query(target) else target
+    return f"{source} WHERE {filter}" if filter else source
+
+
+def mssql_estimated_rows(showplan_xml):
+    """
+    Reads the optimizer's row estimate from SHOWPLAN_XML output.
+
+    :param showplan_xml: str, the estimated plan.
+    :return: int or None
+    """
+    match = _MSSQL_ESTIMATE.search(showplan_xml or '')
+    return int(round(float(match.group(1)))) if match else None
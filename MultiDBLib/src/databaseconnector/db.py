@@ -35,4 +35,37 @@ class Database(ABC):
 
     @abstractmethod
     def delete_all_data(self):
-        pass
\ No newline at end of file
+        pass
+
+    def subscribe(self, *args, **kwargs):
+        """
+        Yield change events (see subscriptions.ChangeEvent) as they happen.
+        Optional; backends without change notification support raise NotImplementedError.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support subscriptions")
+
+    def count(self, target, filter=None, approximate=False):
+        """
+        Count rows or documents on the server. With approximate=True backends may answer from
+        catalog or planner statistics instead of scanning.
+        Optional; backends without server-side counting raise NotImplementedError.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support count")
+
+    def execute_batch(self, statements):
+        """
+        Run several independent statements and return their results positionally.
+        The default runs them one by one through fetch_data(); SQL clients override it
+        to run the batch in one transaction (SQL Server also in a single round trip).
+        """
+        return [self.fetch_data(query) if params is None else self.fetch_data(query, params)
+                for query, params in statements]
+
+    def cancel(self, thread=None):
+        """
+        Cancel the statement currently running on this client, e.g. the losing side of a hedged read.
+        ``thread`` is the threading.get_ident() of the call to cancel, for clients that run several
+        statements at once; None cancels whatever is running.
+        Optional; the default does nothing and returns False.
+        """
+        return False
@@ -1,9 +1,60 @@
+import asyncio
+import functools
+import time
 from .db import Database
+from .subscriptions import aiter_events
+from .batch import Batch
+from .singleflight import request_key
 class DBConnect:
-    def __init__(self, db):
+    def __init__(self, db, bulkhead=None, circuit_breaker=None, async_bulkhead=None, recorder=None, hedging=None,
+                 single_flight=None, async_single_flight=None):
+        """
+        param: db: Database, the client to run operations against.
+        param: bulkhead: Bulkhead or None, limits concurrent operations on this backend.
+        param: circuit_breaker: CircuitBreaker or None, fails operations fast while this backend is unhealthy.
+        param: async_bulkhead: AsyncBulkhead or None, limits concurrent async operations (afetch_data).
+        param: recorder: WorkloadRecorder or None, captures operations for later replay.
+        param: hedging: HedgedReads or None, re-issues slow fetch_data() calls to a replica.
+        param: single_flight: SingleFlight or None, runs identical concurrent fetch_data() calls once.
+        param: async_single_flight: AsyncSingleFlight or None, runs identical concurrent afetch_data() calls once.
+        """
         if not isinstance(db, Database):
             raise ValueError("db must be an instance of a class that implements the DatabaseClient interface")
         self.db = db
+        self.bulkhead = bulkhead
+        self.circuit_breaker = circuit_breaker
+        self.async_bulkhead = async_bulkhead
+        self.recorder = recorder
+        self.hedging = hedging
+        self.single_flight = single_flight
+        self.async_single_flight = async_single_flight
+
+    def _call(self, operation, *args, **kwargs):
+        if self.bulkhead is None:
+            return self._guarded(operation, *args, **kwargs)
+        with self.bulkhead:
+            return self._guarded(operation, *args, **kwargs)
+
+    def _guarded(self, operation, *args, **kwargs):
+        func = getattr(self.db, operation)
+        if self.recorder is not None:
+            return self._recorded(operation, func, *args, **kwargs)
+        if self.circuit_breaker is None:
+            return func(*args, **kwargs)
+        return self.circuit_breaker.call(func, *args, **kwargs)
+
+    def _recorded(self, operation, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            if self.circuit_breaker is None:
+                result = func(*args, **kwargs)
+            else:
+                result = self.circuit_breaker.call(func, *args, **kwargs)
+        except Exception as e:
+            self.recorder.record(operation, args, time.perf_counter() - start, e)
+            raise
+        self.recorder.record(operation, args, time.perf_counter() - start)
+        return result
 
     def connect(self):
         """
@@ -23,16 +74,69 @@ class DBConnect:
         param: data: dict, the data to insert.
         return: int, the number of rows inserted.
         """
-        return self.db.insert_data(data)
+        return self._call('insert_data', data)
 
-    def fetch_data(self, query):
+    def fetch_data(self, query, params=None, row_factory=None):
         """
         Fetch data from the database.
         param: query: str, query criteria.
+        param: params: tuple, query parameters (SQL clients only).
+        param: row_factory: str or callable, the row representation ('tuple', 'record' or 'columns').
+        return: list, the fetched rows.
+        """
+        args, kwargs = self._fetch_args(query, params, row_factory)
+        if self.single_flight is not None:
+            return self.single_flight.do(request_key(query, params, row_factory), self._fetch, *args, **kwargs)
+        return self._fetch(*args, **kwargs)
+
+    def _fetch(self, *args, **kwargs):
+        if self.hedging is not None:
+            return self.hedging.fetch(self.db, functools.partial(self._call, 'fetch_data'), *args, **kwargs)
+        return self._call('fetch_data', *args, **kwargs)
+
+    async def afetch_data(self, query, params=None, row_factory=None):
+        """
+        Async variant of fetch_data(). The blocking fetch runs in the event loop's default executor,
+        limited by async_bulkhead when one is configured.
         return: list, the fetched rows.
         """
-        return self.db.fetch_data(query)
+        args, kwargs = self._fetch_args(query, params, row_factory)
+        if self.async_single_flight is not None:
+            return await self.async_single_flight.do(request_key(query, params, row_factory),
+                                                     functools.partial(self._afetch, args, kwargs))
+        return await self._afetch(args, kwargs)
+
+    async def _afetch(self, args, kwargs):
+        func = functools.partial(self._guarded, 'fetch_data', *args, **kwargs)
+        if self.async_bulkhead is not None:
+            return await self.async_bulkhead.call(func)
+        return await asyncio.get_event_loop().run_in_executor(None, func)
+
+    @staticmethod
+    def _fetch_args(query, params, row_factory):
+        args = (query,) if params is None else (query, params)
+        return args, ({} if row_factory is None else {'row_factory': row_factory})
     
+    def count(self, target, filter=None, approximate=False, params=None):
+        """
+        Count rows on the server instead of fetching them.
+        param: target: str, a table name or query (SQL) or a collection name (MongoDB, None for the default).
+        param: filter: str or dict, a SQL predicate or MongoDB filter.
+        param: approximate: bool, answer from statistics (fast, may be stale).
+        param: params: tuple, parameters for a SQL target or filter.
+        return: int, the number of rows.
+        """
+        kwargs = {} if params is None else {'params': params}
+        return self._call('count', target, filter, approximate, **kwargs)
+
+    def batch(self):
+        """
+        Start a batch of independent statements run as one unit (a single round trip on SQL Server,
+        sequentially in one transaction on PostgreSQL).
+        return: Batch, add statements with add() and run them with execute() or by leaving the with block.
+        """
+        return Batch(self.db)
+
     def update_data(self, query, data=None):
         """
         Update data in the database.
@@ -40,7 +144,7 @@ class DBConnect:
         return: int, the number of rows updated.
         """
 
-        return self.db.update_data(query, data)
+        return self._call('update_data', query, data)
     
     def delete_data(self, query):
         """
@@ -49,7 +153,7 @@ class DBConnect:
         return: int, the number of rows deleted.
         """
 
-        return self.db.delete_data(query)
+        return self._call('delete_data', query)
 
     def delete_all_data(self, query):
         """
@@ -57,4 +161,19 @@ class DBConnect:
         param: query: str, the query to match the documents that need deleting.
         return: int, the number of rows deleted.
         """
-        return self.db.delete_all_data(query)
\ No newline at end of file
+        return self._call('delete_all_data', query)
+
+    def subscribe(self, *args, **kwargs):
+        """
+        Subscribe to changes in the database instead of polling.
+        The arguments are backend-specific, see the client's subscribe().
+        return: iterator of ChangeEvent.
+        """
+        return self.db.subscribe(*args, **kwargs)
+
+    def asubscribe(self, *args, **kwargs):
+        """
+        Async variant of subscribe().
+        return: async iterator of ChangeEvent.
+        """
+        return aiter_events(self.db.subscribe(*args, **kwargs))
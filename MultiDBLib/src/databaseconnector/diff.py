@@ -0,0 +1,261 @@
+from collections import namedtuple
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+Difference = namedtuple('Difference', ['key', 'status'])
+Difference.__doc__ = """
+A key whose row differs between the two sides of a TableDiff.
+
+key: the row key.
+status: str, 'missing_left' (only on the right), 'missing_right' (only on the left) or 'changed'.
+"""
+
+MISSING_LEFT = 'missing_left'
+MISSING_RIGHT = 'missing_right'
+CHANGED = 'changed'
+NULL_TEXT = '\\N'
+UTF8_COLLATION = 'Latin1_General_100_CI_AS_SC_UTF8'
+
+
+def row_hash(values):
+    """
+    The portable row hash: the first four bytes of the MD5 of the values rendered as text, joined
+    with '|' and with NULL as \\N. PostgreSQL and SQL Server compute the same value server-side.
+
+    :param values: sequence, the compared column values.
+    :return: int, an unsigned 32-bit hash.
+    """
+    text = '|'.join(NULL_TEXT if value is None else str(value) for value in values)
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:4], 'big')
+
+
+class _SQLSide:
+    server_side = True
+
+    def __init__(self, client, table, key, columns):
+        self.client = client
+        self.table = table
+        self.key = key
+        self.ph = client.placeholder
+        if self.ph == '%s':
+            text = "concat_ws('|', " + ", ".join(f"COALESCE(({c})::text, '{NULL_TEXT}')" for c in columns) + ")"
+            self.hash = f"('x' || substr(md5({text}), 1, 8))::bit(32)::bigint"
+        else:
+            # Build Unicode text, then hash its UTF-8 bytes (a VARCHAR under a UTF-8 collation,
+            # SQL Server 2019+) so non-ASCII values hash like they do in PostgreSQL and Python.
+            text = "CONCAT(" + ", N'|', ".join(f"ISNULL(CONVERT(NVARCHAR(MAX), {c}), N'{NULL_TEXT}')"
+                                                for c in columns) + ", N'')"
+            utf8 = f"CONVERT(VARBINARY(MAX), CONVERT(VARCHAR(MAX), {text} COLLATE {UTF8_COLLATION}))"
+            self.hash = f"CAST(CONVERT(BINARY(4), HASHBYTES('MD5', {utf8})) AS BIGINT)"
+
+    def _where(self, lo, hi):
+        clauses, params = [], ()
+        if lo is not None:
+            clauses.append(f"{self.key} >= {self.ph}")
+            params += (lo,)
+        if hi is not None:
+            clauses.append(f"{self.key} < {self.ph}")
+            params += (hi,)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _fetch(self, query, params):
+        return self.client.fetch_data(query, params or None)
+
+    def bounds(self):
+        rows = self._fetch(f"SELECT MIN({self.key}), MAX({self.key}) FROM {self.table}", ())
+        return rows[0][0], rows[0][1]
+
+    def checksum(self, lo, hi):
+        where, params = self._where(lo, hi)
+        rows = self._fetch(f"SELECT COUNT(*), SUM({self.hash}) FROM {self.table}{where}", params)
+        return int(rows[0][0]), int(rows[0][1] or 0)
+
+    def row_hashes(self, lo, hi):
+        where, params = self._where(lo, hi)
+        return {key: int(value) for key, value in
+                self._fetch(f"SELECT {self.key}, {self.hash} FROM {self.table}{where}", params)}
+
+    def split_points(self, lo, hi, count, parts):
+        where, params = self._where(lo, hi)
+        if self.ph == '%s':
+            query = f"SELECT {self.key} FROM {self.table}{where} ORDER BY {self.key} LIMIT 1 OFFSET %s"
+        else:
+            query = (f"SELECT {self.key} FROM {self.table}{where} ORDER BY {self.key} "
+                     f"OFFSET ? ROWS FETCH NEXT 1 ROWS ONLY")
+        points = []
+        for i in range(1, parts):
+            rows = self._fetch(query, params + (count * i // parts,))
+            if rows:
+                points.append(rows[0][0])
+        return points
+
+
+class _MongoSide:
+    def __init__(self, client, collection, key, fields, native):
+        self.collection = client.db[collection] if collection else client.collection
+        self.key = key
+        self.fields = list(fields)
+        self.server_side = native
+        text = []
+        for field in self.fields:
+            text.extend([{'$ifNull': [{'$toString': f'${field}'}, NULL_TEXT]}, '|'])
+        self.hash = {'$mod': [{'$toHashedIndexKey': {'$concat': text[:-1]}}, 2 ** 32]}
+
+    def _filter(self, lo, hi):
+        condition = {}
+        if lo is not None:
+            condition['$gte'] = lo
+        if hi is not None:
+            condition['$lt'] = hi
+        return {self.key: condition} if condition else {}
+
+    def bounds(self):
+        first = list(self.collection.find({}, {self.key: 1}).sort(self.key, 1).limit(1))
+        last = list(self.collection.find({}, {self.key: 1}).sort(self.key, -1).limit(1))
+        return (first[0][self.key] if first else None), (last[0][self.key] if last else None)
+
+    def checksum(self, lo, hi):
+        if not self.server_side:
+            hashes = self.row_hashes(lo, hi)
+            return len(hashes), sum(hashes.values())
+        result = list(self.collection.aggregate([
+            {'$match': self._filter(lo, hi)},
+            {'$group': {'_id': None, 'count': {'$sum': 1}, 'checksum': {'$sum': self.hash}}},
+        ]))
+        return (result[0]['count'], int(result[0]['checksum'])) if result else (0, 0)
+
+    def row_hashes(self, lo, hi):
+        if self.server_side:
+            cursor = self.collection.aggregate([{'$match': self._filter(lo, hi)},
+                                                {'$project': {'_id': 0, 'key': f'${self.key}', 'hash': self.hash}}])
+            return {document['key']: int(document['hash']) for document in cursor}
+        return dict(self.rows_from(lo, None, hi))
+
+    def rows_from(self, lo, limit, hi=None):
+        cursor = self.collection.find(self._filter(lo, hi), [self.key] + self.fields).sort(self.key, 1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [(document[self.key], row_hash([document.get(field) for field in self.fields])) for document in cursor]
+
+    def split_points(self, lo, hi, count, parts):
+        points = []
+        for i in range(1, parts):
+            found = list(self.collection.find(self._filter(lo, hi), {self.key: 1}).sort(self.key, 1)
+                         .skip(count * i // parts).limit(1))
+            if found:
+                points.append(found[0][self.key])
+        return points
+
+
+class TableDiff:
+    """
+    Finds the keys whose rows differ between two tables or collections, e.g. after a migration,
+    without fetching both sides. Each side computes a row count and a sum of per-row MD5-based
+    hashes for a key range on the server; only ranges whose checksums differ are split further
+    (Merkle-tree style) until they are small enough to compare key by key, so traffic grows with
+    the number of differences rather than with the table size.
+
+    PostgreSQL and SQL Server hash the compared columns rendered as text, so the columns must render
+    identically on both sides (pass per-side SQL expressions to normalize dates, booleans or
+    floats). MongoDB has no MD5 in aggregation: two MongoDB sides are compared with
+    ``$toHashedIndexKey`` in ``$group``, while a MongoDB side diffed against SQL is hashed
+    client-side chunk by chunk, so only the SQL side's traffic stays proportional to the differences.
+
+    Iterating yields Difference tuples in key order.
+    """
+
+    def __init__(self, left, right, key, columns, right_key=None, right_columns=None, left_table=None,
+                 right_table=None, leaf_size=1000, fanout=16):
+        """
+        :param left: PostgresClient, MSSQLClient or MongoDBClient.
+        :param right: PostgresClient, MSSQLClient or MongoDBClient.
+        :param key: str, the key column or field (unique, indexed and comparable across sides).
+        :param columns: list of str, the compared columns, fields or SQL expressions on the left.
+        :param right_key: str or None, the key on the right when it is named differently.
+        :param right_columns: list of str or None, the compared columns on the right, in the same order.
+        :param left_table: str or None, the left table (or collection; defaults to the client's collection).
+        :param right_table: str or None, the right table (or collection).
+        :param leaf_size: int, ranges with at most this many rows are compared key by key.
+        :param fanout: int, the number of sub-ranges a mismatching range is split into.
+        """
+        native = not hasattr(left, 'placeholder') and not hasattr(right, 'placeholder')
+        self.left = self._side(left, left_table, key, columns, native)
+        self.right = self._side(right, right_table, right_key or key, right_columns or columns, native)
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self.ranges_compared = 0
+        self.leaves_compared = 0
+
+    @staticmethod
+    def _side(client, table, key, columns, native):
+        if hasattr(client, 'placeholder'):
+            if not table:
+                raise ValueError("a table is required for SQL clients")
+            return _SQLSide(client, table, key, columns)
+        return _MongoSide(client, table, key, columns, native)
+
+    def __iter__(self):
+        if self.left.server_side and self.right.server_side:
+            return self._narrow()
+        return self._walk()
+
+    def _narrow(self):
+        left_bounds, right_bounds = self.left.bounds(), self.right.bounds()
+        lows = [b[0] for b in (left_bounds, right_bounds) if b[0] is not None]
+        highs = [b[1] for b in (left_bounds, right_bounds) if b[1] is not None]
+        if not lows:
+            return
+        lo = hi = None
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in lows + highs):
+            lo, hi = min(lows), max(highs) + 1
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            left, right = self.left.checksum(lo, hi), self.right.checksum(lo, hi)
+            self.ranges_compared += 1
+            if left == right:
+                continue
+            points = self._split(lo, hi, left[0], right[0]) if max(left[0], right[0]) > self.leaf_size else []
+            if not points:
+                for difference in self._compare(self.left.row_hashes(lo, hi), self.right.row_hashes(lo, hi)):
+                    yield difference
+                continue
+            edges = [lo] + points + [hi]
+            stack.extend(reversed(list(zip(edges, edges[1:]))))
+
+    def _split(self, lo, hi, left_count, right_count):
+        if isinstance(lo, int) and isinstance(hi, int):
+            step = max(1, -(-(hi - lo) // self.fanout))
+            return list(range(lo + step, hi, step))
+        side = self.left if left_count >= right_count else self.right
+        points = sorted(set(side.split_points(lo, hi, max(left_count, right_count), self.fanout)))
+        return [point for point in points if lo is None or point > lo]
+
+    def _walk(self):
+        driver, other = (self.left, self.right) if not self.left.server_side else (self.right, self.left)
+        lo = None
+        while True:
+            rows = driver.rows_from(lo, self.leaf_size + 1)
+            hi = rows[self.leaf_size][0] if len(rows) > self.leaf_size else None
+            hashes = dict(rows[:self.leaf_size])
+            self.ranges_compared += 1
+            if (len(hashes), sum(hashes.values())) != other.checksum(lo, hi):
+                other_hashes = other.row_hashes(lo, hi)
+                pair = (hashes, other_hashes) if driver is self.left else (other_hashes, hashes)
+                for difference in self._compare(*pair):
+                    yield difference
+            if hi is None:
+                return
+            lo = hi
+
+    def _compare(self, left, right):
+        self.leaves_compared += 1
+        for key in sorted(set(left) | set(right)):
+            if key not in left:
+                yield Difference(key, MISSING_LEFT)
+            elif key not in right:
+                yield Difference(key, MISSING_RIGHT)
+            elif left[key] != right[key]:
+                yield Difference(key, CHANGED)
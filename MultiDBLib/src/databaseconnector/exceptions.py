@@ -26,3 +26,11 @@ class OperationalError(DatabaseError):
     """Exception raised for errors that occur during a query execution."""
     pass
 
+class AdmissionError(DatabaseError):
+    """Exception raised when a request is rejected by admission control (queue full or wait timed out)."""
+    pass
+
+class CircuitOpenError(AdmissionError):
+    """Exception raised when a request is rejected because the backend's circuit breaker is open."""
+    pass
+
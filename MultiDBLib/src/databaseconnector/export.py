@@ -0,0 +1,290 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+COMPRESSIONS = {None: open, 'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+
+def numbered_path(path, suffix):
+    """
+    Inserts a suffix before the file extensions, e.g. ('out/orders.csv.gz', '00001') -> 'out/orders-00001.csv.gz'.
+
+    :param path: str, the original path.
+    :param suffix: str, the suffix to insert.
+    :return: str
+    """
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition('.')
+    return os.path.join(directory, f"{stem}-{suffix}{dot}{extensions}")
+
+
+def resolve_compression(path, compression):
+    """
+    Picks the compression from the argument or, when omitted, from the file extension.
+
+    :param path: str, the output path.
+    :param compression: str or None, one of 'gzip', 'bz2', 'xz' (for parquet, any codec pyarrow supports).
+    :return: str or None
+    """
+    if compression is None:
+        compression = COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1])
+    return compression
+
+
+def open_output(path, compression=None):
+    """
+    Opens a binary output file with optional streaming compression.
+
+    :param path: str, the output path.
+    :param compression: str or None, one of 'gzip', 'bz2' or 'xz'.
+    :return: a writable binary file object.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {tuple(COMPRESSIONS)}")
+    return COMPRESSIONS[compression](path, 'wb')
+
+
+def _temporary_path(path):
+    # Files are written next to their destination and moved into place with os.replace() when
+    # complete, so a failed export never leaves a partial file at the destination.
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                             dir=os.path.dirname(path) or '.')
+    os.close(descriptor)
+    # mkstemp creates the file private to its owner; exports are read by other processes.
+    os.chmod(temporary, 0o644)
+    return temporary
+
+
+def _discard(paths, temporary):
+    for path in paths + ([temporary] if temporary else []):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class RollingFileWriter:
+    """
+    Writes records to a sequence of files, starting a new file once ``max_bytes`` (uncompressed) have
+    been written to the current one. Files only roll between records, and every file starts with ``header``.
+    Each file is written to a temporary file and only appears at its path once complete.
+    """
+
+    def __init__(self, path, compression=None, max_bytes=None, header=b''):
+        """
+        :param path: str, the output path; numbered when rolling (orders-00000.csv, orders-00001.csv, ...).
+        :param compression: str or None, one of 'gzip', 'bz2' or 'xz'.
+        :param max_bytes: int or None, the size after which to roll to a new file.
+        :param header: bytes, written at the start of every file.
+        """
+        self.path = path
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.header = header
+        self.paths = []
+        self._file = None
+        self._temporary = None
+        self._written = 0
+
+    def write_records(self, data):
+        """
+        Writes one or more complete records and rolls to a new file if the size limit is reached.
+
+        :param data: bytes, the encoded records.
+        """
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._written += len(data)
+        if self.max_bytes is not None and self._written >= self.max_bytes:
+            self._finish()
+
+    def _open(self):
+        path = numbered_path(self.path, f"{len(self.paths):05d}") if self.max_bytes is not None else self.path
+        self._temporary = _temporary_path(path)
+        self._file = open_output(self._temporary, self.compression)
+        self.paths.append(path)
+        self._written = 0
+        if self.header:
+            self._file.write(self.header)
+            self._written += len(self.header)
+
+    def close(self):
+        """
+        Closes the current file.
+
+        :return: list of str, all files written.
+        """
+        if self._file is None and not self.paths:
+            self._open()
+        if self._file is not None:
+            self._finish()
+        return self.paths
+
+    def abort(self):
+        """Closes the current file and removes every file written, e.g. after a failed export."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        _discard(self.paths, self._temporary)
+        self._temporary = None
+
+    def _finish(self):
+        self._file.close()
+        self._file = None
+        os.replace(self._temporary, self.paths[-1])
+        self._temporary = None
+
+
+def _encode_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _encode_ndjson(fields, rows):
+    if fields is None:
+        return ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode('utf-8')
+    return ''.join(json.dumps(dict(zip(fields, row)), default=str) + '\n' for row in rows).encode('utf-8')
+
+
+class _ParquetSink:
+    def __init__(self, path, compression, max_bytes, schema=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        self._pyarrow = pyarrow
+        self._parquet = pyarrow.parquet
+        self.path = path
+        self.compression = compression or 'snappy'
+        self.max_bytes = max_bytes
+        self.schema = schema
+        self.paths = []
+        self._writer = None
+        self._temporary = None
+        self._written = 0
+        self._pending = []
+
+    def write(self, fields, rows):
+        table = self._pyarrow.Table.from_pydict({name: list(column) for name, column in zip(fields, zip(*rows))})
+        if self.schema is None:
+            # A column that is null in every row so far has no type yet: hold the batches back
+            # until each column has one, so the file schema is not fixed to the null type.
+            self._pending.append(table)
+            if any(self._pyarrow.types.is_null(field.type) for field in table.schema):
+                return
+            self._flush_pending()
+            return
+        self._write_table(table)
+
+    def _flush_pending(self):
+        if self.schema is None and self._pending:
+            types = {}
+            for table in self._pending:
+                for field in table.schema:
+                    if field.name not in types or self._pyarrow.types.is_null(types[field.name]):
+                        types[field.name] = field.type
+            self.schema = self._pyarrow.schema([(name, types[name]) for name in self._pending[0].column_names])
+        pending, self._pending = self._pending, []
+        for table in pending:
+            self._write_table(table)
+
+    def _write_table(self, table):
+        table = table.cast(self.schema)
+        if self._writer is None:
+            path = numbered_path(self.path, f"{len(self.paths):05d}") if self.max_bytes is not None else self.path
+            self._temporary = _temporary_path(path)
+            self._writer = self._parquet.ParquetWriter(self._temporary, self.schema, compression=self.compression)
+            self.paths.append(path)
+            self._written = 0
+        self._writer.write_table(table)
+        self._written += table.nbytes
+        if self.max_bytes is not None and self._written >= self.max_bytes:
+            self._finish()
+
+    def _finish(self):
+        self._writer.close()
+        self._writer = None
+        os.replace(self._temporary, self.paths[-1])
+        self._temporary = None
+
+    def close(self):
+        self._flush_pending()
+        if self._writer is not None:
+            self._finish()
+        return self.paths
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        _discard(self.paths, self._temporary)
+        self._temporary = None
+
+
+def export_batches(batches, path, format='csv', compression=None, max_file_size=None, fields=None, schema=None):
+    """
+    Writes batches of rows to CSV, NDJSON or Parquet files, streaming one batch at a time.
+
+    :param batches: iterable of (tuple of str, list of tuple), the column names and rows of each batch;
+        for NDJSON the names may be None with the rows given as dicts.
+    :param path: str, the output path.
+    :param format: str, one of 'csv', 'ndjson' or 'parquet'.
+    :param compression: str or None, 'gzip', 'bz2' or 'xz' for text formats (inferred from the extension
+        when omitted), or a Parquet codec such as 'snappy' or 'zstd'.
+    :param max_file_size: int or None, roll to a new numbered file after this many bytes.
+    :param fields: tuple of str or None, the CSV header when it is known before the first batch.
+    :param schema: pyarrow.Schema or None, the Parquet schema; by default each column takes the type of
+        its first non-null values.
+    :return: tuple of (int, list of str), the number of rows written and the files written.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    count = 0
+    if format == 'parquet':
+        sink = _ParquetSink(path, compression, max_file_size, schema)
+        try:
+            for batch_fields, rows in batches:
+                if rows:
+                    sink.write(batch_fields, rows)
+                    count += len(rows)
+            return count, sink.close()
+        except BaseException:
+            sink.abort()
+            raise
+
+    writer = RollingFileWriter(path, resolve_compression(path, compression), max_file_size)
+    try:
+        for batch_fields, rows in batches:
+            if format == 'csv':
+                if not writer.header:
+                    writer.header = _encode_csv([fields or batch_fields])
+                data = _encode_csv(rows)
+            else:
+                data = _encode_ndjson(batch_fields, rows)
+            if data:
+                writer.write_records(data)
+                count += len(rows)
+        if format == 'csv' and not writer.header and fields:
+            writer.header = _encode_csv([fields])
+        paths = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    logger.info(f"Exported {count} rows to {len(paths)} file(s).")
+    return count, paths
+
+
+def with_fields(fields, rows):
+    """Row factory for ``iter_data`` that keeps the column names with each batch."""
+    return fields, rows
@@ -0,0 +1,166 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import itertools
+import logging
+import threading
+import time
+
+from .workload import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class HedgedReads:
+    """
+    Reduces tail latency of idempotent reads. A read that has not returned after the ``percentile``
+    latency of recent reads is issued again to one of ``replicas``; the first response wins and the
+    other request is cancelled through the client's ``cancel()``.
+
+    Hedges are paid for with a budget: every read earns ``budget`` hedge tokens (at most ``burst``)
+    and every hedge spends one, so hedges never add more than ``budget`` (e.g. 5%) extra load.
+
+    Use dedicated connections: cancelling the loser cancels whatever its connection is running.
+    The winner is returned at once unless a cancel was delivered to a loser still running on its
+    connection; then it is returned once that loser has stopped (at most ``cancel_timeout`` later),
+    so the connection has rolled back before it is used again. Losers that cannot be cancelled
+    (e.g. MongoDB clients) finish in the background.
+    """
+
+    def __init__(self, replicas, percentile=95.0, budget=0.05, burst=10.0, initial_delay=0.05, min_delay=0.001,
+                 window=1000, min_samples=20, max_workers=16, cancel_timeout=1.0, clock=time.monotonic):
+        """
+        :param replicas: list of Database, connected clients (a second connection or replicas) used for hedges.
+        :param percentile: float, the latency percentile of recent reads after which a read is hedged.
+        :param budget: float, the maximum share of extra reads caused by hedging.
+        :param burst: float, the maximum number of hedge tokens saved up.
+        :param initial_delay: float, the hedge delay in seconds until ``min_samples`` reads have been seen.
+        :param min_delay: float, the shortest hedge delay in seconds.
+        :param window: int, the number of recent read latencies kept.
+        :param min_samples: int, the number of reads needed before the percentile delay is used.
+        :param max_workers: int, the size of the thread pool that runs the reads.
+        :param cancel_timeout: float, seconds to wait for a cancelled read to stop.
+        :param clock: callable, returns the current time in seconds.
+        """
+        if not replicas:
+            raise ValueError("at least one replica is required for hedging")
+        self.replicas = list(replicas)
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.cancel_timeout = cancel_timeout
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self._clock = clock
+        self._latencies = deque(maxlen=window)
+        self._tokens = burst
+        self._replica_cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+
+    def delay(self):
+        """
+        :return: float, the current hedge delay in seconds.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies)
+        return max(self.min_delay, percentile(latencies, self.percentile))
+
+    @property
+    def hedge_rate(self):
+        """The share of reads that were hedged."""
+        return self.hedges / self.requests if self.requests else 0.0
+
+    @property
+    def win_rate(self):
+        """The share of hedges that returned before the original read."""
+        return self.hedge_wins / self.hedges if self.hedges else 0.0
+
+    def stats(self):
+        """
+        :return: dict with the counters, hedge_rate, win_rate and the current delay.
+        """
+        return {'requests': self.requests, 'hedges': self.hedges, 'hedge_wins': self.hedge_wins,
+                'budget_denied': self.budget_denied, 'hedge_rate': self.hedge_rate, 'win_rate': self.win_rate,
+                'delay': self.delay()}
+
+    def fetch(self, primary, func, *args, **kwargs):
+        """
+        Runs a read, hedging it on a replica when it is slow.
+
+        :param primary: Database, the client ``func`` runs on (cancelled if the hedge wins).
+        :param func: callable, performs the read on ``primary``.
+        :param args: the arguments for ``fetch_data`` on the replica.
+        :return: the result of whichever read finished first.
+        """
+        start = self._clock()
+        threads = {}
+        first = self._executor.submit(self._run, threads, 'first', func, *args, **kwargs)
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+        done, _ = wait([first], timeout=self.delay())
+        if done or not self._take_token():
+            result = first.result()
+            self._observe(self._clock() - start)
+            return result
+
+        replica = next(self._replica_cycle)
+        hedge = self._executor.submit(self._run, threads, 'hedge', replica.fetch_data, *args, **kwargs)
+        pending = {first: primary, hedge: replica}
+        errors = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                cancelled = [loser for loser, client in pending.items()
+                             if self._cancel(loser, client, threads.get('hedge' if loser is hedge else 'first'))]
+                if cancelled:
+                    wait(cancelled, timeout=self.cancel_timeout)
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                self._observe(self._clock() - start)
+                return future.result()
+        raise errors[0]
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens < 1.0:
+                self.budget_denied += 1
+                return False
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+
+    def _observe(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    @staticmethod
+    def _run(threads, name, func, *args, **kwargs):
+        threads[name] = threading.get_ident()
+        return func(*args, **kwargs)
+
+    def _cancel(self, future, client, thread):
+        # True when a cancel reached a read still running on the client's connection.
+        if future.cancel() or future.done():
+            return False
+        try:
+            return bool(client.cancel(thread))
+        except Exception as e:
+            logger.debug(f"Cancelling the losing read failed: {e}")
+            return False
+
+    def close(self):
+        """Shuts down the thread pool; in-flight losing reads are not waited for."""
+        self._executor.shutdown(wait=False)
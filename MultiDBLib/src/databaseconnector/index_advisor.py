@@ -0,0 +1,136 @@
+from collections import namedtuple
+import threading
+
+QueryShape = namedtuple('QueryShape', ['equality', 'range', 'sort'])
+QueryShape.__doc__ = """
+The index-relevant shape of a MongoDB query.
+
+equality: tuple of str, fields matched by equality (plain values, $eq, $in).
+range: tuple of str, fields matched by ranges or other operators ($gt, $lt, $ne, $regex, ...).
+sort: tuple of (str, int), the sort keys and directions.
+"""
+
+EQUALITY_OPERATORS = ('$eq', '$in')
+
+
+def query_shape(query, sort=None):
+    """
+    Extracts the QueryShape of a filter and sort. Top-level $and clauses are flattened;
+    $or, $nor and $expr clauses are ignored because a single compound index cannot serve them.
+
+    :param query: dict, the filter.
+    :param sort: list of (str, int) or None, the sort specification.
+    :return: QueryShape
+    """
+    equality, ranges = [], []
+    _classify(query or {}, equality, ranges)
+    equality = tuple(sorted(set(equality)))
+    ranges = tuple(sorted(set(ranges) - set(equality)))
+    return QueryShape(equality, ranges, tuple((key, direction) for key, direction in (sort or ())))
+
+
+def _classify(query, equality, ranges):
+    for field, condition in query.items():
+        if field == '$and':
+            for clause in condition:
+                _classify(clause, equality, ranges)
+        elif field.startswith('$'):
+            continue
+        elif isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            if all(op in EQUALITY_OPERATORS for op in condition):
+                equality.append(field)
+            else:
+                ranges.append(field)
+        else:
+            equality.append(field)
+
+
+def recommend_index(shape):
+    """
+    Builds a compound index for a query shape following the equality, sort, range rule.
+
+    :param shape: QueryShape
+    :return: list of (str, int), the index keys.
+    """
+    keys = [(field, 1) for field in shape.equality]
+    used = set(shape.equality)
+    for field, direction in shape.sort:
+        if field not in used:
+            keys.append((field, direction))
+            used.add(field)
+    keys.extend((field, 1) for field in shape.range if field not in used)
+    return keys
+
+
+def plan_stages(explain):
+    """
+    Collects the stage names of the winning plan in an explain() result.
+
+    :param explain: dict, the output of ``Cursor.explain()``.
+    :return: set of str, e.g. {'FETCH', 'IXSCAN'} or {'COLLSCAN'}.
+    """
+    stages = set()
+    planner = explain.get('queryPlanner', explain)
+    plan = planner.get('winningPlan', {})
+    pending = [plan.get('queryPlan', plan)]
+    while pending:
+        stage = pending.pop()
+        if 'stage' in stage:
+            stages.add(stage['stage'])
+        if 'inputStage' in stage:
+            pending.append(stage['inputStage'])
+        pending.extend(stage.get('inputStages', ()))
+    return stages
+
+
+def is_covered(keys, index_keys):
+    """
+    Returns True if an existing index already starts with the recommended keys.
+
+    :param keys: list of (str, int), the recommended index keys.
+    :param index_keys: list of list of (str, int), the key patterns of the existing indexes.
+    :return: bool
+    """
+    keys = [tuple(key) for key in keys]
+    return any([tuple(key) for key in existing][:len(keys)] == keys for existing in index_keys)
+
+
+class QueryShapeTracker:
+    """
+    Thread-safe counter of the query shapes a client has seen, keeping the latest example of each
+    shape so it can be explained later.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def record(self, query, sort=None):
+        """
+        Counts one query.
+
+        :param query: dict, the filter.
+        :param sort: list of (str, int) or None, the sort specification.
+        """
+        shape = query_shape(query, sort)
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                self._shapes[shape] = [1, query, sort]
+            else:
+                entry[0] += 1
+                entry[1], entry[2] = query, sort
+
+    def most_common(self, limit=None):
+        """
+        :param limit: int or None, the maximum number of shapes to return.
+        :return: list of (QueryShape, int, dict, list), the shape, its count and its latest filter and sort.
+        """
+        with self._lock:
+            shapes = [(shape, entry[0], entry[1], entry[2]) for shape, entry in self._shapes.items()]
+        shapes.sort(key=lambda item: item[1], reverse=True)
+        return shapes[:limit]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._shapes)
@@ -0,0 +1,222 @@
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+JOIN_TYPES = ('inner', 'left')
+
+
+def dict_rows(fields, rows):
+    """Row factory that returns each row as a dict keyed by column name."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def scan(client, query, params=None, batch_size=1000):
+    """
+    Streams a query result from any client as batches of dict rows, the input format of the joins.
+
+    :param client: PostgresClient, MSSQLClient or MongoDBClient.
+    :param query: str or dict, a SQL query or MongoDB filter.
+    :param params: tuple or dict or None, SQL parameters or a MongoDB projection.
+    :param batch_size: int, the number of rows per batch.
+    :return: generator of list of dict.
+    """
+    if hasattr(client, 'placeholder'):
+        return client.iter_data(query, params, batch_size=batch_size, row_factory=dict_rows)
+    return client.iter_data(query, params, batch_size=batch_size)
+
+
+def _key_func(key):
+    if callable(key):
+        return key
+    return lambda row: row[key]
+
+
+class _SpillFiles:
+    """Appends pickled batches to one file per partition and reads them back."""
+
+    def __init__(self, directory, prefix, partitions):
+        self.paths = [os.path.join(directory, f"{prefix}-{i:03d}.pkl") for i in range(partitions)]
+        self._buffers = [[] for _ in range(partitions)]
+
+    def add(self, partition, item, flush_at=1000):
+        buffer = self._buffers[partition]
+        buffer.append(item)
+        if len(buffer) >= flush_at:
+            self.flush(partition)
+
+    def flush(self, partition=None):
+        for i in range(len(self.paths)) if partition is None else (partition,):
+            if self._buffers[i]:
+                with open(self.paths[i], 'ab') as spill:
+                    pickle.dump(self._buffers[i], spill, pickle.HIGHEST_PROTOCOL)
+                self._buffers[i] = []
+
+    def read(self, partition):
+        if not os.path.exists(self.paths[partition]):
+            return
+        with open(self.paths[partition], 'rb') as spill:
+            while True:
+                try:
+                    batch = pickle.load(spill)
+                except EOFError:
+                    return
+                for item in batch:
+                    yield item
+
+
+class HashJoin:
+    """
+    Joins two streams of row batches, e.g. from different backends. The build side is loaded into an
+    in-memory hash table and the probe side is streamed past it, so only the build side is held in
+    memory. When the build side exceeds ``memory_budget`` rows, both sides are hash-partitioned to
+    temporary files and joined one partition at a time (grace hash join).
+
+    Iterating yields ``(probe_row, build_row)`` pairs lazily; for a left join unmatched probe rows are
+    paired with None. Put the smaller input on the build side.
+    """
+
+    def __init__(self, build, probe, build_key, probe_key, how='inner', memory_budget=1000000, partitions=32,
+                 spill_dir=None):
+        """
+        :param build: iterable of list, batches of build rows (see scan()).
+        :param probe: iterable of list, batches of probe rows.
+        :param build_key: str or int or callable, the build rows' join key (a field, an index or a function).
+        :param probe_key: str or int or callable, the probe rows' join key.
+        :param how: str, 'inner' or 'left' (keeps unmatched probe rows).
+        :param memory_budget: int, the maximum number of build rows held in memory.
+        :param partitions: int, the number of spill partitions used by the grace hash join.
+        :param spill_dir: str or None, where spill files are written (defaults to the system temp dir).
+        """
+        if how not in JOIN_TYPES:
+            raise ValueError(f"how must be one of {JOIN_TYPES}")
+        self.build = build
+        self.probe = probe
+        self.build_key = _key_func(build_key)
+        self.probe_key = _key_func(probe_key)
+        self.how = how
+        self.memory_budget = memory_budget
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.spilled = False
+
+    def __iter__(self):
+        table, size = {}, 0
+        build = iter(self.build)
+        for batch in build:
+            for row in batch:
+                table.setdefault(self.build_key(row), []).append(row)
+            size += len(batch)
+            if size > self.memory_budget:
+                return self._grace_join(table, build)
+        return self._probe(table, self.probe)
+
+    def _probe(self, table, batches):
+        for batch in batches:
+            for row in batch:
+                matches = table.get(self.probe_key(row))
+                if matches:
+                    for match in matches:
+                        yield row, match
+                elif self.how == 'left':
+                    yield row, None
+
+    def _grace_join(self, table, build):
+        self.spilled = True
+        directory = tempfile.mkdtemp(prefix='hashjoin-', dir=self.spill_dir)
+        logger.info(f"Build side exceeds {self.memory_budget} rows; spilling to {self.partitions} partitions.")
+        try:
+            build_spill = _SpillFiles(directory, 'build', self.partitions)
+            for key, rows in table.items():
+                for row in rows:
+                    build_spill.add(hash(key) % self.partitions, row)
+            table.clear()
+            for batch in build:
+                for row in batch:
+                    build_spill.add(hash(self.build_key(row)) % self.partitions, row)
+            build_spill.flush()
+
+            probe_spill = _SpillFiles(directory, 'probe', self.partitions)
+            for batch in self.probe:
+                for row in batch:
+                    probe_spill.add(hash(self.probe_key(row)) % self.partitions, row)
+            probe_spill.flush()
+
+            for partition in range(self.partitions):
+                table = {}
+                for row in build_spill.read(partition):
+                    table.setdefault(self.build_key(row), []).append(row)
+                for pair in self._probe(table, [probe_spill.read(partition)]):
+                    yield pair
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class LookupJoin:
+    """
+    Joins a stream of probe rows against another backend by looking up each batch of probe keys with
+    one query: ``IN (...)`` for SQL clients, ``$in`` for MongoDB. Only one batch of probe rows and its
+    matches are held in memory at a time.
+
+    Iterating yields ``(probe_row, match)`` pairs lazily; for a left join unmatched probe rows are
+    paired with None.
+    """
+
+    def __init__(self, probe, client, lookup, probe_key, lookup_key, how='inner', batch_size=500):
+        """
+        :param probe: iterable of list, batches of probe rows (see scan()).
+        :param client: PostgresClient, MSSQLClient or MongoDBClient, the backend to look rows up in.
+        :param lookup: str or dict, for SQL a query with a ``{keys}`` marker where the IN list goes
+            (e.g. "SELECT * FROM orders WHERE customer_id IN {keys}"); for MongoDB a base filter.
+        :param probe_key: str or int or callable, the probe rows' join key.
+        :param lookup_key: str, the looked-up column or field matching the probe key.
+        :param how: str, 'inner' or 'left' (keeps unmatched probe rows).
+        :param batch_size: int, the maximum number of keys per lookup query.
+        """
+        if how not in JOIN_TYPES:
+            raise ValueError(f"how must be one of {JOIN_TYPES}")
+        self.probe = probe
+        self.client = client
+        self.lookup = lookup
+        self.probe_key = _key_func(probe_key)
+        self.lookup_key = lookup_key
+        self.how = how
+        self.batch_size = batch_size
+        self.lookups = 0
+
+    def __iter__(self):
+        pending = []
+        for batch in self.probe:
+            for row in batch:
+                pending.append(row)
+                if len(pending) >= self.batch_size:
+                    for pair in self._join(pending):
+                        yield pair
+                    pending = []
+        if pending:
+            for pair in self._join(pending):
+                yield pair
+
+    def _join(self, rows):
+        keys = list(dict.fromkeys(self.probe_key(row) for row in rows))
+        matches = {}
+        for match in self._fetch(keys):
+            matches.setdefault(match[self.lookup_key], []).append(match)
+        for row in rows:
+            found = matches.get(self.probe_key(row))
+            if found:
+                for match in found:
+                    yield row, match
+            elif self.how == 'left':
+                yield row, None
+
+    def _fetch(self, keys):
+        self.lookups += 1
+        if hasattr(self.client, 'placeholder'):
+            in_list = '(' + ', '.join([self.client.placeholder] * len(keys)) + ')'
+            return self.client.fetch_data(self.lookup.replace('{keys}', in_list), tuple(keys), row_factory=dict_rows)
+        condition = {self.lookup_key: {'$in': keys}}
+        return self.client.fetch_data({'$and': [self.lookup, condition]} if self.lookup else condition)
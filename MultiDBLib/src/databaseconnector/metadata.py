@@ -0,0 +1,135 @@
+from collections import namedtuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TableMetadata = namedtuple('TableMetadata', ['table', 'columns', 'types', 'primary_key', 'indexes'])
+TableMetadata.__doc__ = """
+Cached description of a table.
+
+table: str, the table name as requested.
+columns: tuple of str, the column names in ordinal order.
+types: dict, maps each column name to its database type name.
+primary_key: tuple of str, the primary key columns in key order.
+indexes: dict, maps each index name to the tuple of its key columns.
+"""
+
+DDL_KEYWORDS = ('CREATE', 'ALTER', 'DROP', 'TRUNCATE', 'SP_RENAME', 'EXEC SP_RENAME')
+
+
+def is_ddl(query):
+    """
+    Returns True for statements that can change table definitions.
+
+    :param query: str, the SQL statement.
+    :return: bool
+    """
+    return isinstance(query, str) and query.lstrip().upper().startswith(DDL_KEYWORDS)
+
+
+def build_metadata(table, column_rows, index_rows):
+    """
+    Assembles TableMetadata from catalog query results.
+
+    :param table: str, the table name.
+    :param column_rows: list of (name, type), the columns in ordinal order.
+    :param index_rows: list of (index_name, is_primary, column), the index key columns in key order.
+    :return: TableMetadata
+    """
+    indexes, primary_key = {}, ()
+    for index_name, is_primary, column in index_rows:
+        indexes.setdefault(index_name, []).append(column)
+        if is_primary:
+            primary_key = primary_key + (column,)
+    return TableMetadata(table, tuple(name for name, _ in column_rows), dict(column_rows), primary_key,
+                         {name: tuple(columns) for name, columns in indexes.items()})
+
+
+class MetadataCache:
+    """
+    Thread-safe cache of TableMetadata keyed by connection identity and table. Entries are loaded
+    lazily, expire after ``ttl`` seconds and are dropped when a client runs DDL. One cache is shared
+    by all clients by default, so metadata is loaded once per server and database.
+    """
+
+    def __init__(self, ttl=300.0, clock=time.monotonic):
+        """
+        :param ttl: float or None, seconds an entry stays valid (None never expires).
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, identity, table, loader):
+        """
+        Returns the cached metadata for ``table``, loading it with ``loader`` when missing or expired.
+
+        :param identity: tuple, the connection identity (the client's ``registry_key``).
+        :param table: str, the table name.
+        :param loader: callable, returns TableMetadata for the table.
+        :return: TableMetadata
+        """
+        key = (identity, table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or self._clock() - entry[1] < self.ttl):
+                return entry[0]
+        metadata = loader()
+        with self._lock:
+            self._entries[key] = (metadata, self._clock())
+        logger.info(f"Loaded metadata for {table}.")
+        return metadata
+
+    def invalidate(self, identity=None, table=None):
+        """
+        Drops cached entries.
+
+        :param identity: tuple or None, limit to one connection identity.
+        :param table: str or None, limit to one table.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (identity is None or key[0] == identity) and (table is None or key[1] == table):
+                    del self._entries[key]
+
+
+shared_metadata_cache = MetadataCache()
+
+
+def column_converters(metadata, type_converters):
+    """
+    Precomputes per-column converters for a table from converters keyed by type name.
+
+    :param metadata: TableMetadata
+    :param type_converters: dict, maps database type names to callables.
+    :return: dict, maps column names to their converter.
+    """
+    return {column: type_converters[type_name] for column, type_name in metadata.types.items()
+            if type_name in type_converters}
+
+
+def convert_rows(fields, rows, converters):
+    """
+    Applies per-column converters to fetched rows, skipping NULLs. Converters are resolved against
+    the result columns once per fetch, not per value.
+
+    :param fields: sequence of str, the result column names.
+    :param rows: list of sequences, the fetched rows.
+    :param converters: dict, maps column names to callables.
+    :return: list of tuple
+    """
+    targets = [(i, converters[name]) for i, name in enumerate(fields) if name in converters]
+    if not targets:
+        return rows
+    converted = []
+    for row in rows:
+        values = list(row)
+        for i, convert in targets:
+            if values[i] is not None:
+                values[i] = convert(values[i])
+        converted.append(tuple(values))
+    return converted
@@ -0,0 +1,313 @@
+import datetime
+import decimal
+import json
+import logging
+import threading
+import uuid
+
+from bson import ObjectId, json_util
+
+from .export import with_fields
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_TABLE = '_multidb_watermarks'
+
+
+def local_value(value):
+    """
+    Converts a remote value into one SQLite can store: dates and times become ISO 8601 text,
+    decimals and UUIDs text, and documents or arrays JSON text.
+
+    :param value: a value read from the remote client.
+    :return: None, int, float, str or bytes.
+    """
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (dict, list, tuple)):
+        return json_util.dumps(value)
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return str(value)
+
+
+# Positions are saved with a type tag per value, so watermarks and keys come back with their type:
+# datetimes as ISO 8601 text keeping microseconds and the UTC offset, decimals and UUIDs as text.
+_POSITION_TYPES = (
+    (bool, 'bool', lambda value: value, lambda text: text),
+    (int, 'int', str, int),
+    (float, 'float', repr, float),
+    (str, 'str', lambda value: value, lambda text: text),
+    (datetime.datetime, 'datetime', datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    (datetime.date, 'date', datetime.date.isoformat, datetime.date.fromisoformat),
+    (datetime.time, 'time', datetime.time.isoformat, datetime.time.fromisoformat),
+    (decimal.Decimal, 'decimal', str, decimal.Decimal),
+    (uuid.UUID, 'uuid', str, uuid.UUID),
+    (ObjectId, 'objectid', str, ObjectId),
+    ((bytes, bytearray, memoryview), 'bytes', lambda value: bytes(value).hex(), bytes.fromhex),
+)
+_POSITION_DECODERS = {tag: decode for _, tag, _, decode in _POSITION_TYPES}
+
+
+def encode_value(value):
+    """
+    Encodes a key or watermark as a JSON-serializable [type tag, text] pair that decode_value()
+    turns back into the same value and type.
+
+    :param value: None, bool, int, float, str, bytes, datetime, date, time, Decimal, UUID, ObjectId or a BSON value.
+    :return: list, the [tag, text] pair.
+    """
+    if value is None:
+        return ['null', None]
+    for types, tag, encode, _ in _POSITION_TYPES:
+        if isinstance(value, types):
+            return [tag, encode(value)]
+    return ['bson', json_util.dumps(value)]
+
+
+def decode_value(encoded):
+    """
+    :param encoded: list, a pair made by encode_value().
+    :return: the original value.
+    """
+    tag, text = encoded
+    if tag == 'null':
+        return None
+    if tag == 'bson':
+        return json_util.loads(text)
+    return _POSITION_DECODERS[tag](text)
+
+
+def _dump_position(position):
+    return json.dumps({'position': [encode_value(value) for value in position]})
+
+
+def _load_position(state):
+    # Earlier versions saved a bson JSON array.
+    saved = json.loads(state)
+    if isinstance(saved, list):
+        return tuple(json_util.loads(state))
+    return tuple(decode_value(encoded) for encoded in saved['position'])
+
+
+class TableMirror:
+    """
+    Incrementally mirrors a remote table or collection into a SQLiteClient, so hot reads can be
+    served locally. Each sync() reads the rows changed since the last one, ordered by a watermark
+    column (a modification timestamp, a rowversion or an increasing id) and the key, in keyset
+    batches; rows are upserted into the local table and the watermark is saved in the same local
+    transaction, so an interrupted sync resumes where the last committed batch ended.
+
+    A row is only read if its watermark is newer than the last one seen, so the watermark must
+    follow commit order: a rowversion does, but a modification timestamp set at transaction start
+    (e.g. PostgreSQL's now()) lets a slow transaction commit a row older than rows already read,
+    which would then be skipped. For such watermarks set ``overlap`` to the longest transaction:
+    every sync re-reads that window behind the saved watermark (the upserts are idempotent).
+
+    Hard deletes are invisible to a watermark: mark deleted rows with ``deleted_column`` (rows
+    with a true value there are removed locally) or call resync() periodically.
+    """
+
+    def __init__(self, source, target, table, key, watermark, columns=None, target_table=None, where=None,
+                 params=None, deleted_column=None, batch_size=1000, name=None, overlap=None):
+        """
+        :param source: PostgresClient, MSSQLClient or MongoDBClient, the connected remote client.
+        :param target: SQLiteClient, the connected local client.
+        :param table: str or None, the remote table (or collection; defaults to the client's collection).
+        :param key: str, the unique key column or field.
+        :param watermark: str, the column or field that increases whenever a row changes.
+        :param columns: list of str or None, the mirrored columns (all columns when None; required for MongoDB).
+        :param target_table: str or None, the local table (defaults to ``table``).
+        :param where: str or dict or None, a SQL predicate or MongoDB filter restricting the mirrored rows.
+        :param params: tuple or None, parameters for a SQL ``where``.
+        :param deleted_column: str or None, a soft-delete flag column or field.
+        :param batch_size: int, the number of rows read per round trip and committed per local transaction.
+        :param name: str or None, the watermark name (defaults to the local table).
+        :param overlap: datetime.timedelta or number or None, re-read rows this far behind the saved
+            watermark on every sync (for watermarks that do not follow commit order).
+        """
+        self.is_sql = hasattr(source, 'placeholder')
+        if not self.is_sql and not columns:
+            raise ValueError("columns are required to mirror a MongoDB collection")
+        if not table and self.is_sql:
+            raise ValueError("a table is required for SQL clients")
+        self.source = source
+        self.target = target
+        self.table = table
+        self.key = key
+        self.watermark = watermark
+        self.columns = list(columns) if columns else None
+        self.target_table = target_table or table or source.collection_name
+        self.where = where
+        self.params = tuple(params or ())
+        self.deleted_column = deleted_column
+        self.batch_size = batch_size
+        self.name = name or self.target_table
+        self.overlap = overlap
+        self.rows_applied = 0
+        self._fields = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.target.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (name TEXT PRIMARY KEY, state TEXT NOT NULL)")
+        self.target.connection.commit()
+
+    def position(self):
+        """
+        :return: tuple or None, the (watermark, key) of the last mirrored row, or None before the first sync.
+        """
+        rows = self.target.fetch_data(f"SELECT state FROM {WATERMARK_TABLE} WHERE name = ?", (self.name,))
+        return _load_position(rows[0][0]) if rows else None
+
+    def sync(self, max_batches=None):
+        """
+        Copies the rows changed since the last sync.
+
+        :param max_batches: int or None, stop after this many batches (the next sync continues).
+        :return: int, the number of rows applied locally (upserted or deleted).
+        """
+        saved = position = self.position()
+        if position is not None and self.overlap:
+            # A key of None reads every row from the watermark on, see _read().
+            position = (position[0] - self.overlap, None)
+        applied = batch_count = 0
+        while max_batches is None or batch_count < max_batches:
+            fields, rows = self._read(position)
+            if not rows:
+                break
+            position = self._apply(fields, rows, saved)
+            saved = max(saved, position) if saved is not None else position
+            applied += len(rows)
+            batch_count += 1
+            if len(rows) < self.batch_size:
+                break
+        self.rows_applied += applied
+        if applied:
+            logger.info(f"Mirrored {applied} changed rows into {self.target_table}.")
+        return applied
+
+    def resync(self):
+        """
+        Empties the local table and its watermark and copies every row again, e.g. to drop rows
+        hard-deleted on the remote side.
+
+        :return: int, the number of rows copied.
+        """
+        connection = self.target.connection
+        with connection:
+            connection.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE name = ?", (self.name,))
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (self.target_table,)).fetchone():
+                connection.execute(f"DELETE FROM {self.target_table}")
+        return self.sync()
+
+    def _read(self, position):
+        if not self.is_sql:
+            return self._read_mongo(position)
+        ph = self.source.placeholder
+        clauses, params = [], ()
+        if self.where:
+            clauses.append(f"({self.where})")
+            params += self.params
+        if position is not None and position[1] is None:
+            clauses.append(f"{self.watermark} >= {ph}")
+            params += (position[0],)
+        elif position is not None:
+            clauses.append(f"({self.watermark} > {ph} OR ({self.watermark} = {ph} AND {self.key} > {ph}))")
+            params += (position[0], position[0], position[1])
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        select = ", ".join(self._selected()) if self.columns else "*"
+        order = f" ORDER BY {self.watermark}, {self.key}"
+        if ph == '%s':
+            query = f"SELECT {select} FROM {self.table}{where}{order} LIMIT %s"
+            params += (self.batch_size,)
+        else:
+            query = f"SELECT TOP ({ph}) {select} FROM {self.table}{where}{order}"
+            params = (self.batch_size,) + params
+        return self.source.fetch_data(query, params, row_factory=with_fields)
+
+    def _selected(self):
+        extra = [c for c in (self.key, self.watermark, self.deleted_column) if c and c not in self.columns]
+        return self.columns + extra
+
+    def _read_mongo(self, position):
+        collection = self.source.db[self.table] if self.table else self.source.collection
+        clauses = [self.where] if self.where else []
+        if position is not None and position[1] is None:
+            clauses.append({self.watermark: {'$gte': position[0]}})
+        elif position is not None:
+            clauses.append({'$or': [{self.watermark: {'$gt': position[0]}},
+                                    {self.watermark: position[0], self.key: {'$gt': position[1]}}]})
+        query = {'$and': clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+        fields = tuple(self._selected())
+        cursor = collection.find(query, list(fields)).sort([(self.watermark, 1), (self.key, 1)]).limit(self.batch_size)
+        return fields, [tuple(document.get(field) for field in fields) for document in cursor]
+
+    def _apply(self, fields, rows, saved):
+        fields = list(fields)
+        key_index, watermark_index = fields.index(self.key), fields.index(self.watermark)
+        deleted_index = fields.index(self.deleted_column) if self.deleted_column else None
+        stored = [f for f in fields if f != self.deleted_column]
+        if self._fields != stored:
+            self._ensure_table(stored)
+        positions = [fields.index(f) for f in stored]
+        upserts, deletes = [], []
+        for row in rows:
+            if deleted_index is not None and row[deleted_index]:
+                deletes.append((local_value(row[key_index]),))
+            else:
+                upserts.append(tuple(local_value(row[i]) for i in positions))
+        last = rows[-1]
+        position = (last[watermark_index], last[key_index])
+        # Re-read overlap rows must not move the saved watermark back.
+        state = position if saved is None or position > saved else saved
+        connection = self.target.connection
+        with connection:
+            if upserts:
+                marks = ", ".join('?' * len(stored))
+                connection.executemany(f"INSERT OR REPLACE INTO {self.target_table} ({', '.join(stored)}) "
+                                       f"VALUES ({marks})", upserts)
+            if deletes:
+                connection.executemany(f"DELETE FROM {self.target_table} WHERE {self.key} = ?", deletes)
+            connection.execute(f"INSERT OR REPLACE INTO {WATERMARK_TABLE} (name, state) VALUES (?, ?)",
+                               (self.name, _dump_position(state)))
+        return position
+
+    def _ensure_table(self, fields):
+        # Columns are declared without types; SQLite stores each value with its own type.
+        columns = ", ".join(f if f != self.key else f"{f} PRIMARY KEY" for f in fields)
+        connection = self.target.connection
+        with connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.target_table} ({columns})")
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.target_table}_{self.watermark}_idx "
+                               f"ON {self.target_table} ({self.watermark})")
+        self._fields = fields
+
+    def start(self, interval):
+        """
+        Syncs every ``interval`` seconds in a background thread. The thread uses the clients
+        given to the constructor, so do not use them elsewhere while it runs.
+
+        :param interval: float, seconds between syncs.
+        """
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error(f"Error mirroring {self.target_table}: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='table-mirror', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background sync started with start()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,7 +1,17 @@
-from pymongo import MongoClient
+from itertools import islice
+from pymongo import MongoClient, IndexModel
+from gridfs import GridFSBucket
 from .exceptions import *
 from .db import Database
+from .rows import build_rows, check_row_factory, documents_to_rows
+from .subscriptions import ChangeEvent
+from .autotune import batches
+from .blobs import ChunkedBlobReader, DEFAULT_CHUNK_SIZE
+from .export import export_batches
+from .profiles import resolve_options
+from .index_advisor import QueryShapeTracker, plan_stages, recommend_index, is_covered
 import logging
+import time
 
 
 # Configure logging
@@ -14,7 +24,7 @@ class MongoDBClient(Database):
     Manages connections to a MongoDB server and performs database operations on a default collection.
     """
 
-    def __init__(self, host, port, database, collection_name):
+    def __init__(self, host, port, database, collection_name, registry=None, profile=None, options=None):
         """
         Initializes a new instance of MongoDBClient.
         
@@ -22,21 +32,49 @@ class MongoDBClient(Database):
         :param port: int, the port number on which the MongoDB server is listening.
         :param database: str, the name of the database to use.
         :param collection: str, the default collection to use.
+        :param registry: ClientRegistry or None, share one MongoClient with every client using the same registry and server.
+        :param profile: str or None, a driver profile from profiles.PROFILES (e.g. 'analytics').
+        :param options: dict or None, MongoClient options overriding the profile (e.g. {'compressors': 'zstd'}).
         """
         self.host = host
         self.port = port
         self.database = database
         self.collection_name = collection_name
+        self.registry = registry
+        self.profile = profile
+        self.options = options
+        self.driver_settings = resolve_options('mongodb', profile, options)
+        self.fetch_size = self.driver_settings.client.get('fetch_size')
+        self.query_shapes = None
         self.collection = None
         self.client = None
         self.db = None
+        self._owner = None
+
+    @property
+    def registry_key(self):
+        """The connection identity used to share the MongoClient in a ClientRegistry."""
+        if self.driver_settings.connect:
+            # Lists (e.g. compressors) are unhashable; compare them as tuples.
+            options = ((name, tuple(value) if isinstance(value, list) else value)
+                       for name, value in self.driver_settings.connect.items())
+            return ('mongodb', self.host, self.port, tuple(sorted(options, key=str)))
+        return ('mongodb', self.host, self.port)
 
     def connect(self):
         """
         Connects to the MongoDB server using the provided credentials and selects the database and collection.
         """
         try:
-            self.client = MongoClient(self.host, self.port)
+            if self._owner is not None:
+                if self._owner.client is None:
+                    self._owner.connect()
+                self.client = self._owner.client
+            elif self.registry is not None:
+                self.client = self.registry.acquire(self.registry_key, lambda: MongoClient(
+                    self.host, self.port, **self.driver_settings.connect))
+            else:
+                self.client = MongoClient(self.host, self.port, **self.driver_settings.connect)
             self.db = self.client[self.database]
             self.collection = self.db[self.collection_name]
             logger.info(f"Connected to MongoDB at {self.host}:{self.port}")
@@ -49,10 +87,34 @@ class MongoDBClient(Database):
         """
         Closes the connection to the MongoDB server.
         """
-        if self.client:
+        if self.client and self._owner is not None:
+            self.client = self.db = self.collection = None
+            logger.info("MongoDB handle released.")
+        elif self.client and self.registry is not None:
+            self.registry.release(self.registry_key)
+            self.client = None
+            logger.info("MongoDB connection released.")
+        elif self.client:
             self.client.close()
             logger.info("MongoDB connection closed.")
 
+    def for_collection(self, collection_name, database=None):
+        """
+        Returns a lightweight client for another collection that shares this client's MongoClient.
+        The handle is connected if this client is. Closing the handle leaves the MongoClient open;
+        it belongs to this client (or, with a registry, to the registry).
+        :param collection_name: str, the collection to use.
+        :param database: str or None, the database to use (defaults to this client's database).
+        :return: MongoDBClient.
+        """
+        handle = MongoDBClient(self.host, self.port, database or self.database, collection_name,
+                               registry=self.registry, profile=self.profile, options=self.options)
+        if self.registry is None:
+            handle._owner = self
+        if self.client is not None:
+            handle.connect()
+        return handle
+
 
     def insert_data(self, document):
         """
@@ -69,15 +131,53 @@ class MongoDBClient(Database):
             raise InsertionError(f"Error inserting data: {e}")
 
         
-    def fetch_data(self, query):
+    def insert_many(self, documents, batch_size=1000, tuner=None, tuner_key=None):
+        """
+        Inserts many documents with one insert_many() round trip per batch.
+        :param documents: iterable of dict, the documents to insert.
+        :param batch_size: int, the number of documents per batch.
+        :param tuner: BatchSizeTuner or None, adapts the batch size instead of batch_size.
+        :param tuner_key: str or None, the tuner key (defaults to the collection name).
+        :return: list, the IDs of the inserted documents.
+        """
+        tuner_key = tuner_key or self.collection_name
+        inserted_ids = []
+        for batch in batches(documents, batch_size, tuner, tuner_key):
+            start = time.perf_counter()
+            try:
+                result = self.collection.insert_many(batch)
+            except Exception as e:
+                if tuner is not None:
+                    tuner.record(tuner_key, len(batch), time.perf_counter() - start, error=True)
+                logger.error(f"Error inserting data: {e}")
+                raise InsertionError(f"Error inserting data: {e}")
+            if tuner is not None:
+                tuner.record(tuner_key, len(batch), time.perf_counter() - start)
+            inserted_ids.extend(result.inserted_ids)
+        logger.info(f"Inserted {len(inserted_ids)} documents.")
+        return inserted_ids
+
+    def fetch_data(self, query, *, row_factory=None, sort=None):
         """
         Finds documents in the MongoDB collection based on a query.
         :param query: dict, the query criteria.
+        :param row_factory: str or callable or None, 'record' or 'columns' flattens documents into rows
+            sharing one header (see rows.build_rows); None returns the documents.
+        :param sort: list of (str, int) or None, the sort specification.
         :return: A list of documents that match the query.
         """
+        check_row_factory(row_factory)
         try:
-            results = self.collection.find(query)
+            if self.query_shapes is not None:
+                self.query_shapes.record(query, sort)
+            options = {} if sort is None else {'sort': sort}
+            if self.fetch_size:
+                options['batch_size'] = self.fetch_size
+            results = self.collection.find(query, **options)
             documents = [doc for doc in results]
+            if row_factory is not None and row_factory != 'tuple':
+                fields, rows = documents_to_rows(documents)
+                documents = build_rows(fields, rows, row_factory)
             logger.info(documents)
             return documents
         except FetchError as e:
@@ -86,6 +186,101 @@ class MongoDBClient(Database):
 
         
 
+    def iter_data(self, query, projection=None, batch_size=1000, row_factory=None, tuner=None, tuner_key=None):
+        """
+        Streams documents from the MongoDB collection in batches.
+        With a tuner, every batch is a separate query resuming after the last ``_id`` read, so each
+        round trip uses the size the tuner returns at that point; documents then arrive in ``_id`` order.
+        :param query: dict, the query criteria.
+        :param projection: dict or list or None, the fields to return.
+        :param batch_size: int, the number of documents per batch (also the cursor batch size).
+        :param row_factory: str or callable or None, applied to each batch (see rows.build_rows).
+        :param tuner: BatchSizeTuner or None, adapts the batch size instead of batch_size.
+        :param tuner_key: str or None, the tuner key (defaults to the collection name).
+        :return: generator of list, one list of documents per batch.
+        """
+        check_row_factory(row_factory)
+        if tuner is not None:
+            yield from self._iter_keyset(query, projection, row_factory, tuner, tuner_key or self.collection_name)
+            return
+        try:
+            cursor = self.collection.find(query, projection, batch_size=batch_size)
+        except Exception as e:
+            logger.error(f"Error fetching data: {e}")
+            raise FetchError(f"Error fetching data: {e}")
+        while True:
+            batch = list(islice(cursor, batch_size))
+            if not batch:
+                return
+            yield self._build_batch(batch, row_factory)
+
+    def _iter_keyset(self, query, projection, row_factory, tuner, tuner_key):
+        # The keyset needs _id, so fetch it even when the projection hides it and drop it afterwards.
+        hide_id = isinstance(projection, dict) and not projection.get('_id', True)
+        if hide_id:
+            projection = {field: value for field, value in projection.items() if field != '_id'}
+        last = None
+        while True:
+            size = tuner.size(tuner_key)
+            criteria = query if last is None else {'$and': [query or {}, {'_id': {'$gt': last}}]}
+            start = time.perf_counter()
+            try:
+                batch = list(self.collection.find(criteria, projection).sort('_id', 1).limit(size))
+            except Exception as e:
+                logger.error(f"Error fetching data: {e}")
+                raise FetchError(f"Error fetching data: {e}")
+            if not batch:
+                return
+            tuner.record(tuner_key, len(batch), time.perf_counter() - start)
+            last = batch[-1]['_id']
+            if hide_id:
+                for document in batch:
+                    document.pop('_id', None)
+            yield self._build_batch(batch, row_factory)
+            if len(batch) < size:
+                return
+
+    @staticmethod
+    def _build_batch(documents, row_factory):
+        if row_factory is None:
+            return documents
+        fields, rows = documents_to_rows(documents)
+        return build_rows(fields, rows, row_factory)
+
+    def export(self, query, path, format='ndjson', projection=None, compression=None, max_file_size=None, batch_size=10000):
+        """
+        Exports matching documents to NDJSON, CSV or Parquet files using a batched cursor with projection.
+        CSV and Parquet columns come from the projection, or from the first batch when no projection is given.
+        :param query: dict, the query criteria.
+        :param path: str, the output path.
+        :param format: str, one of 'ndjson', 'csv' or 'parquet'.
+        :param projection: dict or list or None, the fields to export.
+        :param compression: str or None, 'gzip', 'bz2' or 'xz' (inferred from the extension when omitted), or a Parquet codec.
+        :param max_file_size: int or None, roll to a new numbered file after this many bytes.
+        :param batch_size: int, the number of documents per batch.
+        :return: list of str, the files written.
+        """
+        documents = self.iter_data(query, projection, batch_size=batch_size)
+        if format == 'ndjson':
+            batches = ((None, batch) for batch in documents)
+        else:
+            batches = self._fixed_column_batches(documents, projection)
+        return export_batches(batches, path, format, compression, max_file_size)[1]
+
+    @staticmethod
+    def _fixed_column_batches(documents, projection):
+        fields = None
+        if isinstance(projection, dict):
+            fields = tuple(key for key, include in projection.items() if include)
+            if projection.get('_id', 1):
+                fields = ('_id',) + tuple(key for key in fields if key != '_id')
+        elif projection:
+            fields = ('_id',) + tuple(key for key in projection if key != '_id')
+        for batch in documents:
+            if fields is None:
+                fields = documents_to_rows(batch)[0]
+            yield fields, [tuple(document.get(field) for field in fields) for document in batch]
+
     def update_data(self, query, new_values):
         """
         Updates documents in the MongoDB collection based on a query.
@@ -94,6 +289,8 @@ class MongoDBClient(Database):
         :return: The count of documents updated.
         """
         try:
+            if self.query_shapes is not None:
+                self.query_shapes.record(query)
             result = self.collection.update_many(query, {'$set': new_values})
             logger.info(f"Documents updated: {result.modified_count}")
             return result.modified_count
@@ -109,6 +306,8 @@ class MongoDBClient(Database):
         :return: The count of documents deleted.
         """
         try:
+            if self.query_shapes is not None:
+                self.query_shapes.record(query)
             result = self.collection.delete_many(query)
             logger.info(f"Documents deleted: {result.deleted_count}")
             return result.deleted_count
@@ -131,6 +330,168 @@ class MongoDBClient(Database):
 
 
 
+    def count(self, target=None, filter=None, approximate=False):
+        """
+        Counts documents on the server instead of fetching them.
+        :param target: str or None, the collection (defaults to the client's collection).
+        :param filter: dict or None, the query criteria.
+        :param approximate: bool, use the collection metadata (estimated_document_count) when there is
+            no filter; filtered counts are always exact.
+        :return: int, the number of documents.
+        """
+        collection = self.db[target] if target else self.collection
+        try:
+            if approximate and not filter:
+                return collection.estimated_document_count()
+            return collection.count_documents(filter or {})
+        except Exception as e:
+            logger.error(f"Error counting documents: {e}")
+            raise FetchError(f"Error counting documents: {e}")
+
+    def replica_lag(self):
+        """
+        Returns how far the slowest secondary's optime trails the primary, for throttling bulk changes.
+        :return: float, seconds (0.0 when not a replica set member or without secondaries).
+        """
+        try:
+            status = self.client.admin.command('replSetGetStatus')
+        except Exception as e:
+            logger.debug(f"Replica set status unavailable: {e}")
+            return 0.0
+        primary = [m['optimeDate'] for m in status['members'] if m.get('stateStr') == 'PRIMARY']
+        secondaries = [m['optimeDate'] for m in status['members'] if m.get('stateStr') == 'SECONDARY']
+        if not primary or not secondaries:
+            return 0.0
+        return max(0.0, (primary[0] - min(secondaries)).total_seconds())
+
+    def subscribe(self, pipeline=None, resume_token=None, full_document=None, max_await_time_ms=None):
+        """
+        Yields change events for the collection using a MongoDB change stream.
+        Requires a replica set or sharded cluster.
+        :param pipeline: list or None, aggregation stages used to filter the change stream.
+        :param resume_token: dict or None, the resume_token of the last processed event.
+        :param full_document: str or None, e.g. 'updateLookup' to include the current document on updates.
+        :param max_await_time_ms: int or None, the maximum time the server waits for new changes per batch.
+        :return: generator of ChangeEvent.
+        """
+        try:
+            stream = self.collection.watch(pipeline=pipeline, resume_after=resume_token,
+                                           full_document=full_document, max_await_time_ms=max_await_time_ms)
+        except Exception as e:
+            logger.error(f"Error opening change stream: {e}")
+            raise OperationalError(f"Error opening change stream: {e}")
+        with stream:
+            for change in stream:
+                key = change.get('documentKey', {}).get('_id')
+                yield ChangeEvent('mongodb', change['operationType'], key, change.get('fullDocument'), change['_id'])
+
+    def open_blob(self, file_id, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Opens a GridFS file in the client's database for chunked reading.
+        :param file_id: the _id of the GridFS file.
+        :param chunk_size: int, the chunk size used by iter_chunks().
+        :return: ChunkedBlobReader.
+        """
+        try:
+            grid_out = GridFSBucket(self.db).open_download_stream(file_id)
+        except Exception as e:
+            logger.error(f"Error opening GridFS file {file_id}: {e}")
+            raise FetchError(f"Error opening GridFS file {file_id}: {e}")
+
+        def read_chunk(offset, size):
+            grid_out.seek(offset)
+            return grid_out.read(size)
+
+        return ChunkedBlobReader(read_chunk, grid_out.length, chunk_size, on_close=grid_out.close)
+
+    def write_blob(self, filename, source, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Streams a file-like source into GridFS in the client's database.
+        :param filename: str, the GridFS file name.
+        :param source: a binary file-like object to read from.
+        :param metadata: dict or None, metadata stored with the file.
+        :param chunk_size: int, the GridFS chunk size in bytes.
+        :return: The _id of the new GridFS file.
+        """
+        try:
+            file_id = GridFSBucket(self.db).upload_from_stream(filename, source, chunk_size_bytes=chunk_size,
+                                                               metadata=metadata)
+            logger.info(f"Stored GridFS file {filename} with ID: {file_id}")
+            return file_id
+        except Exception as e:
+            logger.error(f"Error writing GridFS file: {e}")
+            raise InsertionError(f"Error writing GridFS file: {e}")
+
+    def track_query_shapes(self):
+        """
+        Starts recording the filter and sort shapes of fetch_data, update_data and delete_data calls
+        for the index advisor methods below.
+        :return: QueryShapeTracker.
+        """
+        if self.query_shapes is None:
+            self.query_shapes = QueryShapeTracker()
+        return self.query_shapes
+
+    def find_collection_scans(self, sample=20):
+        """
+        Explains the most common recorded query shapes and reports those answered by a collection scan.
+        :param sample: int, the number of most common shapes to explain.
+        :return: list of dict with 'shape', 'count' and 'stages' for each shape whose plan contains COLLSCAN.
+        """
+        scans = []
+        for shape, count, query, sort in (self.query_shapes.most_common(sample) if self.query_shapes else []):
+            cursor = self.collection.find(query) if not sort else self.collection.find(query, sort=sort)
+            stages = plan_stages(cursor.explain())
+            if 'COLLSCAN' in stages:
+                scans.append({'shape': shape, 'count': count, 'stages': stages})
+        logger.info(f"Found {len(scans)} query shapes answered by collection scans.")
+        return scans
+
+    def recommend_indexes(self, sample=20):
+        """
+        Recommends compound indexes (equality, sort, range order) for recorded query shapes that
+        currently scan the collection and are not served by an existing index prefix.
+        :param sample: int, the number of most common shapes to explain.
+        :return: list of list of (str, int), the recommended index keys, most frequent shapes first.
+        """
+        existing = [info['key'] for info in self.collection.index_information().values()]
+        recommendations = []
+        for scan in self.find_collection_scans(sample):
+            keys = recommend_index(scan['shape'])
+            if keys and keys not in recommendations and not is_covered(keys, existing):
+                recommendations.append(keys)
+        return recommendations
+
+    def ensure_indexes(self, indexes):
+        """
+        Declaratively creates the given indexes, skipping those an existing index already covers.
+        :param indexes: list of list of (str, int) or IndexModel, the desired indexes.
+        :return: list of str, the names of the indexes that were created.
+        """
+        existing = [info['key'] for info in self.collection.index_information().values()]
+        missing = []
+        for index in indexes:
+            model = index if isinstance(index, IndexModel) else IndexModel(list(index))
+            if not is_covered(list(model.document['key'].items()), existing):
+                missing.append(model)
+        if not missing:
+            return []
+        try:
+            created = self.collection.create_indexes(missing)
+            logger.info(f"Created indexes: {created}")
+            return created
+        except Exception as e:
+            logger.error(f"Error creating indexes: {e}")
+            raise OperationalError(f"Error creating indexes: {e}")
+
+    def index_usage(self):
+        """
+        Reports how often each index has been used since the server started, from $indexStats.
+        :return: dict, maps index names to {'ops': int, 'since': datetime}.
+        """
+        stats = self.collection.aggregate([{'$indexStats': {}}])
+        return {stat['name']: {'ops': stat['accesses']['ops'], 'since': stat['accesses']['since']} for stat in stats}
+
     def __str__(self):
         return f"MongoDBClient(host={self.host}, port={self.port}, database={self.database}, collection={self.collection_name})"
     
@@ -1,6 +1,17 @@
+import threading
+import time
 import pyodbc
 from .exceptions import *
 from .db import Database
+from .autotune import batches
+from .batch import is_read_statement
+from .counting import counted_source, is_query, mssql_estimated_rows
+from .blobs import ChunkedBlobReader, copy_in_chunks, DEFAULT_CHUNK_SIZE
+from .export import export_batches, with_fields
+from .metadata import shared_metadata_cache, build_metadata, column_converters, convert_rows, is_ddl
+from .profiles import odbc_options, resolve_options
+from .rows import build_rows, check_row_factory
+from .subscriptions import ChangeEvent, MSSQL_OPERATIONS
 import logging
 
 # Configure logging
@@ -13,9 +24,17 @@ class MSSQLClient(Database):
     This class manages connections to a SQL Server and performs database operations.
     """
 
-    def __init__(self, host, port, user, password, database, driver):
+    placeholder = '?'
+    metadata_cache = shared_metadata_cache
+
+    def __init__(self, host, port, user, password, database, driver, registry=None, profile=None, options=None):
         """
         Initialize the MSSQL client with connection parameters.
+        param: registry: ClientRegistry or None, share one connection with every client using the same registry
+            and connection parameters. Shared clients also share transactions.
+        param: profile: str or None, a driver profile from profiles.PROFILES (e.g. 'bulk-load').
+        param: options: dict or None, ODBC attributes or client options overriding the profile
+            (e.g. {'Packet Size': 32767, 'query_timeout': 30}).
         """
         self.host = host
         self.port = port  # SQL Server default port is often 1433
@@ -23,8 +42,23 @@ class MSSQLClient(Database):
         self.password = password
         self.database = database
         self.driver = driver  # Ensure the correct ODBC driver is installed
-        self.connection_string = f'DRIVER={self.driver};SERVER={self.host},{self.port};DATABASE={self.database};UID={self.user};PWD={self.password}'
+        self.profile = profile
+        self.options = options
+        self.driver_settings = resolve_options('mssql', profile, options)
+        self.connection_string = f'DRIVER={self.driver};SERVER={self.host},{self.port};DATABASE={self.database};UID={self.user};PWD={self.password}' \
+            + odbc_options(self.driver_settings.connect)
+        self.fast_executemany = self.driver_settings.client.get('fast_executemany', True)
+        self.registry = registry
         self.connection = None
+        self._active_cursors = {}
+
+    @property
+    def registry_key(self):
+        """
+        The connection identity used to share the connection in a ClientRegistry: the connection string
+        and the client-side settings (timeouts, fast_executemany) that are not part of it.
+        """
+        return ('mssql', self.connection_string, tuple(sorted(self.driver_settings.client.items())))
 
     def connect(self):
         """
@@ -32,17 +66,34 @@ class MSSQLClient(Database):
         """
         if not self.connection:
             try:
-                self.connection = pyodbc.connect(self.connection_string)
+                if self.registry is not None:
+                    self.connection = self.registry.acquire(self.registry_key, self._open)
+                else:
+                    self.connection = self._open()
                 logger.info(f"Connected to SQL Server at {self.host}:{self.port}")
             except ConnectionError as e:
                 logger.error(f"Failed to connect to SQL Server: {e}")
                 raise ConnectionError(f"Could not connect to SQL Server: {e}")
 
+    def _open(self):
+        settings = self.driver_settings.client
+        if 'login_timeout' in settings:
+            connection = pyodbc.connect(self.connection_string, timeout=settings['login_timeout'])
+        else:
+            connection = pyodbc.connect(self.connection_string)
+        if 'query_timeout' in settings:
+            connection.timeout = settings['query_timeout']
+        return connection
+
     def close(self):
         """
         Closes the database connection if it is open.
         """
-        if self.connection and not self.connection.closed:
+        if self.connection and self.registry is not None:
+            self.registry.release(self.registry_key)
+            self.connection = None
+            logger.info("SQL Server connection released.")
+        elif self.connection and not self.connection.closed:
             self.connection.close()
             logger.info("SQL Server connection closed.")
 
@@ -59,27 +110,318 @@ class MSSQLClient(Database):
                 cursor.execute(query, params or ())
                 self.connection.commit()  # Ensure commit happens while connection is still open
                 row_count = cursor.rowcount
+                self._invalidate_on_ddl(query)
                 logger.info(f"Inserted {row_count} rows.")
                 return row_count
         except InsertionError as e:
             self.connection.rollback()
             raise InsertionError(f"Database operation failed: {e}")
         
-    def fetch_data(self, query, params=None):
+    def insert_many(self, query, rows, batch_size=1000, tuner=None, tuner_key=None):
+        """
+        Inserts many rows with fast_executemany, committing after every batch.
+        param: query: str, the parameterized INSERT statement.
+        param: rows: iterable of tuple, the parameters for each row.
+        param: batch_size: int, the number of rows per batch.
+        param: tuner: BatchSizeTuner or None, adapts the batch size instead of batch_size.
+        param: tuner_key: str or None, the tuner key, usually the table (defaults to the query).
+        return: int, the number of rows inserted.
+        """
+        tuner_key = tuner_key or query
+        total = 0
+        with self.connection.cursor() as cursor:
+            cursor.fast_executemany = self.fast_executemany
+            for batch in batches(rows, batch_size, tuner, tuner_key):
+                start = time.perf_counter()
+                try:
+                    cursor.executemany(query, batch)
+                    self.connection.commit()
+                except Exception as e:
+                    self.connection.rollback()
+                    if tuner is not None:
+                        tuner.record(tuner_key, len(batch), time.perf_counter() - start, error=True)
+                    raise InsertionError(f"Database operation failed: {e}")
+                if tuner is not None:
+                    tuner.record(tuner_key, len(batch), time.perf_counter() - start)
+                total += len(batch)
+        logger.info(f"Inserted {total} rows.")
+        return total
+
+    def fetch_data(self, query, params=None, row_factory=None, converters=None):
         """
         Fetches data from a database.
         param: query: str, the SQL query to execute.
+        param: row_factory: str or callable or None, the row representation ('tuple', 'record' or 'columns').
+        param: converters: dict or None, per-column converters by column name (see column_converters()).
         return: list, the fetched rows.
         """
+        check_row_factory(row_factory)
         with self.connection.cursor() as cursor:
+            self._active_cursors[threading.get_ident()] = cursor
             try:
                 cursor.execute(query, params or ())
                 rows = cursor.fetchall()
+                if row_factory is not None or converters:
+                    fields = [column[0] for column in cursor.description]
+                    if converters:
+                        rows = convert_rows(fields, rows, converters)
+                    rows = build_rows(fields, rows, row_factory)
                 logger.info(rows)
                 return rows
             except FetchError as e:
                 logger.error(f"Failed to fetch data: {e}")
                 raise FetchError(f"Failed to fetch data: {e}")
+            finally:
+                self._active_cursors.pop(threading.get_ident(), None)
+
+    def iter_data(self, query, params=None, batch_size=1000, row_factory=None, tuner=None, tuner_key=None):
+        """
+        Streams rows from a database in batches.
+        param: query: str, the SQL query to execute.
+        param: batch_size: int, the number of rows fetched per call to fetchmany.
+        param: row_factory: str or callable or None, applied to each batch (see rows.build_rows).
+        param: tuner: BatchSizeTuner or None, adapts the rows per fetchmany instead of batch_size.
+        param: tuner_key: str or None, the tuner key (defaults to the query).
+        return: generator of list, one list of rows per batch.
+        """
+        check_row_factory(row_factory)
+        tuner_key = tuner_key or query
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute(query, params or ())
+            except Exception as e:
+                logger.error(f"Failed to fetch data: {e}")
+                raise FetchError(f"Failed to fetch data: {e}")
+            while True:
+                size = tuner.size(tuner_key) if tuner is not None else batch_size
+                start = time.perf_counter()
+                rows = cursor.fetchmany(size)
+                if tuner is not None and rows:
+                    tuner.record(tuner_key, len(rows), time.perf_counter() - start)
+                if not rows:
+                    break
+                if row_factory is not None:
+                    rows = build_rows([column[0] for column in cursor.description], rows, row_factory)
+                yield rows
+
+    def export(self, query, path, format='csv', params=None, compression=None, max_file_size=None, batch_size=10000):
+        """
+        Exports a query result to CSV, NDJSON or Parquet files, streaming fetchmany() batches.
+        param: query: str, the SQL query whose result to export.
+        param: path: str, the output path.
+        param: format: str, one of 'csv', 'ndjson' or 'parquet'.
+        param: compression: str or None, 'gzip', 'bz2' or 'xz' (inferred from the extension when omitted), or a Parquet codec.
+        param: max_file_size: int or None, roll to a new numbered file after this many bytes.
+        param: batch_size: int, the number of rows fetched per call to fetchmany.
+        return: list of str, the files written.
+        """
+        batches = self.iter_data(query, params, batch_size=batch_size, row_factory=with_fields)
+        return export_batches(batches, path, format, compression, max_file_size)[1]
+
+    def count(self, target, filter=None, approximate=False, params=None):
+        """
+        Counts rows on the server instead of fetching them.
+        param: target: str, a table name or a SELECT query.
+        param: filter: str or None, a SQL predicate applied to the target.
+        param: approximate: bool, use statistics instead of scanning: sys.partitions for a whole table,
+            otherwise the optimizer's estimate from SHOWPLAN_XML (exact when parameters are given,
+            since estimated plans cannot be requested for parameterized statements).
+        param: params: tuple or None, parameters for the target query and filter.
+        return: int, the number of rows.
+        """
+        source = counted_source(target, filter)
+        try:
+            with self.connection.cursor() as cursor:
+                if approximate and not filter and not is_query(target):
+                    cursor.execute("SELECT SUM(rows) FROM sys.partitions WHERE object_id = OBJECT_ID(?) "
+                                   "AND index_id IN (0, 1)", (target,))
+                    row = cursor.fetchone()
+                    if row and row[0] is not None:
+                        return int(row[0])
+                if approximate and not params:
+                    cursor.execute("SET SHOWPLAN_XML ON")
+                    try:
+                        cursor.execute(f"SELECT 1 FROM {source}")
+                        estimate = mssql_estimated_rows(cursor.fetchone()[0])
+                    finally:
+                        cursor.execute("SET SHOWPLAN_XML OFF")
+                    if estimate is not None:
+                        return estimate
+                cursor.execute(f"SELECT COUNT_BIG(*) FROM {source}", params or ())
+                return int(cursor.fetchone()[0])
+        except Exception as e:
+            logger.error(f"Error counting rows: {e}")
+            raise FetchError(f"Error counting rows: {e}")
+
+    def cancel(self, thread=None):
+        """
+        Cancels a fetch running on this client.
+        param: thread: int or None, the threading.get_ident() of the fetch to cancel; None cancels every running fetch.
+        return: bool, True if a running fetch was cancelled.
+        """
+        if thread is None:
+            cursors = list(self._active_cursors.values())
+        else:
+            cursors = [cursor for cursor in (self._active_cursors.get(thread),) if cursor is not None]
+        for cursor in cursors:
+            cursor.cancel()
+        return bool(cursors)
+
+    def replica_lag(self):
+        """
+        Returns the lag of the slowest Always On secondary, for throttling bulk changes.
+        return: float, seconds (0.0 without secondaries).
+        """
+        rows = self.fetch_data("SELECT ISNULL(MAX(secondary_lag_seconds), 0) FROM sys.dm_hadr_database_replica_states")
+        return float(rows[0][0])
+
+    def subscribe(self, table_name, key_columns, resume_token=None, poll_interval=1.0):
+        """
+        Yields row changes recorded by SQL Server change tracking, polling CHANGETABLE(CHANGES ...).
+        Change tracking must be enabled on the database and the table.
+        param: table_name: str, the tracked table.
+        param: key_columns: str or list of str, the primary key columns of the table.
+        param: resume_token: int or None, the change tracking version to continue from (defaults to the current version).
+        param: poll_interval: float, seconds to sleep between polls that return no changes.
+        return: generator of ChangeEvent, the resume token is the last SYS_CHANGE_VERSION whose rows have all been yielded.
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        keys = ", ".join(f"ct.{column}" for column in key_columns)
+        query = (f"SELECT ct.SYS_CHANGE_VERSION, ct.SYS_CHANGE_OPERATION, {keys} "
+                 f"FROM CHANGETABLE(CHANGES {table_name}, ?) AS ct ORDER BY ct.SYS_CHANGE_VERSION")
+        version = resume_token
+        if version is None:
+            version = self.fetch_data("SELECT CHANGE_TRACKING_CURRENT_VERSION()")[0][0]
+        while True:
+            minimum = self.fetch_data("SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?))", (table_name,))[0][0]
+            if minimum is None or version is None or version < minimum:
+                raise OperationalError(f"Change tracking version {version} is no longer valid for {table_name}; a full resync is required.")
+            rows = self.fetch_data(query, (version,))
+            self.connection.commit()
+            for i, row in enumerate(rows):
+                # CHANGES t, v returns only versions above v, so a version becomes the resume token only
+                # with its last row; earlier rows carry the previous version and are replayed on resume.
+                if i + 1 == len(rows) or rows[i + 1][0] != row[0]:
+                    version = row[0]
+                key = row[2] if len(key_columns) == 1 else tuple(row[2:])
+                yield ChangeEvent('mssql', MSSQL_OPERATIONS.get(row[1], row[1]), key, None, version)
+            if not rows:
+                time.sleep(poll_interval)
+
+    def open_blob(self, table, column, key_column, key, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Opens a varbinary(max) value for chunked reading with SUBSTRING(), so it is never fully resident in memory.
+        param: table: str, the table holding the value.
+        param: column: str, the varbinary(max) column.
+        param: key_column: str, the column identifying the row.
+        param: key: the key of the row.
+        param: chunk_size: int, the chunk size used by iter_chunks().
+        return: ChunkedBlobReader
+        """
+        rows = self.fetch_data(f"SELECT DATALENGTH({column}) FROM {table} WHERE {key_column} = ?", (key,))
+        if not rows or rows[0][0] is None:
+            raise FetchError(f"No {column} value found in {table} for {key_column} = {key}")
+        query = f"SELECT SUBSTRING({column}, ?, ?) FROM {table} WHERE {key_column} = ?"
+
+        def read_chunk(offset, size):
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, (offset + 1, size, key))
+                return cursor.fetchone()[0]
+
+        return ChunkedBlobReader(read_chunk, rows[0][0], chunk_size)
+
+    def write_blob(self, table, column, key_column, key, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Replaces a varbinary(max) value with the contents of a file-like source, appending chunks
+        with UPDATE ... SET column.WRITE() in one transaction.
+        param: source: a binary file-like object to read from.
+        return: int, the number of bytes written.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"UPDATE {table} SET {column} = 0x WHERE {key_column} = ?", (key,))
+                written = copy_in_chunks(source, lambda offset, chunk: cursor.execute(
+                    f"UPDATE {table} SET {column}.WRITE(?, NULL, NULL) WHERE {key_column} = ?",
+                    (bytes(chunk), key)), chunk_size)
+                self.connection.commit()
+                logger.info(f"Wrote {written} bytes to {table}.{column}.")
+                return written
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to write blob: {e}")
+            raise UpdateError(f"Failed to write blob: {e}")
+
+    def table_metadata(self, table):
+        """
+        Returns the columns, types, primary key and indexes of a table, loaded once from the
+        catalog views and cached in metadata_cache until it expires or DDL runs through this client.
+        param: table: str, the table name (optionally schema-qualified).
+        return: TableMetadata
+        """
+        return self.metadata_cache.get(self.registry_key, table, lambda: self._load_table_metadata(table))
+
+    def _load_table_metadata(self, table):
+        columns = self.fetch_data(
+            "SELECT c.name, t.name FROM sys.columns c JOIN sys.types t ON t.user_type_id = c.user_type_id "
+            "WHERE c.object_id = OBJECT_ID(?) ORDER BY c.column_id", (table,))
+        indexes = self.fetch_data(
+            "SELECT i.name, i.is_primary_key, c.name FROM sys.indexes i "
+            "JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id "
+            "JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id "
+            "WHERE i.object_id = OBJECT_ID(?) AND ic.is_included_column = 0 "
+            "ORDER BY i.name, ic.key_ordinal", (table,))
+        return build_metadata(table, [tuple(row) for row in columns], [tuple(row) for row in indexes])
+
+    def column_converters(self, table, type_converters):
+        """
+        Precomputes per-column converters for a table, to pass as converters to fetch_data().
+        param: table: str, the table name.
+        param: type_converters: dict, maps SQL Server type names (e.g. 'decimal', 'datetime2') to callables.
+        return: dict, maps column names to converters.
+        """
+        return column_converters(self.table_metadata(table), type_converters)
+
+    def _invalidate_on_ddl(self, query):
+        if is_ddl(query):
+            self.metadata_cache.invalidate(self.registry_key)
+
+    def clone(self):
+        """
+        Creates a new, unconnected client with the same connection parameters.
+        return: MSSQLClient, a client that can be connected independently (e.g. in another process).
+        """
+        return MSSQLClient(self.host, self.port, self.user, self.password, self.database, self.driver,
+                           profile=self.profile, options=self.options)
+
+    def execute_batch(self, statements):
+        """
+        Executes several statements in a single round trip and reads their results with nextset().
+        Each statement must produce exactly one result (a SELECT, INSERT, UPDATE or DELETE) and
+        NOCOUNT must be OFF so that writes report their row counts.
+        param: statements: list of (str, tuple or None), the queries and their parameters.
+        return: list, the fetched rows for each read statement and a row count for each write statement.
+        """
+        query = ";\n".join(statement.strip().rstrip(';') for statement, _ in statements)
+        params = [value for _, statement_params in statements for value in (statement_params or ())]
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                results = []
+                while True:
+                    results.append(cursor.fetchall() if cursor.description else cursor.rowcount)
+                    if not cursor.nextset():
+                        break
+                if len(results) != len(statements):
+                    raise OperationalError(f"Expected {len(statements)} results from the batch, got {len(results)}.")
+                if not all(is_read_statement(statement) for statement, _ in statements):
+                    self.connection.commit()
+                logger.info(f"Executed a batch of {len(statements)} statements.")
+                return results
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to execute batch: {e}")
+            raise OperationalError(f"Failed to execute batch: {e}")
 
     def update_data(self, query, params=None):
         """
@@ -93,6 +435,7 @@ class MSSQLClient(Database):
                 cursor.execute(query, params or ())
                 self.connection.commit()  # Ensure commit happens while connection is still open
                 row_count = cursor.rowcount
+                self._invalidate_on_ddl(query)
                 logger.info(f"Updated {row_count} rows.")
                 return row_count
         except InsertionError as e:
@@ -112,6 +455,7 @@ class MSSQLClient(Database):
                 cursor.execute(query, params or ())
                 self.connection.commit()  # Ensure commit happens while connection is still open
                 row_count = cursor.rowcount
+                self._invalidate_on_ddl(query)
                 logger.info(f"Deleted {row_count} rows.")
                 return row_count
         except InsertionError as e:
@@ -120,14 +464,20 @@ class MSSQLClient(Database):
 
 
 
-    def delete_all_data(self, table_name):
+    def delete_all_data(self, table_name, truncate=False):
         """
         Deletes all data from a specified table.
         param: table_name: str, the name of the table to delete all rows from.
+        param: truncate: bool, use TRUNCATE TABLE, which is minimally logged and returns -1 as the row count.
         return: int, the number of rows deleted.
         """
         try:
             with self.connection.cursor() as cursor:
+                if truncate:
+                    cursor.execute(f"TRUNCATE TABLE {table_name}")
+                    self.connection.commit()
+                    logger.info(f"Truncated {table_name}.")
+                    return -1
                 query = f"DELETE FROM {table_name}"
                 cursor.execute(query)
                 row_count = cursor.rowcount
@@ -0,0 +1,279 @@
+from collections import namedtuple
+import json
+import logging
+import os
+import tempfile
+import time
+
+from bson import json_util
+
+from .mirror import decode_value, encode_value
+
+logger = logging.getLogger(__name__)
+
+MutationProgress = namedtuple('MutationProgress', ['affected', 'chunks', 'last_key', 'elapsed', 'done'])
+MutationProgress.__doc__ = """
+Progress of a ChunkedMutationRunner, passed to its ``on_progress`` callback after every chunk.
+
+affected: int, rows or documents changed so far (including runs resumed from a checkpoint).
+chunks: int, chunks committed so far.
+last_key: the highest key processed so far, or None before the first chunk.
+elapsed: float, seconds spent in this run.
+done: bool, True once the whole key space has been walked.
+"""
+
+
+class LatencyThrottle:
+    """
+    Pauses between chunks when a chunk takes longer than ``target`` seconds, giving the server
+    (and its replicas) time to catch up in proportion to how far the chunk overran.
+    """
+
+    def __init__(self, target=0.5, factor=1.0, max_pause=10.0, sleep=time.sleep):
+        """
+        :param target: float, the acceptable chunk duration in seconds.
+        :param factor: float, seconds of pause per second of overrun.
+        :param max_pause: float, the longest single pause.
+        :param sleep: callable, used to pause.
+        """
+        self.target = target
+        self.factor = factor
+        self.max_pause = max_pause
+        self._sleep = sleep
+
+    def __call__(self, duration):
+        """
+        :param duration: float, the duration of the last chunk in seconds.
+        :return: float, the seconds paused.
+        """
+        pause = min(self.max_pause, (duration - self.target) * self.factor)
+        if pause <= 0:
+            return 0.0
+        self._sleep(pause)
+        return pause
+
+
+class ReplicaLagThrottle:
+    """
+    Blocks between chunks until replication lag, as reported by ``probe``, is back under ``max_lag``.
+    Use a client's ``replica_lag`` method as the probe.
+    """
+
+    def __init__(self, probe, max_lag=5.0, poll_interval=1.0, max_wait=None, sleep=time.sleep, clock=time.monotonic):
+        """
+        :param probe: callable, returns the current replication lag in seconds (or None when unknown).
+        :param max_lag: float, the lag above which the runner waits.
+        :param poll_interval: float, seconds between probes while waiting.
+        :param max_wait: float or None, give up waiting (and continue) after this many seconds.
+        :param sleep: callable, used to pause.
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.probe = probe
+        self.max_lag = max_lag
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._sleep = sleep
+        self._clock = clock
+
+    def __call__(self, duration):
+        """
+        :param duration: float, the duration of the last chunk in seconds (unused).
+        :return: float, the seconds waited.
+        """
+        start = self._clock()
+        while True:
+            lag = self.probe()
+            waited = self._clock() - start
+            if lag is None or lag <= self.max_lag:
+                return waited
+            if self.max_wait is not None and waited >= self.max_wait:
+                logger.warning(f"Replication lag still {lag:.1f}s after waiting {waited:.1f}s; continuing.")
+                return waited
+            logger.info(f"Replication lag {lag:.1f}s exceeds {self.max_lag}s; pausing.")
+            self._sleep(self.poll_interval)
+
+
+class ChunkedMutationRunner:
+    """
+    Deletes or updates a large table in bounded key ranges, committing after every chunk so locks,
+    transaction log growth and replica apply stay small. The runner walks the key column in order
+    (keyset pagination), optionally throttles between chunks, reports progress and can resume
+    from a checkpoint file after an interruption.
+
+    Works with PostgresClient and MSSQLClient (``where`` is SQL, ``key_column`` an indexed, ideally
+    unique column) and MongoDBClient (``where`` is a filter, the key defaults to ``_id``).
+    """
+
+    def __init__(self, client, table=None, key_column=None, where=None, params=None, batch_size=5000,
+                 throttle=None, on_progress=None, checkpoint=None, clock=time.monotonic):
+        """
+        :param client: PostgresClient, MSSQLClient or MongoDBClient, a connected client.
+        :param table: str or None, the table (or collection; defaults to the MongoDB client's collection).
+        :param key_column: str or None, the column the chunks are cut on (required for SQL).
+        :param where: str or dict or None, restricts the rows to change (a SQL predicate or MongoDB filter).
+        :param params: tuple or None, parameters for a SQL ``where``.
+        :param batch_size: int, the maximum number of rows changed per chunk.
+        :param throttle: callable or None, called with each chunk's duration and may pause
+            (see LatencyThrottle and ReplicaLagThrottle).
+        :param on_progress: callable or None, called with a MutationProgress after every chunk.
+        :param checkpoint: str or None, a file recording the last committed key; an existing
+            checkpoint is resumed and the file is removed when the run completes.
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.client = client
+        self.is_sql = hasattr(client, 'placeholder')
+        if self.is_sql and not (table and key_column):
+            raise ValueError("table and key_column are required for SQL clients")
+        self.table = table
+        self.key_column = key_column or '_id'
+        self.where = where
+        self.params = tuple(params or ())
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.on_progress = on_progress
+        self.checkpoint = checkpoint
+        self._clock = clock
+
+    def delete(self):
+        """
+        Deletes the matching rows chunk by chunk.
+
+        :return: int, the number of rows deleted.
+        """
+        return self._run('delete', None, ())
+
+    def update(self, changes, params=None):
+        """
+        Updates the matching rows chunk by chunk.
+
+        :param changes: str or dict, a SQL SET clause (e.g. "status = %s") or the MongoDB values to $set.
+        :param params: tuple or None, parameters for a SQL SET clause.
+        :return: int, the number of rows updated.
+        """
+        return self._run('update', changes, tuple(params or ()))
+
+    def delete_all(self, truncate=True):
+        """
+        Empties the table. Without a ``where`` restriction SQL tables are truncated, which is
+        minimally logged and takes one short lock; otherwise this is the same as ``delete()``.
+
+        :param truncate: bool, allow the TRUNCATE fast path.
+        :return: int, the number of rows deleted (-1 when truncated and the count is unknown).
+        """
+        if truncate and self.is_sql and not self.where:
+            return self.client.delete_all_data(self.table, truncate=True)
+        return self.delete()
+
+    def _run(self, operation, changes, change_params):
+        state = self._load_checkpoint(operation)
+        last_key, affected, chunks = state['last_key'], state['affected'], state['chunks']
+        start = self._clock()
+        while True:
+            chunk_start = self._clock()
+            upper = self._next_bound(last_key)
+            if upper is None:
+                break
+            affected += self._apply(operation, changes, change_params, last_key, upper)
+            chunks += 1
+            last_key = upper
+            self._save_checkpoint(operation, last_key, affected, chunks)
+            self._report(affected, chunks, last_key, start, False)
+            if self.throttle is not None:
+                self.throttle(self._clock() - chunk_start)
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self._report(affected, chunks, last_key, start, True)
+        logger.info(f"Chunked {operation} changed {affected} rows in {chunks} chunks.")
+        return affected
+
+    def _report(self, affected, chunks, last_key, start, done):
+        if self.on_progress is not None:
+            self.on_progress(MutationProgress(affected, chunks, last_key, self._clock() - start, done))
+
+    def _next_bound(self, last_key):
+        if not self.is_sql:
+            cursor = self._collection().find(self._mongo_filter({'$gt': last_key} if last_key is not None else None),
+                                             {self.key_column: 1})
+            keys = [document[self.key_column] for document in cursor.sort(self.key_column, 1).limit(self.batch_size)]
+            return keys[-1] if keys else None
+        ph = self.client.placeholder
+        predicate, params = self._sql_predicate(last_key, None)
+        if ph == '?':
+            query = (f"SELECT MAX({self.key_column}) FROM (SELECT TOP ({ph}) {self.key_column} FROM {self.table}"
+                     f" WHERE {predicate} ORDER BY {self.key_column}) AS chunk")
+            params = (self.batch_size,) + params
+        else:
+            query = (f"SELECT MAX({self.key_column}) FROM (SELECT {self.key_column} FROM {self.table}"
+                     f" WHERE {predicate} ORDER BY {self.key_column} LIMIT {ph}) AS chunk")
+            params = params + (self.batch_size,)
+        rows = self.client.fetch_data(query, params)
+        return rows[0][0] if rows else None
+
+    def _apply(self, operation, changes, change_params, last_key, upper):
+        if not self.is_sql:
+            bounds = {'$lte': upper} if last_key is None else {'$gt': last_key, '$lte': upper}
+            if operation == 'delete':
+                return self._collection().delete_many(self._mongo_filter(bounds)).deleted_count
+            return self._collection().update_many(self._mongo_filter(bounds), {'$set': changes}).modified_count
+        predicate, params = self._sql_predicate(last_key, upper)
+        if operation == 'delete':
+            return self.client.delete_data(f"DELETE FROM {self.table} WHERE {predicate}", params)
+        return self.client.update_data(f"UPDATE {self.table} SET {changes} WHERE {predicate}", change_params + params)
+
+    def _sql_predicate(self, last_key, upper):
+        ph = self.client.placeholder
+        clauses, params = [], ()
+        if last_key is not None:
+            clauses.append(f"{self.key_column} > {ph}")
+            params += (last_key,)
+        if upper is not None:
+            clauses.append(f"{self.key_column} <= {ph}")
+            params += (upper,)
+        if self.where:
+            clauses.append(f"({self.where})")
+            params += self.params
+        return ' AND '.join(clauses) or '1 = 1', params
+
+    def _mongo_filter(self, bounds):
+        clauses = [self.where] if self.where else []
+        if bounds:
+            clauses.append({self.key_column: bounds})
+        if not clauses:
+            return {}
+        return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+    def _collection(self):
+        return self.client.db[self.table] if self.table else self.client.collection
+
+    def _load_checkpoint(self, operation):
+        state = {'last_key': None, 'affected': 0, 'chunks': 0}
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as checkpoint:
+                text = checkpoint.read()
+            saved = json.loads(text)
+            if saved.get('typed'):
+                saved['last_key'] = decode_value(saved['last_key'])
+            else:
+                # Earlier versions saved the whole checkpoint with bson json_util.
+                saved = json_util.loads(text)
+            if (saved.get('operation'), saved.get('table'), saved.get('key_column')) != \
+                    (operation, self.table, self.key_column):
+                raise ValueError(f"checkpoint {self.checkpoint} belongs to a different run")
+            state.update((key, saved[key]) for key in state)
+            logger.info(f"Resuming chunked {operation} after key {state['last_key']}.")
+        return state
+
+    def _save_checkpoint(self, operation, last_key, affected, chunks):
+        if not self.checkpoint:
+            return
+        # The key is saved with its type (UUID, Decimal, datetimes with microseconds and offset).
+        descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(self.checkpoint) + '.', suffix='.tmp',
+                                                 dir=os.path.dirname(self.checkpoint) or '.')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as checkpoint:
+                json.dump({'operation': operation, 'table': self.table, 'key_column': self.key_column, 'typed': True,
+                           'last_key': encode_value(last_key), 'affected': affected, 'chunks': chunks}, checkpoint)
+            os.replace(temporary, self.checkpoint)
+        except BaseException:
+            os.unlink(temporary)
+            raise
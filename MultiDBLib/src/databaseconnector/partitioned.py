@@ -0,0 +1,284 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+from .exceptions import FetchError
+from .export import numbered_path
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('range', 'modulo', 'ctid')
+
+
+def _read_partition(client, query, params, batch_size, map_func, combine_func, initial):
+    """
+    Reads and folds one partition in a worker process using its own client connection.
+
+    :param client: Database, an unconnected SQL client (see ``clone()``).
+    :param query: str, the partition query.
+    :param params: tuple, parameters for the partition query.
+    :param batch_size: int, the number of rows fetched per round trip.
+    :param map_func: callable, applied to every batch in the worker.
+    :param combine_func: callable, folds mapped batches into one partial result.
+    :param initial: the identity value for ``combine_func``.
+    :return: the partition's partial result.
+    """
+    client.connect()
+    try:
+        result = initial
+        for batch in client.iter_data(query, params, batch_size=batch_size):
+            result = combine_func(result, map_func(batch))
+        return result
+    finally:
+        client.close()
+
+
+def _spill_partition(client, query, params, batch_size, directory):
+    """
+    Reads one partition in a worker process and writes its batches, one pickle each, to a spill
+    file, so neither the worker nor the parent holds more than a batch at a time.
+
+    :param directory: str, the directory the spill file is created in.
+    :return: str, the spill file.
+    """
+    client.connect()
+    try:
+        descriptor, path = tempfile.mkstemp(prefix='partition-', suffix='.pickle', dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as spill:
+                for batch in client.iter_data(query, params, batch_size=batch_size):
+                    pickle.dump(batch, spill, pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path
+    finally:
+        client.close()
+
+
+def _read_spill(path):
+    with open(path, 'rb') as spill:
+        while True:
+            try:
+                yield pickle.load(spill)
+            except EOFError:
+                return
+
+
+def _export_partition(client, query, params, batch_size, path, format, compression, max_file_size):
+    """
+    Exports one partition in a worker process using its own client connection.
+
+    :return: list of str, the files written.
+    """
+    client.connect()
+    try:
+        return client.export(query, path, format=format, params=params, compression=compression,
+                             max_file_size=max_file_size, batch_size=batch_size)
+    finally:
+        client.close()
+
+
+class PartitionedReader:
+    """
+    Splits a PostgreSQL or SQL Server table into partitions and reads them in parallel worker processes.
+    Each worker opens its own connection, so driver decoding and row processing scale with the number of cores.
+    """
+
+    def __init__(self, client, table, partitions=None, strategy='range', key_column=None, columns='*',
+                 where=None, params=None, lower=None, upper=None, batch_size=10000, max_workers=None,
+                 executor=None, spill_dir=None):
+        """
+        Initializes a new PartitionedReader.
+
+        :param client: PostgresClient or MSSQLClient, supplies connection parameters and bound lookups.
+        :param table: str, the table to scan.
+        :param partitions: int or None, the number of partitions (defaults to the number of CPUs).
+        :param strategy: str, one of 'range' (key ranges), 'modulo' (key modulo K) or 'ctid' (PostgreSQL page ranges).
+        :param key_column: str or None, the integer key column used by the 'range' and 'modulo' strategies.
+        :param columns: str, the select list.
+        :param where: str or None, an extra predicate applied to every partition.
+        :param params: tuple or None, parameters for ``where``.
+        :param lower: int or None, the lowest key for 'range'; looked up with MIN() when omitted.
+        :param upper: int or None, the highest key for 'range'; looked up with MAX() when omitted.
+        :param batch_size: int, the number of rows fetched per round trip in each worker.
+        :param max_workers: int or None, the size of the process pool and the number of partitions read at once.
+        :param executor: concurrent.futures.Executor or None, an executor to use instead of a private process pool.
+        :param spill_dir: str or None, where iter_batches() spills partitions (defaults to the system temp directory).
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategy must be one of {STRATEGIES}")
+        if strategy in ('range', 'modulo') and not key_column:
+            raise ValueError(f"key_column is required for the '{strategy}' strategy")
+        if strategy == 'ctid' and client.placeholder != '%s':
+            raise ValueError("the 'ctid' strategy is only supported for PostgreSQL")
+        self.client = client
+        self.table = table
+        self.partitions = partitions or os.cpu_count() or 1
+        self.strategy = strategy
+        self.key_column = key_column
+        self.columns = columns
+        self.where = where
+        self.params = tuple(params or ())
+        self.lower = lower
+        self.upper = upper
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.executor = executor
+        self.spill_dir = spill_dir
+
+    def partition_queries(self):
+        """
+        Builds one query per partition.
+
+        :return: list of (str, tuple), the query and parameters for each partition.
+        """
+        ph = self.client.placeholder
+        predicates = []
+        if self.strategy == 'range':
+            lower, upper = self._key_bounds()
+            if lower is None:
+                return []
+            step = max(1, -(-(upper - lower + 1) // self.partitions))
+            start = lower
+            while start <= upper:
+                end = start + step
+                if end > upper:
+                    predicates.append((f"{self.key_column} >= {ph} AND {self.key_column} <= {ph}", (start, upper)))
+                else:
+                    predicates.append((f"{self.key_column} >= {ph} AND {self.key_column} < {ph}", (start, end)))
+                start = end
+        elif self.strategy == 'modulo':
+            # psycopg2 treats a bare % as a format character in queries with parameters.
+            mod = '%%' if ph == '%s' else '%'
+            for i in range(self.partitions):
+                predicates.append((f"ABS({self.key_column} {mod} {ph}) = {ph}", (self.partitions, i)))
+        else:
+            pages = self._relpages()
+            step = max(1, -(-pages // self.partitions))
+            for i in range(self.partitions):
+                start = f"({i * step},0)"
+                if i == self.partitions - 1:
+                    predicates.append(("ctid >= %s::tid", (start,)))
+                else:
+                    predicates.append(("ctid >= %s::tid AND ctid < %s::tid", (start, f"({(i + 1) * step},0)")))
+
+        queries = []
+        for predicate, predicate_params in predicates:
+            query = f"SELECT {self.columns} FROM {self.table} WHERE {predicate}"
+            if self.where:
+                query += f" AND ({self.where})"
+            queries.append((query, predicate_params + self.params))
+        return queries
+
+    def iter_batches(self):
+        """
+        Reads all partitions in parallel and yields their rows in batches as partitions complete.
+        Workers spill their batches to a file in ``spill_dir`` that is read back one batch at a
+        time and removed, so memory holds a batch per worker rather than the table (the disk needs
+        room for up to ``max_workers`` partitions).
+
+        :return: generator of list, one list of rows per batch.
+        """
+        directory = tempfile.mkdtemp(prefix='multidb-partitions-', dir=self.spill_dir)
+        jobs = [(_spill_partition, (self.client.clone(), query, params, self.batch_size, directory))
+                for query, params in self.partition_queries()]
+        paths = self._run(jobs)
+        try:
+            for path in paths:
+                try:
+                    yield from _read_spill(path)
+                finally:
+                    os.remove(path)
+        finally:
+            paths.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def reduce(self, map_func, combine_func, initial=None):
+        """
+        Maps every batch and folds the results in the workers, then combines the partition results.
+        ``map_func`` and ``combine_func`` must be picklable (module-level functions) and ``combine_func``
+        must be associative with ``initial`` as its identity.
+
+        :param map_func: callable, receives a list of rows and returns a partial result.
+        :param combine_func: callable, combines two partial results.
+        :param initial: the identity value for ``combine_func``.
+        :return: the combined result over the whole table.
+        """
+        result = initial
+        jobs = [(_read_partition, (self.client.clone(), query, params, self.batch_size, map_func, combine_func, initial))
+                for query, params in self.partition_queries()]
+        for partial in self._run(jobs):
+            result = combine_func(result, partial)
+        return result
+
+    def export(self, path, format='csv', compression=None, max_file_size=None):
+        """
+        Exports every partition in parallel to its own file (or set of rolled files). The partition
+        number is added to the file name, e.g. orders.csv.gz becomes orders-part-0003.csv.gz.
+
+        :param path: str, the base output path.
+        :param format: str, one of 'csv', 'ndjson' or 'parquet'.
+        :param compression: str or None, see export.export_batches.
+        :param max_file_size: int or None, roll each partition's output after this many bytes.
+        :return: list of str, the files written.
+        """
+        jobs = [(_export_partition, (self.client.clone(), query, params, self.batch_size,
+                                     numbered_path(path, f"part-{i:04d}"), format, compression, max_file_size))
+                for i, (query, params) in enumerate(self.partition_queries())]
+        paths = []
+        for partition_paths in self._run(jobs):
+            paths.extend(partition_paths)
+        return sorted(paths)
+
+    def _run(self, jobs):
+        # At most max_workers partitions are in flight, and a result is dropped once it is yielded.
+        limit = self.max_workers or self.partitions
+        executor = self.executor or ProcessPoolExecutor(max_workers=limit)
+        logger.info(f"Reading {self.table} in {len(jobs)} partitions using the '{self.strategy}' strategy.")
+        jobs = iter(jobs)
+        pending = set()
+        try:
+            while True:
+                for func, args in jobs:
+                    pending.add(executor.submit(func, *args))
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                while done:
+                    future = done.pop()
+                    try:
+                        result = future.result()
+                    except FetchError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Error reading partition: {e}")
+                        raise FetchError(f"Error reading partition: {e}")
+                    del future
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            if self.executor is None:
+                executor.shutdown(wait=True)
+
+    def _key_bounds(self):
+        lower, upper = self.lower, self.upper
+        if lower is None or upper is None:
+            query = f"SELECT MIN({self.key_column}), MAX({self.key_column}) FROM {self.table}"
+            if self.where:
+                query += f" WHERE {self.where}"
+            rows = self.client.fetch_data(query, self.params or None)
+            found_lower, found_upper = rows[0][0], rows[0][1]
+            lower = found_lower if lower is None else lower
+            upper = found_upper if upper is None else upper
+        return lower, upper
+
+    def _relpages(self):
+        rows = self.client.fetch_data("SELECT relpages FROM pg_class WHERE oid = %s::regclass", (self.table,))
+        return max(1, rows[0][0] if rows else 1)
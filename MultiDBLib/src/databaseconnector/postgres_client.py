@@ -1,6 +1,21 @@
+import os
+import select
+import time
+import uuid
 import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_batch
 from .exceptions import *
 from .db import Database
+from .autotune import batches
+from .batch import is_read_statement
+from .counting import counted_source, is_query
+from .blobs import ChunkedBlobReader, copy_in_chunks, DEFAULT_CHUNK_SIZE
+from .export import export_batches, open_output, resolve_compression, with_fields
+from .metadata import shared_metadata_cache, build_metadata, column_converters, convert_rows, is_ddl
+from .profiles import libpq_options, resolve_options
+from .rows import build_rows, check_row_factory
+from .subscriptions import parse_notification
 import logging
 
 # Configure logging
@@ -13,20 +28,47 @@ class PostgresClient(Database):
     This class manages connections to a PostgreSQL server and performs database operations.
     """
 
-    def __init__(self, host, port, user, password, database):
+    placeholder = '%s'
+    metadata_cache = shared_metadata_cache
+
+    def __init__(self, host, port, user, password, database, registry=None, profile=None, options=None):
         """
         Initialize the PostgreSQL client with connection parameters.
+
+        :param registry: ClientRegistry or None, share one connection with every client using the same registry
+            and connection parameters. Shared clients also share transactions.
+        :param profile: str or None, a driver profile from profiles.PROFILES (e.g. 'oltp-low-latency').
+        :param options: dict or None, libpq options overriding the profile (e.g. {'keepalives_idle': 30}).
         """
-        self.connection_string = f"host={host} port={port} user={user} password={password} dbname={database}"
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+        self.profile = profile
+        self.options = options
+        self.driver_settings = resolve_options('postgres', profile, options)
+        self.connection_string = f"host={host} port={port} user={user} password={password} dbname={database}" \
+            + libpq_options(self.driver_settings.connect)
+        self.registry = registry
         self.connection = None
 
+    @property
+    def registry_key(self):
+        """The connection identity used to share the connection in a ClientRegistry."""
+        return ('postgres', self.connection_string)
+
     def connect(self):
         """
         Establishes a database connection.
         """
         if self.connection is None:
             try:
-                self.connection = psycopg2.connect(self.connection_string)
+                if self.registry is not None:
+                    self.connection = self.registry.acquire(self.registry_key,
+                                                            lambda: psycopg2.connect(self.connection_string))
+                else:
+                    self.connection = psycopg2.connect(self.connection_string)
                 logger.info(f"Connected to PostgreSQL")
             except ConnectionError as e:
                 logger.error(f"Failed to connect to PostgreSQL: {e}")
@@ -39,7 +81,10 @@ class PostgresClient(Database):
         if self.connection:
             try:
 
-                self.connection.close()
+                if self.registry is not None:
+                    self.registry.release(self.registry_key)
+                else:
+                    self.connection.close()
                 self.connection = None
                 logger.info("PostgreSQL connection closed.")
             except ConnectionError as e:
@@ -62,6 +107,7 @@ class PostgresClient(Database):
             self.connection.commit()
             row_count = cursor.rowcount
             cursor.close()
+            self._invalidate_on_ddl(query)
             logger.info(f"Inserted {row_count} rows into the database.")
             return row_count
         except InsertionError as e:
@@ -69,26 +115,411 @@ class PostgresClient(Database):
             raise InsertionError(f"Error inserting data: {e}")
 
 
-    def fetch_data(self, query, params=None):
+    def insert_many(self, query, rows, batch_size=1000, tuner=None, tuner_key=None):
+        """
+        Inserts many rows, sending each batch in one round trip and committing after every batch.
+
+        :param query: str, the parameterized INSERT statement.
+        :param rows: iterable of tuple, the parameters for each row.
+        :param batch_size: int, the number of rows per batch.
+        :param tuner: BatchSizeTuner or None, adapts the batch size instead of ``batch_size``.
+        :param tuner_key: str or None, the tuner key, usually the table (defaults to the query).
+        :return: int, the number of rows inserted.
+        """
+        tuner_key = tuner_key or query
+        total = 0
+        cursor = self.connection.cursor()
+        try:
+            for batch in batches(rows, batch_size, tuner, tuner_key):
+                start = time.perf_counter()
+                try:
+                    execute_batch(cursor, query, batch, page_size=len(batch))
+                    self.connection.commit()
+                except Exception as e:
+                    self.connection.rollback()
+                    if tuner is not None:
+                        tuner.record(tuner_key, len(batch), time.perf_counter() - start, error=True)
+                    logger.error(f"Error inserting data: {e}")
+                    raise InsertionError(f"Error inserting data: {e}")
+                if tuner is not None:
+                    tuner.record(tuner_key, len(batch), time.perf_counter() - start)
+                total += len(batch)
+        finally:
+            cursor.close()
+        logger.info(f"Inserted {total} rows into the database.")
+        return total
+
+    def fetch_data(self, query, params=None, row_factory=None, converters=None):
         """
         Fetches data from a PostgreSQL database.
         
         :param query: str, the SQL query string to execute for fetching data.
         :param params: tuple or None, parameters for the SQL query to ensure safe queries.
+        :param row_factory: str or callable or None, the row representation ('tuple', 'record' or 'columns', see rows.build_rows).
+        :param converters: dict or None, per-column converters by column name (see column_converters()).
         :return: list of tuple, the rows fetched from the database.
         """
+        check_row_factory(row_factory)
         try:
 
             cursor = self.connection.cursor()
             cursor.execute(query, params)
             rows = cursor.fetchall()
+            if row_factory is not None or converters:
+                fields = [column[0] for column in cursor.description]
+                if converters:
+                    rows = convert_rows(fields, rows, converters)
+                rows = build_rows(fields, rows, row_factory)
             cursor.close()
             logger.info(rows)
             return rows
         except FetchError as e:
             logger.error(f"Error fetching data: {e}")
             raise FetchError(f"Error fetching data: {e}")
+        except Exception:
+            # Any error, including a cancelled hedged read, aborts the transaction; roll back so
+            # later statements on this connection do not fail.
+            self.connection.rollback()
+            raise
+
+
+    def iter_data(self, query, params=None, batch_size=1000, row_factory=None, tuner=None, tuner_key=None):
+        """
+        Streams rows from a PostgreSQL database in batches using a server-side cursor.
+
+        :param query: str, the SQL query string to execute for fetching data.
+        :param params: tuple or None, parameters for the SQL query to ensure safe queries.
+        :param batch_size: int, the number of rows fetched per round trip.
+        :param row_factory: str or callable or None, applied to each batch (see rows.build_rows).
+        :param tuner: BatchSizeTuner or None, adapts the rows fetched per round trip instead of ``batch_size``.
+        :param tuner_key: str or None, the tuner key (defaults to the query).
+        :return: generator of list of tuple, one list per batch.
+        """
+        check_row_factory(row_factory)
+        tuner_key = tuner_key or query
+        try:
+            cursor = self.connection.cursor(name=f"multidb_{uuid.uuid4().hex}")
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+        except Exception as e:
+            logger.error(f"Error fetching data: {e}")
+            raise FetchError(f"Error fetching data: {e}")
+        try:
+            while True:
+                size = tuner.size(tuner_key) if tuner is not None else batch_size
+                start = time.perf_counter()
+                rows = cursor.fetchmany(size)
+                if tuner is not None and rows:
+                    tuner.record(tuner_key, len(rows), time.perf_counter() - start)
+                if not rows:
+                    break
+                if row_factory is not None:
+                    rows = build_rows([column[0] for column in cursor.description], rows, row_factory)
+                yield rows
+        finally:
+            cursor.close()
+
+    def export(self, query, path, format='csv', params=None, compression=None, max_file_size=None, batch_size=10000):
+        """
+        Exports a query result to CSV, NDJSON or Parquet files. Unrolled CSV is streamed straight from
+        COPY ... TO STDOUT into the (optionally compressed) file; other formats stream batches from a
+        server-side cursor.
+
+        :param query: str, the SQL query whose result to export.
+        :param path: str, the output path.
+        :param format: str, one of 'csv', 'ndjson' or 'parquet'.
+        :param params: tuple or None, parameters for the SQL query.
+        :param compression: str or None, 'gzip', 'bz2' or 'xz' (inferred from the extension when omitted),
+            or a Parquet codec such as 'zstd'.
+        :param max_file_size: int or None, roll to a new numbered file after this many bytes.
+        :param batch_size: int, the number of rows fetched per round trip.
+        :return: list of str, the files written.
+        """
+        if format == 'csv' and max_file_size is None:
+            cursor = self.connection.cursor()
+            try:
+                statement = cursor.mogrify(query, params).decode().strip().rstrip(';')
+                with open_output(path, resolve_compression(path, compression)) as output:
+                    cursor.copy_expert(f"COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER true)", output)
+                logger.info(f"Exported {cursor.rowcount} rows to {path}.")
+                return [path]
+            except Exception as e:
+                self.connection.rollback()
+                if os.path.exists(path):
+                    os.remove(path)
+                logger.error(f"Error exporting data: {e}")
+                raise FetchError(f"Error exporting data: {e}")
+            finally:
+                cursor.close()
+        batches = self.iter_data(query, params, batch_size=batch_size, row_factory=with_fields)
+        return export_batches(batches, path, format, compression, max_file_size)[1]
+
+    def count(self, target, filter=None, approximate=False, params=None):
+        """
+        Counts rows on the server instead of fetching them.
+
+        :param target: str, a table name or a SELECT query.
+        :param filter: str or None, a SQL predicate applied to the target.
+        :param approximate: bool, use statistics instead of scanning: pg_class.reltuples for a whole
+            table, otherwise the planner's row estimate from EXPLAIN.
+        :param params: tuple or None, parameters for the target query and filter.
+        :return: int, the number of rows.
+        """
+        source = counted_source(target, filter)
+        try:
+            cursor = self.connection.cursor()
+            if not approximate:
+                cursor.execute(f"SELECT COUNT(*) FROM {source}", params)
+                count = cursor.fetchone()[0]
+            else:
+                count = None
+                if not filter and not is_query(target):
+                    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", (target,))
+                    row = cursor.fetchone()
+                    # reltuples is -1 (or 0 on older servers) until the table has been vacuumed or analyzed.
+                    count = row[0] if row and row[0] > 0 else None
+                if count is None:
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {source}", params)
+                    count = cursor.fetchone()[0][0]['Plan']['Plan Rows']
+            cursor.close()
+            return int(count)
+        except Exception as e:
+            logger.error(f"Error counting rows: {e}")
+            raise FetchError(f"Error counting rows: {e}")
+
+    def cancel(self, thread=None):
+        """
+        Cancels the statement currently running on this client's connection. A connection runs one
+        statement at a time, so ``thread`` is not needed.
+
+        :return: bool, True if a cancel request was sent.
+        """
+        if self.connection is None:
+            return False
+        self.connection.cancel()
+        return True
+
+    def replica_lag(self):
+        """
+        Returns the replay lag of the slowest streaming replica, for throttling bulk changes.
+
+        :return: float, seconds (0.0 without replicas).
+        """
+        rows = self.fetch_data("SELECT COALESCE(EXTRACT(EPOCH FROM MAX(replay_lag)), 0) FROM pg_stat_replication")
+        return float(rows[0][0])
+
+    def subscribe(self, channels, resume_token=None, poll_timeout=1.0):
+        """
+        Yields notifications sent with NOTIFY / pg_notify() on the given channels.
+        Listening happens on a dedicated autocommit connection. NOTIFY is not durable: notifications
+        sent while no subscriber is listening are lost, so the resume token is a per-subscription
+        sequence number and callers should re-read state after resuming.
+
+        :param channels: str or list of str, the channels to LISTEN on.
+        :param resume_token: int or None, the sequence number to continue counting from.
+        :param poll_timeout: float, seconds to wait for a notification before polling again.
+        :return: generator of ChangeEvent.
+        """
+        if isinstance(channels, str):
+            channels = [channels]
+        try:
+            connection = psycopg2.connect(self.connection_string)
+            connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = connection.cursor()
+            for channel in channels:
+                cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Failed to subscribe to PostgreSQL channels: {e}")
+            raise OperationalError(f"Could not subscribe to PostgreSQL channels: {e}")
+        sequence = resume_token or 0
+        try:
+            while True:
+                if select.select([connection], [], [], poll_timeout) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    sequence += 1
+                    yield parse_notification(notify.channel, notify.payload, sequence)
+        finally:
+            connection.close()
 
+    def open_blob(self, table, column, key_column, key, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Opens a bytea value for chunked reading with substring(), so it is never fully resident in memory.
+        Store large columns uncompressed (ALTER TABLE ... SET STORAGE EXTERNAL) so the server can slice them cheaply.
+
+        :param table: str, the table holding the value.
+        :param column: str, the bytea column.
+        :param key_column: str, the column identifying the row.
+        :param key: the key of the row.
+        :param chunk_size: int, the chunk size used by iter_chunks().
+        :return: ChunkedBlobReader
+        """
+        rows = self.fetch_data(f"SELECT octet_length({column}) FROM {table} WHERE {key_column} = %s", (key,))
+        if not rows or rows[0][0] is None:
+            raise FetchError(f"No {column} value found in {table} for {key_column} = {key}")
+        query = f"SELECT substring({column} FROM %s FOR %s) FROM {table} WHERE {key_column} = %s"
+
+        def read_chunk(offset, size):
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(query, (offset + 1, size, key))
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+        return ChunkedBlobReader(read_chunk, rows[0][0], chunk_size)
+
+    def write_blob(self, table, column, key_column, key, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Replaces a bytea value with the contents of a file-like source in one transaction. The chunks
+        are streamed into a temporary large object, which is copied into the row with lo_get() and
+        unlinked, so the value is written once instead of being rewritten for every chunk.
+
+        :param source: a binary file-like object to read from.
+        :return: int, the number of bytes written.
+        """
+        cursor = self.connection.cursor()
+        try:
+            staging = self.connection.lobject(0, 'wb')
+            written = copy_in_chunks(source, lambda offset, chunk: staging.write(bytes(chunk)), chunk_size)
+            staging.close()
+            cursor.execute(f"UPDATE {table} SET {column} = lo_get(%s) WHERE {key_column} = %s", (staging.oid, key))
+            cursor.execute("SELECT lo_unlink(%s)", (staging.oid,))
+            self.connection.commit()
+            logger.info(f"Wrote {written} bytes to {table}.{column}.")
+            return written
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Error writing blob: {e}")
+            raise UpdateError(f"Error writing blob: {e}")
+        finally:
+            cursor.close()
+
+    def open_large_object(self, oid, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Opens a PostgreSQL large object for chunked reading. Large objects can only be read inside a
+        transaction, so the reader uses a dedicated connection, closed with the reader; the client's
+        own transaction is never committed or ended by it.
+
+        :param oid: int, the large object's OID.
+        :param chunk_size: int, the chunk size used by iter_chunks().
+        :return: ChunkedBlobReader
+        """
+        connection = None
+        try:
+            connection = psycopg2.connect(self.connection_string)
+            large_object = connection.lobject(oid, 'rb')
+            length = large_object.seek(0, 2)
+        except Exception as e:
+            if connection is not None:
+                connection.close()
+            logger.error(f"Error opening large object {oid}: {e}")
+            raise FetchError(f"Error opening large object {oid}: {e}")
+
+        def read_chunk(offset, size):
+            large_object.seek(offset)
+            return large_object.read(size)
+
+        def close():
+            try:
+                large_object.close()
+                connection.rollback()
+            finally:
+                connection.close()
+
+        return ChunkedBlobReader(read_chunk, length, chunk_size, on_close=close)
+
+    def write_large_object(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Creates a PostgreSQL large object from a file-like source, streaming it chunk by chunk.
+
+        :param source: a binary file-like object to read from.
+        :return: int, the OID of the new large object.
+        """
+        try:
+            large_object = self.connection.lobject(0, 'wb')
+            written = copy_in_chunks(source, lambda offset, chunk: large_object.write(chunk), chunk_size)
+            large_object.close()
+            self.connection.commit()
+            logger.info(f"Wrote {written} bytes to large object {large_object.oid}.")
+            return large_object.oid
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Error writing large object: {e}")
+            raise InsertionError(f"Error writing large object: {e}")
+
+    def table_metadata(self, table):
+        """
+        Returns the columns, types, primary key and indexes of a table, loaded once from the
+        system catalogs and cached in ``metadata_cache`` until it expires or DDL runs through this client.
+
+        :param table: str, the table name (optionally schema-qualified).
+        :return: TableMetadata
+        """
+        return self.metadata_cache.get(self.registry_key, table, lambda: self._load_table_metadata(table))
+
+    def _load_table_metadata(self, table):
+        columns = self.fetch_data(
+            "SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped ORDER BY a.attnum", (table,))
+        indexes = self.fetch_data(
+            "SELECT ic.relname, i.indisprimary, a.attname FROM pg_index i "
+            "JOIN pg_class ic ON ic.oid = i.indexrelid "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass "
+            "ORDER BY ic.relname, array_position(i.indkey::int2[], a.attnum)", (table,))
+        return build_metadata(table, columns, indexes)
+
+    def column_converters(self, table, type_converters):
+        """
+        Precomputes per-column converters for a table, to pass as ``converters`` to fetch_data().
+
+        :param table: str, the table name.
+        :param type_converters: dict, maps PostgreSQL type names (as printed by format_type, e.g. 'numeric(12,2)') to callables.
+        :return: dict, maps column names to converters.
+        """
+        return column_converters(self.table_metadata(table), type_converters)
+
+    def _invalidate_on_ddl(self, query):
+        if is_ddl(query):
+            self.metadata_cache.invalidate(self.registry_key)
+
+    def clone(self):
+        """
+        Creates a new, unconnected client with the same connection parameters.
+
+        :return: PostgresClient, a client that can be connected independently (e.g. in another process).
+        """
+        return PostgresClient(self.host, self.port, self.user, self.password, self.database, profile=self.profile,
+                              options=self.options)
+
+    def execute_batch(self, statements):
+        """
+        Executes several statements in order in one transaction and returns their results positionally.
+        libpq returns only the last result of a multi-statement query and psycopg2 has no pipeline mode,
+        so each statement is a round trip on the same cursor; rows keep their driver types.
+
+        :param statements: list of (str, tuple or None), the queries and their parameters.
+        :return: list, a list of tuples for each statement returning rows and a row count for the others.
+        """
+        try:
+            cursor = self.connection.cursor()
+            results = []
+            for query, params in statements:
+                cursor.execute(query, params)
+                results.append(cursor.fetchall() if cursor.description is not None else cursor.rowcount)
+            cursor.close()
+            if not all(is_read_statement(query) for query, _ in statements):
+                self.connection.commit()
+            logger.info(f"Executed a batch of {len(statements)} statements.")
+            return results
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Error executing batch: {e}")
+            raise OperationalError(f"Error executing batch: {e}")
 
     def update_data(self, query, params=None):
         """
@@ -105,6 +536,7 @@ class PostgresClient(Database):
             self.connection.commit()
             row_count = cursor.rowcount
             cursor.close()
+            self._invalidate_on_ddl(query)
             logger.info(f"Updated {row_count} rows in the database.")
             return row_count
         except UpdateError as e:
@@ -127,6 +559,7 @@ class PostgresClient(Database):
             self.connection.commit()
             row_count = cursor.rowcount
             cursor.close()
+            self._invalidate_on_ddl(query)
             logger.info(f"Deleted {row_count} rows from the database.")
             return row_count
         except DeletionError as e:
@@ -134,16 +567,18 @@ class PostgresClient(Database):
             raise DeletionError(f"Error deleting data: {e}")
 
     
-    def delete_all_data(self, query):
+    def delete_all_data(self, query, truncate=False):
         """
         Deletes all data from a PostgreSQL database.
         
+        :param query: str, the table to empty.
+        :param truncate: bool, use TRUNCATE, which avoids per-row WAL and returns -1 as the row count.
         :return: int, the number of rows affected.
         """
         try:
 
             cursor = self.connection.cursor()
-            cursor.execute(f"DELETE FROM {query}")
+            cursor.execute(f"TRUNCATE TABLE {query}" if truncate else f"DELETE FROM {query}")
             self.connection.commit()
             row_count = cursor.rowcount
             cursor.close()
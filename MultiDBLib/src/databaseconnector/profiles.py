@@ -0,0 +1,214 @@
+from collections import namedtuple
+
+BACKENDS = ('postgres', 'mssql', 'mongodb')
+
+DriverSettings = namedtuple('DriverSettings', ['connect', 'client'])
+DriverSettings.__doc__ = """
+Driver options resolved for one backend.
+
+connect: dict, options applied when connecting (libpq keywords, ODBC attributes or MongoClient keyword arguments).
+client: dict, options the client applies itself (fetch_size, fast_executemany, login_timeout, query_timeout).
+"""
+
+# What each profile changes per backend; only MongoDB honours every option.
+#   postgres: 'oltp-low-latency' sets connect and statement timeouts. 'bulk-load' and 'analytics'
+#             only set application_name and TCP keepalives, so their throughput and latency are
+#             those of the default connection (libpq has no packet size or wire compression and
+#             psycopg2 no fetch size option here).
+#   mssql:    'bulk-load' and 'analytics' raise the packet size to 32767 ('bulk-load' also keeps
+#             fast_executemany on, which is the default); 'oltp-low-latency' lowers it to 4096
+#             and sets login and query timeouts.
+#   mongodb:  every option a profile lists takes effect (compression, pool size, concerns, batch size).
+PROFILES = {
+    'bulk-load': {
+        'application_name': 'multidb-bulk-load',
+        'compression': ['zstd', 'snappy', 'zlib'],
+        'keepalive_idle': 60,
+        'packet_size': 32767,
+        'fast_executemany': True,
+        'fetch_size': 10000,
+        'pool_size': 16,
+        'write_concern': 1,
+    },
+    'oltp-low-latency': {
+        'application_name': 'multidb-oltp',
+        'connect_timeout': 5,
+        'statement_timeout': 2.0,
+        'keepalive_idle': 30,
+        'packet_size': 4096,
+        'pool_size': 100,
+        'read_concern': 'local',
+    },
+    'analytics': {
+        'application_name': 'multidb-analytics',
+        'compression': ['zstd', 'zlib'],
+        'keepalive_idle': 60,
+        'packet_size': 32767,
+        'fetch_size': 50000,
+        'read_concern': 'majority',
+        'read_preference': 'secondaryPreferred',
+    },
+}
+
+# Portable option names and the backends that honour them; options a backend cannot apply
+# (e.g. wire compression on PostgreSQL) are ignored for that backend.
+COMMON_OPTIONS = {
+    'application_name': (str, ('postgres', 'mssql', 'mongodb')),
+    'connect_timeout': ((int, float), ('postgres', 'mssql', 'mongodb')),
+    'statement_timeout': ((int, float), ('postgres', 'mssql', 'mongodb')),
+    'keepalive_idle': (int, ('postgres', 'mssql')),
+    'compression': (list, ('mongodb',)),
+    'packet_size': (int, ('mssql',)),
+    'fast_executemany': (bool, ('mssql',)),
+    'fetch_size': (int, ('mongodb',)),
+    'pool_size': (int, ('mongodb',)),
+    'read_concern': (str, ('mongodb',)),
+    'read_preference': (str, ('mongodb',)),
+    'write_concern': ((int, str), ('mongodb',)),
+}
+
+# Backend-native option names accepted as-is.
+NATIVE_OPTIONS = {
+    'postgres': {
+        'application_name': str, 'connect_timeout': int, 'keepalives': int, 'keepalives_idle': int,
+        'keepalives_interval': int, 'keepalives_count': int, 'sslmode': str, 'options': str,
+        'target_session_attrs': str, 'tcp_user_timeout': int,
+    },
+    'mssql': {
+        'APP': str, 'Packet Size': int, 'KeepAlive': int, 'KeepAliveInterval': int, 'Encrypt': str,
+        'TrustServerCertificate': str, 'MultiSubnetFailover': str, 'ConnectRetryCount': int,
+        'ConnectRetryInterval': int, 'ApplicationIntent': str,
+        'fast_executemany': bool, 'login_timeout': int, 'query_timeout': int,
+    },
+    'mongodb': {
+        'appname': str, 'compressors': (list, str), 'zlibCompressionLevel': int, 'maxPoolSize': int,
+        'minPoolSize': int, 'maxIdleTimeMS': int, 'connectTimeoutMS': int, 'socketTimeoutMS': int,
+        'serverSelectionTimeoutMS': int, 'readConcernLevel': str, 'readPreference': str, 'w': (int, str),
+        'retryWrites': bool, 'retryReads': bool, 'fetch_size': int,
+    },
+}
+
+_CLIENT_SIDE = {'mssql': ('fast_executemany', 'login_timeout', 'query_timeout'), 'mongodb': ('fetch_size',)}
+
+
+def resolve_options(backend, profile=None, options=None):
+    """
+    Validates and translates a named profile plus explicit options into backend settings.
+    Explicit options override the profile and may use portable names (see COMMON_OPTIONS) or the
+    backend's native names (see NATIVE_OPTIONS).
+
+    :param backend: str, one of 'postgres', 'mssql' or 'mongodb'.
+    :param profile: str or None, one of PROFILES.
+    :param options: dict or None, explicit options.
+    :return: DriverSettings
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f"profile must be one of {tuple(PROFILES)}")
+    native = {}
+    for source, strict in ((PROFILES.get(profile, {}), False), (options or {}, True)):
+        for name, value in source.items():
+            if name in COMMON_OPTIONS:
+                expected, backends = COMMON_OPTIONS[name]
+                _check_type(name, value, expected)
+                if backend in backends:
+                    native.update(_TRANSLATE[backend](name, value, native))
+            elif name in NATIVE_OPTIONS[backend]:
+                _check_type(name, value, NATIVE_OPTIONS[backend][name])
+                native[name] = value
+            elif strict:
+                raise ValueError(f"unknown {backend} option: {name}")
+    client = {name: native.pop(name) for name in _CLIENT_SIDE.get(backend, ()) if name in native}
+    return DriverSettings(native, client)
+
+
+def _check_type(name, value, expected):
+    if value is not None and not isinstance(value, expected):
+        raise ValueError(f"option {name} has an invalid value: {value!r}")
+
+
+def _postgres(name, value, current):
+    if name == 'application_name':
+        return {'application_name': value}
+    if name == 'connect_timeout':
+        return {'connect_timeout': max(1, int(value))}
+    if name == 'keepalive_idle':
+        return {'keepalives': 1, 'keepalives_idle': value}
+    if name == 'statement_timeout':
+        setting = f"-c statement_timeout={int(value * 1000)}"
+        return {'options': f"{current['options']} {setting}" if current.get('options') else setting}
+    return {}
+
+
+def _mssql(name, value, current):
+    if name == 'application_name':
+        return {'APP': value}
+    if name == 'connect_timeout':
+        return {'login_timeout': max(1, int(value))}
+    if name == 'keepalive_idle':
+        return {'KeepAlive': value}
+    if name == 'packet_size':
+        return {'Packet Size': value}
+    if name == 'fast_executemany':
+        return {'fast_executemany': value}
+    if name == 'statement_timeout':
+        return {'query_timeout': max(1, int(value))}
+    return {}
+
+
+def _mongodb(name, value, current):
+    if name == 'application_name':
+        return {'appname': value}
+    if name == 'connect_timeout':
+        return {'connectTimeoutMS': int(value * 1000), 'serverSelectionTimeoutMS': int(value * 1000)}
+    if name == 'statement_timeout':
+        return {'socketTimeoutMS': int(value * 1000)}
+    if name == 'compression':
+        return {'compressors': ','.join(value)}
+    if name == 'fetch_size':
+        return {'fetch_size': value}
+    if name == 'pool_size':
+        return {'maxPoolSize': value}
+    if name == 'read_concern':
+        return {'readConcernLevel': value}
+    if name == 'read_preference':
+        return {'readPreference': value}
+    if name == 'write_concern':
+        return {'w': value}
+    return {}
+
+
+_TRANSLATE = {'postgres': _postgres, 'mssql': _mssql, 'mongodb': _mongodb}
+
+
+def libpq_options(settings):
+    """
+    Renders libpq keywords for a connection string, quoting values as libpq expects.
+
+    :param settings: dict, libpq keyword options.
+    :return: str, e.g. " application_name='etl' keepalives=1".
+    """
+    rendered = []
+    for name, value in settings.items():
+        text = str(value)
+        if not text or any(c in text for c in " '\\"):
+            text = "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+        rendered.append(f" {name}={text}")
+    return ''.join(rendered)
+
+
+def odbc_options(settings):
+    """
+    Renders ODBC connection attributes, bracing values that contain separators.
+
+    :param settings: dict, ODBC attributes.
+    :return: str, e.g. ";APP=etl;Packet Size=32767".
+    """
+    rendered = []
+    for name, value in settings.items():
+        text = str(value)
+        if any(c in text for c in ';{}='):
+            text = '{' + text.replace('}', '}}') + '}'
+        rendered.append(f";{name}={text}")
+    return ''.join(rendered)
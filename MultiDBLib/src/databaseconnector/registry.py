@@ -0,0 +1,88 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    Process-wide, thread-safe registry of driver clients keyed by connection identity.
+    Database clients created with the same registry and the same connection parameters share one
+    underlying driver client (and therefore one pool and one set of monitor threads). The driver
+    client is closed when the last database client that acquired it is closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+
+    def acquire(self, key, factory):
+        """
+        Returns the driver client registered under ``key``, creating it with ``factory`` on first use,
+        and increments its reference count. The factory runs outside the registry lock; concurrent
+        callers for the same key wait for it, callers for other keys do not.
+
+        :param key: tuple, the connection identity (see the clients' ``registry_key``).
+        :param factory: callable, creates the driver client.
+        :return: the shared driver client.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] += 1
+                    return entry[0]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+        try:
+            client = factory()
+        except BaseException:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+            raise
+        with self._lock:
+            self._entries[key] = [client, 1]
+            del self._pending[key]
+        pending.set()
+        logger.info(f"Created shared client for {key[0]}.")
+        return client
+
+    def release(self, key):
+        """
+        Decrements the reference count of ``key`` and closes the driver client when it reaches zero.
+
+        :param key: tuple, the connection identity passed to ``acquire``.
+        :return: bool, True if the driver client was closed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry[1] -= 1
+            if entry[1] > 0:
+                return False
+            del self._entries[key]
+        entry[0].close()
+        logger.info(f"Closed shared client for {key[0]}.")
+        return True
+
+    def refcount(self, key):
+        """
+        :param key: tuple, the connection identity.
+        :return: int, the number of open database clients sharing the driver client.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+shared_registry = ClientRegistry()
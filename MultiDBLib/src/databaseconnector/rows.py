@@ -0,0 +1,119 @@
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+ROW_FACTORIES = ('tuple', 'record', 'columns')
+
+
+@lru_cache(maxsize=256)
+def record_type(fields):
+    """
+    Returns the namedtuple class shared by every row with the given column header.
+    Rows are plain tuples underneath, so they carry no per-row dict.
+
+    :param fields: tuple of str, the column names.
+    :return: type, a namedtuple class; invalid or duplicate names are renamed positionally (_0, _1, ...).
+    """
+    return namedtuple('Record', fields, rename=True)
+
+
+class ColumnarResult:
+    """
+    Column-oriented result set. Integer and float columns are packed into ``array`` buffers,
+    other columns are kept as lists.
+    """
+
+    __slots__ = ('columns', 'data')
+
+    def __init__(self, columns, data):
+        """
+        :param columns: tuple of str, the column names in result order.
+        :param data: dict, maps each column name to an ``array`` or list of values.
+        """
+        self.columns = columns
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """
+        Builds a columnar result from row tuples.
+
+        :param columns: sequence of str, the column names.
+        :param rows: iterable of sequences, the rows to transpose.
+        :return: ColumnarResult
+        """
+        columns = tuple(columns)
+        values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+        return cls(columns, {name: _pack(column) for name, column in zip(columns, values)})
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __iter__(self):
+        return zip(*(self.data[name] for name in self.columns))
+
+    def __repr__(self):
+        return f"ColumnarResult(columns={self.columns}, rows={len(self)})"
+
+
+def _pack(values):
+    if values and all(type(v) is int for v in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if values and all(type(v) is float for v in values):
+        return array('d', values)
+    return values
+
+
+def check_row_factory(row_factory):
+    """
+    Raises ValueError for an unknown row_factory, so clients can reject it before executing a query.
+
+    :param row_factory: str or callable or None.
+    """
+    if row_factory is not None and not callable(row_factory) and row_factory not in ROW_FACTORIES:
+        raise ValueError(f"row_factory must be a callable or one of {ROW_FACTORIES}")
+
+
+def build_rows(fields, rows, row_factory=None):
+    """
+    Converts driver rows into the requested representation.
+
+    :param fields: sequence of str, the column names in row order.
+    :param rows: list of sequences, the rows returned by the driver.
+    :param row_factory: str or callable or None; 'tuple' (or None) returns the rows unchanged,
+        'record' returns namedtuple rows sharing one header, 'columns' returns a ColumnarResult.
+        A callable receives ``(fields, rows)`` and returns the result.
+    :return: list or ColumnarResult, the converted rows.
+    """
+    check_row_factory(row_factory)
+    if row_factory is None or row_factory == 'tuple':
+        return rows
+    if callable(row_factory):
+        return row_factory(tuple(fields), rows)
+    if row_factory == 'record':
+        make = record_type(tuple(fields))._make
+        return [make(row) for row in rows]
+    if row_factory == 'columns':
+        return ColumnarResult.from_rows(fields, rows)
+
+
+def documents_to_rows(documents):
+    """
+    Flattens MongoDB documents into a shared header and value tuples.
+    Keys missing from a document are filled with None.
+
+    :param documents: list of dict, the fetched documents.
+    :return: tuple of (tuple of str, list of tuple), the header and the rows.
+    """
+    fields = {}
+    for document in documents:
+        for key in document:
+            fields.setdefault(key, None)
+    fields = tuple(fields)
+    return fields, [tuple(document.get(field) for field in fields) for document in documents]
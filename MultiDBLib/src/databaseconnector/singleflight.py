@@ -0,0 +1,138 @@
+import asyncio
+import copy
+import json
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _canonical(value):
+    return f"{type(value).__name__}:{value}"
+
+
+def request_key(query, params=None, row_factory=None):
+    """
+    Builds the key identifying identical reads. SQL whitespace is collapsed and the top-level fields
+    of a MongoDB filter are sorted, so equivalent requests map to the same key. Embedded documents
+    keep their key order, because MongoDB compares them field by field in order; values keep their
+    type (ObjectId('1') and '1' differ).
+
+    :param query: str or dict, the query or filter.
+    :param params: tuple or None, the query parameters.
+    :param row_factory: str or callable or None, the requested row representation.
+    :return: str
+    """
+    if isinstance(query, str):
+        query = _WHITESPACE.sub(' ', query).strip()
+    elif isinstance(query, dict) and all(isinstance(field, str) for field in query):
+        query = dict(sorted(query.items()))
+    return json.dumps([query, params, row_factory if isinstance(row_factory, str) or row_factory is None
+                       else _canonical(row_factory)], default=_canonical)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key runs the call, callers arriving
+    while it is in flight wait for it and receive a deep copy of its result (or its exception), so no
+    caller can corrupt another's rows. Nothing is cached once the call completes.
+    """
+
+    def __init__(self, copy_results=True):
+        """
+        :param copy_results: bool, give every waiter its own deep copy of the result.
+        """
+        self.copy_results = copy_results
+        self.executions = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs ``func`` once for all concurrent callers with the same key.
+
+        :param key: hashable, identifies identical calls (see request_key()).
+        :param func: callable, the call to run.
+        :return: the call's result.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result) if self.copy_results else flight.result
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.debug(f"Shared one call with {flight.waiters} waiting callers.")
+        return copy.deepcopy(flight.result) if self.copy_results and flight.waiters else flight.result
+
+
+class AsyncSingleFlight:
+    """
+    asyncio variant of SingleFlight for coroutines running on one event loop.
+    """
+
+    def __init__(self, copy_results=True):
+        """
+        :param copy_results: bool, give every waiter its own deep copy of the result.
+        """
+        self.copy_results = copy_results
+        self.executions = 0
+        self.coalesced = 0
+        self._flights = {}
+
+    async def do(self, key, coro_func):
+        """
+        Awaits ``coro_func()`` once for all concurrent callers with the same key. The call runs as
+        its own task, so cancelling any caller, including the first, does not cancel it for the others.
+
+        :param key: hashable, identifies identical calls (see request_key()).
+        :param coro_func: callable, returns the awaitable to run.
+        :return: the call's result.
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = [asyncio.ensure_future(coro_func()), 0]
+            self.executions += 1
+            flight[0].add_done_callback(lambda task: self._finish(key, task))
+        else:
+            flight[1] += 1
+            self.coalesced += 1
+        result = await asyncio.shield(flight[0])
+        return copy.deepcopy(result) if self.copy_results and (flight[1] or not leader) else result
+
+    def _finish(self, key, task):
+        if self._flights.get(key, [None])[0] is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported as never retrieved when every caller was cancelled.
+            task.exception()
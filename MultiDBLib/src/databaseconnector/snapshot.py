@@ -0,0 +1,345 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+
+from .export import with_fields
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MDBSNAP1'
+_HEADER = struct.Struct('<8sQQQQ')
+_SLOT = struct.Struct('<QQ')
+_LENGTH = struct.Struct('<I')
+
+
+def _key_hash(key):
+    encoded = f"{type(key).__name__}:{key!r}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+
+
+def write_snapshot(path, batches, key, fields=None):
+    """
+    Writes rows to a snapshot file with a hash index on ``key``. The file is written next to ``path``
+    and moved into place with os.replace(), so readers see either the old or the new snapshot.
+
+    Layout: header, JSON metadata, length-prefixed pickled (key, row) records, then an
+    open-addressing table of (key hash, record offset) slots at most half full.
+
+    :param path: str, the snapshot file.
+    :param batches: iterable of list, batches of rows (tuples or dicts).
+    :param key: str or int or callable, the lookup key (a column name, an index, a dict key or a function).
+    :param fields: sequence of str or None, the column names of tuple rows (needed to key by name).
+    :return: int, the number of rows written.
+    """
+    key_func = _row_key(key, fields)
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                             dir=os.path.dirname(path) or '.')
+    try:
+        # mkstemp creates the file private to its owner; snapshots are read by other processes.
+        os.chmod(temporary, 0o644)
+        entries = _write_records(descriptor, batches, key_func, fields)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    logger.info(f"Wrote snapshot of {len(entries)} rows to {path}.")
+    return len(entries)
+
+
+def _write_records(descriptor, batches, key_func, fields):
+    entries = []
+    with os.fdopen(descriptor, 'wb') as snapshot:
+        meta = json.dumps({'fields': list(fields) if fields else None, 'created': time.time()}).encode('utf-8')
+        snapshot.write(_HEADER.pack(MAGIC, 0, 0, 0, len(meta)))
+        snapshot.write(meta)
+        offset = _HEADER.size + len(meta)
+        for batch in batches:
+            for row in batch:
+                row_key = key_func(row)
+                record = pickle.dumps((row_key, row), pickle.HIGHEST_PROTOCOL)
+                snapshot.write(_LENGTH.pack(len(record)))
+                snapshot.write(record)
+                entries.append((_key_hash(row_key), offset))
+                offset += _LENGTH.size + len(record)
+
+        slots = 1
+        while slots < 2 * len(entries):
+            slots *= 2
+        table = bytearray(slots * _SLOT.size)
+        for key_hash, record_offset in entries:
+            slot = key_hash & (slots - 1)
+            while _SLOT.unpack_from(table, slot * _SLOT.size)[1]:
+                slot = (slot + 1) & (slots - 1)
+            _SLOT.pack_into(table, slot * _SLOT.size, key_hash, record_offset + 1)
+        snapshot.write(table)
+        snapshot.seek(0)
+        snapshot.write(_HEADER.pack(MAGIC, len(entries), slots, offset, len(meta)))
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    return entries
+
+
+def _row_key(key, fields):
+    if callable(key):
+        return key
+    if isinstance(key, str) and fields:
+        key = list(fields).index(key)
+    return lambda row: row[key]
+
+
+class _Mapping:
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot:
+            self.inode = os.fstat(snapshot.fileno()).st_ino
+            self.buffer = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.slots, self.index_offset, meta_length = _HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        self.data_offset = _HEADER.size + meta_length
+        self.meta = json.loads(self.buffer[_HEADER.size:self.data_offset].decode('utf-8'))
+
+    def record(self, offset):
+        (length,) = _LENGTH.unpack_from(self.buffer, offset)
+        start = offset + _LENGTH.size
+        return pickle.loads(self.buffer[start:start + length]), start + length
+
+    def lookup(self, key):
+        if not self.slots:
+            return None
+        key_hash = _key_hash(key)
+        slot = key_hash & (self.slots - 1)
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(self.buffer, self.index_offset + slot * _SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == key_hash:
+                (row_key, row), _ = self.record(offset - 1)
+                if row_key == key:
+                    return row,
+            slot = (slot + 1) & (self.slots - 1)
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file. The file is memory-mapped, so every process on the host shares
+    one copy in the page cache; lookups hash the key and probe the on-disk index, decoding only the
+    matching record. The file is re-checked every ``check_interval`` seconds and remapped when a
+    refresh has replaced it.
+    """
+
+    def __init__(self, path, check_interval=5.0, clock=time.monotonic):
+        """
+        :param path: str, the snapshot file.
+        :param check_interval: float or None, seconds between checks for a replaced file (None never checks).
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._mapping = _Mapping(path)
+        self._checked = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def fields(self):
+        """The column names of tuple rows, or None."""
+        return self._mapping.meta['fields']
+
+    @property
+    def created(self):
+        """The time the snapshot was written, in seconds since the epoch."""
+        return self._mapping.meta['created']
+
+    def get(self, key, default=None):
+        """
+        Looks a row up by key.
+
+        :param key: the lookup key.
+        :param default: returned when the key is missing.
+        :return: the row (tuple or dict), or ``default``.
+        """
+        found = self._current().lookup(key)
+        return default if found is None else found[0]
+
+    def __getitem__(self, key):
+        found = self._current().lookup(key)
+        if found is None:
+            raise KeyError(key)
+        return found[0]
+
+    def __contains__(self, key):
+        return self._current().lookup(key) is not None
+
+    def __len__(self):
+        return self._current().count
+
+    def __iter__(self):
+        mapping = self._current()
+        offset = mapping.data_offset
+        while offset < mapping.index_offset:
+            (_, row), offset = mapping.record(offset)
+            yield row
+
+    def reload(self):
+        """
+        Remaps the file if it has been replaced since it was opened.
+
+        :return: bool, True if a new snapshot was mapped.
+        """
+        with self._lock:
+            self._checked = self._clock()
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                return False
+            if inode == self._mapping.inode:
+                return False
+            # The old map is left to the garbage collector so concurrent readers can finish with it.
+            self._mapping = _Mapping(self.path)
+        logger.info(f"Reloaded snapshot {self.path} ({self._mapping.count} rows).")
+        return True
+
+    def _current(self):
+        if self.check_interval is not None and self._clock() - self._checked >= self.check_interval:
+            self.reload()
+        return self._mapping
+
+
+class SnapshotPublisher:
+    """
+    Builds a snapshot file from a query and refreshes it on a schedule or when change events arrive.
+    Run one publisher per host; worker processes open the file with Snapshot.
+    """
+
+    def __init__(self, client, query, path, key, params=None, batch_size=10000):
+        """
+        :param client: PostgresClient, MSSQLClient or MongoDBClient, a connected client.
+        :param query: str or dict, the SQL query or MongoDB filter selecting the rows.
+        :param path: str, the snapshot file.
+        :param key: str or int or callable, the lookup key.
+        :param params: tuple or dict or None, SQL parameters or a MongoDB projection.
+        :param batch_size: int, the number of rows fetched per round trip.
+        """
+        self.client = client
+        self.query = query
+        self.path = path
+        self.key = key
+        self.params = params
+        self.batch_size = batch_size
+        self.refreshes = 0
+        self._stop = threading.Event()
+        self._changed = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Re-runs the query and atomically replaces the snapshot file.
+
+        :return: int, the number of rows written.
+        """
+        if hasattr(self.client, 'placeholder'):
+            fields = []
+
+            def rows():
+                for batch_fields, batch in self.client.iter_data(self.query, self.params, batch_size=self.batch_size,
+                                                                 row_factory=with_fields):
+                    fields[:] = batch_fields
+                    yield batch
+
+            batches = rows()
+            first = next(batches, [])
+            count = write_snapshot(self.path, _chain(first, batches), self.key, fields or None)
+        else:
+            batches = self.client.iter_data(self.query, self.params, batch_size=self.batch_size)
+            count = write_snapshot(self.path, batches, self.key)
+        self.refreshes += 1
+        return count
+
+    def start(self, interval):
+        """
+        Refreshes the snapshot every ``interval`` seconds in a background thread.
+
+        :param interval: float, seconds between refreshes.
+        """
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing snapshot {self.path}: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='snapshot-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background refresh started with start() and a running follow()."""
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def follow(self, events, min_interval=1.0):
+        """
+        Refreshes the snapshot when change events arrive, at most once per ``min_interval`` seconds.
+        Events arriving during the interval are coalesced into one refresh at its end. Events are
+        read in a background thread, so stop() returns from follow() even while no event arrives
+        (the reading thread ends with the next event or the end of ``events``).
+
+        :param events: iterable of ChangeEvent, e.g. the client's subscribe().
+        :param min_interval: float, the minimum time between refreshes.
+        """
+        lock, pending, errors = threading.Lock(), [0], []
+        finished = threading.Event()
+
+        def read():
+            try:
+                for _ in events:
+                    with lock:
+                        pending[0] += 1
+                    self._changed.set()
+                    if self._stop.is_set():
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.set()
+                self._changed.set()
+
+        threading.Thread(target=read, name='snapshot-follow', daemon=True).start()
+        last = None
+        while True:
+            self._changed.wait()
+            if self._stop.is_set():
+                return
+            if last is not None:
+                delay = min_interval - (time.monotonic() - last)
+                if delay > 0 and self._stop.wait(delay):
+                    return
+            self._changed.clear()
+            with lock:
+                changes, pending[0] = pending[0], 0
+            if changes:
+                self.refresh()
+                last = time.monotonic()
+            if finished.is_set():
+                with lock:
+                    if not pending[0]:
+                        break
+        if errors:
+            raise errors[0]
+
+
+def _chain(first, rest):
+    if first:
+        yield first
+    for batch in rest:
+        yield batch
@@ -0,0 +1,233 @@
+import sqlite3
+import time
+from .exceptions import *
+from .db import Database
+from .autotune import batches
+from .counting import counted_source
+from .rows import build_rows, check_row_factory
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteClient(Database):
+    """
+    Embedded SQLite client implementing the generic Database interface, for serving hot reads
+    locally (e.g. from a TableMirror of a remote table) without a network round trip.
+    File databases are opened in WAL mode so readers are not blocked by the mirror's writes.
+    A connection must not be used by several threads at once; give each thread its own clone().
+    """
+
+    placeholder = '?'
+
+    def __init__(self, path=':memory:', wal=True, timeout=5.0, mmap_size=256 * 2 ** 20, synchronous='NORMAL'):
+        """
+        Initialize the SQLite client.
+
+        :param path: str, the database file, or ':memory:' for a private in-memory database.
+        :param wal: bool, use write-ahead logging so readers and one writer do not block each other.
+        :param timeout: float, seconds to wait for a lock held by another connection.
+        :param mmap_size: int, bytes of the file read through a memory map (0 disables it).
+        :param synchronous: str, the synchronous pragma; 'NORMAL' is durable across crashes of the process in WAL mode.
+        """
+        self.path = path
+        self.wal = wal
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.synchronous = synchronous
+        self.connection = None
+
+    def connect(self):
+        """
+        Opens the database and applies the journal and cache pragmas.
+        """
+        if self.connection is None:
+            try:
+                self.connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+                if self.wal and self.path != ':memory:':
+                    self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute(f"PRAGMA synchronous={self.synchronous}")
+                self.connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+                logger.info(f"Connected to SQLite database {self.path}")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to connect to SQLite: {e}")
+                raise ConnectionError(f"Could not connect to SQLite: {e}")
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            logger.info("SQLite connection closed.")
+
+    def _write(self, query, params, error, verb):
+        try:
+            cursor = self.connection.execute(query, params or ())
+            self.connection.commit()
+            row_count = cursor.rowcount
+            cursor.close()
+            logger.info(f"{verb} {row_count} rows.")
+            return row_count
+        except sqlite3.Error as e:
+            self.connection.rollback()
+            logger.error(f"Database operation failed: {e}")
+            raise error(f"Database operation failed: {e}")
+
+    def insert_data(self, query, params=None):
+        """
+        Inserts data into the database.
+
+        :param query: str, the SQL query to execute.
+        :param params: tuple or None, parameters for the SQL query.
+        :return: int, the number of rows inserted.
+        """
+        return self._write(query, params, InsertionError, "Inserted")
+
+    def insert_many(self, query, rows, batch_size=1000, tuner=None, tuner_key=None):
+        """
+        Inserts many rows with executemany, committing after every batch.
+
+        :param query: str, the parameterized INSERT statement.
+        :param rows: iterable of tuple, the parameters for each row.
+        :param batch_size: int, the number of rows per batch.
+        :param tuner: BatchSizeTuner or None, adapts the batch size instead of ``batch_size``.
+        :param tuner_key: str or None, the tuner key, usually the table (defaults to the query).
+        :return: int, the number of rows inserted.
+        """
+        tuner_key = tuner_key or query
+        total = 0
+        for batch in batches(rows, batch_size, tuner, tuner_key):
+            start = time.perf_counter()
+            try:
+                self.connection.executemany(query, batch)
+                self.connection.commit()
+            except sqlite3.Error as e:
+                self.connection.rollback()
+                if tuner is not None:
+                    tuner.record(tuner_key, len(batch), time.perf_counter() - start, error=True)
+                logger.error(f"Error inserting data: {e}")
+                raise InsertionError(f"Error inserting data: {e}")
+            if tuner is not None:
+                tuner.record(tuner_key, len(batch), time.perf_counter() - start)
+            total += len(batch)
+        logger.info(f"Inserted {total} rows.")
+        return total
+
+    def fetch_data(self, query, params=None, row_factory=None):
+        """
+        Fetches data from the database.
+
+        :param query: str, the SQL query to execute.
+        :param params: tuple or dict or None, parameters for the SQL query.
+        :param row_factory: str or callable or None, the row representation ('tuple', 'record' or 'columns', see rows.build_rows).
+        :return: list of tuple, the rows fetched.
+        """
+        check_row_factory(row_factory)
+        try:
+            cursor = self.connection.execute(query, params or ())
+            rows = cursor.fetchall()
+            if row_factory is not None:
+                rows = build_rows([column[0] for column in cursor.description], rows, row_factory)
+            cursor.close()
+            return rows
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching data: {e}")
+            raise FetchError(f"Error fetching data: {e}")
+
+    def iter_data(self, query, params=None, batch_size=1000, row_factory=None, tuner=None, tuner_key=None):
+        """
+        Streams rows from the database in batches.
+
+        :param query: str, the SQL query to execute.
+        :param params: tuple or dict or None, parameters for the SQL query.
+        :param batch_size: int, the number of rows per batch.
+        :param row_factory: str or callable or None, applied to each batch (see rows.build_rows).
+        :param tuner: BatchSizeTuner or None, adapts the batch size instead of ``batch_size``.
+        :param tuner_key: str or None, the tuner key (defaults to the query).
+        :return: generator of list of tuple, one list per batch.
+        """
+        check_row_factory(row_factory)
+        tuner_key = tuner_key or query
+        try:
+            cursor = self.connection.execute(query, params or ())
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching data: {e}")
+            raise FetchError(f"Error fetching data: {e}")
+        try:
+            while True:
+                size = tuner.size(tuner_key) if tuner is not None else batch_size
+                start = time.perf_counter()
+                rows = cursor.fetchmany(size)
+                if tuner is not None and rows:
+                    tuner.record(tuner_key, len(rows), time.perf_counter() - start)
+                if not rows:
+                    break
+                if row_factory is not None:
+                    rows = build_rows([column[0] for column in cursor.description], rows, row_factory)
+                yield rows
+        finally:
+            cursor.close()
+
+    def count(self, target, filter=None, approximate=False, params=None):
+        """
+        Counts rows with COUNT(*); local scans are cheap, so ``approximate`` is accepted but ignored.
+
+        :param target: str, a table name or a SELECT query.
+        :param filter: str or None, a SQL predicate applied to the target.
+        :param approximate: bool, ignored.
+        :param params: tuple or None, parameters for the target query and filter.
+        :return: int, the number of rows.
+        """
+        return int(self.fetch_data(f"SELECT COUNT(*) FROM {counted_source(target, filter)}", params)[0][0])
+
+    def update_data(self, query, params=None):
+        """
+        Updates data in the database.
+
+        :param query: str, the SQL query to execute.
+        :param params: tuple or None, parameters for the SQL query.
+        :return: int, the number of rows updated.
+        """
+        return self._write(query, params, UpdateError, "Updated")
+
+    def delete_data(self, query, params=None):
+        """
+        Deletes data from the database.
+
+        :param query: str, the SQL query to execute.
+        :param params: tuple or None, parameters for the SQL query.
+        :return: int, the number of rows deleted.
+        """
+        return self._write(query, params, DeletionError, "Deleted")
+
+    def delete_all_data(self, query):
+        """
+        Deletes all rows from a table. SQLite drops the pages of an unfiltered DELETE instead of
+        deleting row by row.
+
+        :param query: str, the table to empty.
+        :return: int, the number of rows deleted.
+        """
+        return self._write(f"DELETE FROM {query}", None, DeletionError, "Deleted")
+
+    def cancel(self, thread=None):
+        """
+        Interrupts the statement currently running on this client's connection.
+
+        :return: bool, True if an interrupt was sent.
+        """
+        if self.connection is None:
+            return False
+        self.connection.interrupt()
+        return True
+
+    def clone(self):
+        """
+        Creates a new, unconnected client for the same database file. Clones of an in-memory
+        database open a separate, empty database.
+
+        :return: SQLiteClient
+        """
+        return SQLiteClient(self.path, self.wal, self.timeout, self.mmap_size, self.synchronous)
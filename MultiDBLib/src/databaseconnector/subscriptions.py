@@ -0,0 +1,57 @@
+from collections import namedtuple
+import asyncio
+import json
+
+ChangeEvent = namedtuple('ChangeEvent', ['source', 'operation', 'key', 'document', 'resume_token'])
+ChangeEvent.__doc__ = """
+A change delivered by a subscription.
+
+source: str, the backend that produced the event ('mongodb', 'postgres' or 'mssql').
+operation: str, 'insert', 'update', 'delete', 'replace' or a backend-specific operation.
+key: the primary key of the changed row or document, when known.
+document: dict or None, the changed document or notification payload, when available.
+resume_token: pass back as ``resume_token`` to continue the subscription after this event.
+"""
+
+MSSQL_OPERATIONS = {'I': 'insert', 'U': 'update', 'D': 'delete'}
+
+
+def parse_notification(channel, payload, resume_token):
+    """
+    Converts a PostgreSQL notification into a ChangeEvent.
+    JSON payloads of the form ``{"operation": ..., "key": ..., "document": ...}`` are unpacked,
+    any other payload is delivered as the document with the channel name as operation.
+
+    :param channel: str, the channel the notification arrived on.
+    :param payload: str, the notification payload.
+    :param resume_token: the token to attach to the event.
+    :return: ChangeEvent
+    """
+    try:
+        body = json.loads(payload) if payload else None
+    except ValueError:
+        body = payload
+    if isinstance(body, dict) and 'operation' in body:
+        return ChangeEvent('postgres', body['operation'], body.get('key'), body.get('document'), resume_token)
+    return ChangeEvent('postgres', channel, None, body, resume_token)
+
+
+async def aiter_events(events):
+    """
+    Adapts a blocking subscription iterator into an async iterator.
+    Each blocking wait runs in the event loop's default executor.
+
+    :param events: iterator of ChangeEvent, as returned by ``subscribe()``.
+    :return: async generator of ChangeEvent
+    """
+    loop = asyncio.get_event_loop()
+    done = object()
+    try:
+        while True:
+            event = await loop.run_in_executor(None, next, events, done)
+            if event is done:
+                break
+            yield event
+    finally:
+        if hasattr(events, 'close') and not getattr(events, 'gi_running', False):
+            events.close()
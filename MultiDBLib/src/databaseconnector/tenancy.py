@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+from .dbconnect import DBConnect
+from .exceptions import AdmissionError
+
+logger = logging.getLogger(__name__)
+
+
+def server_key(client):
+    """
+    Identifies the server a client connects to, for per-server connection caps.
+
+    :param client: Database, an unconnected client.
+    :return: tuple of (str, str, int)
+    """
+    return type(client).__name__, getattr(client, 'host', None), getattr(client, 'port', None)
+
+
+class _Tenant:
+    def __init__(self, tenant, server):
+        self.tenant = tenant
+        self.server = server
+        self.connector = None
+        self.in_use = 0
+        self.last_used = 0.0
+        self.ready = threading.Event()
+        self.error = None
+
+
+class TenantRouter:
+    """
+    Routes work to per-tenant DBConnect instances. ``resolve`` maps a tenant to an unconnected client
+    (its own database, or a shared one prepared per checkout with ``on_checkout``, e.g. SET search_path).
+    Connected tenants are kept warm in an LRU of at most ``max_tenants``; tenants idle for longer than
+    ``idle_timeout`` are closed, and the number of open tenant connections per server is capped.
+    When a server is at its cap, the least recently used idle tenant on it is evicted; if every
+    connection is busy, callers wait up to ``acquire_timeout`` and then get AdmissionError.
+    """
+
+    def __init__(self, resolve, max_tenants=100, idle_timeout=300.0, max_connections_per_server=50,
+                 acquire_timeout=10.0, connector=DBConnect, on_checkout=None, clock=time.monotonic):
+        """
+        :param resolve: callable, returns an unconnected Database client for a tenant id.
+        :param max_tenants: int, the maximum number of connected tenants kept warm.
+        :param idle_timeout: float or None, seconds after which an unused tenant is closed.
+        :param max_connections_per_server: int, the maximum number of open tenant connections per server.
+        :param acquire_timeout: float or None, seconds to wait for a connection slot (None waits indefinitely).
+        :param connector: callable, wraps a connected client (DBConnect by default, e.g. to add a bulkhead).
+        :param on_checkout: callable or None, called with (connector, tenant) every time a tenant is checked out.
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.resolve = resolve
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.max_connections_per_server = max_connections_per_server
+        self.acquire_timeout = acquire_timeout
+        self.connector = connector
+        self.on_checkout = on_checkout
+        self.evictions = 0
+        self._clock = clock
+        self._tenants = OrderedDict()
+        self._servers = {}
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def tenant(self, tenant):
+        """
+        Checks a tenant's connector out for the duration of a with block.
+
+        :param tenant: hashable, the tenant id.
+        :return: context manager yielding DBConnect.
+        """
+        entry = self._acquire(tenant)
+        try:
+            if self.on_checkout is not None:
+                self.on_checkout(entry.connector, tenant)
+            yield entry.connector
+        finally:
+            self._release(entry)
+
+    def _acquire(self, tenant):
+        deadline = None if self.acquire_timeout is None else self._clock() + self.acquire_timeout
+        to_close, client = [], None
+        with self._condition:
+            to_close.extend(self._expired())
+            entry = self._checkout(tenant)
+        try:
+            if entry is None:
+                client = self.resolve(tenant)
+                server = server_key(client)
+                with self._condition:
+                    while True:
+                        entry = self._checkout(tenant)
+                        if entry is not None:
+                            client = None
+                            break
+                        if self._servers.get(server, 0) < self.max_connections_per_server \
+                                or self._evict_lru(server, to_close):
+                            entry = self._tenants[tenant] = _Tenant(tenant, server)
+                            entry.in_use = 1
+                            self._servers[server] = self._servers.get(server, 0) + 1
+                            while len(self._tenants) > self.max_tenants and self._evict_lru(None, to_close):
+                                pass
+                            break
+                        remaining = None if deadline is None else deadline - self._clock()
+                        if remaining is not None and remaining <= 0:
+                            raise AdmissionError(f"{server[1]}:{server[2]} has {self.max_connections_per_server} "
+                                                 f"busy tenant connections")
+                        self._condition.wait(remaining)
+        finally:
+            self._close(to_close)
+        created = client is not None
+        if not created:
+            entry.ready.wait()
+            if entry.error is not None:
+                self._release(entry)
+                raise entry.error
+            return entry
+        try:
+            client.connect()
+            entry.connector = self.connector(client)
+        except Exception as e:
+            entry.error = e
+            with self._condition:
+                self._remove(entry)
+                entry.in_use -= 1
+                self._condition.notify_all()
+            entry.ready.set()
+            raise
+        entry.ready.set()
+        logger.info(f"Connected tenant {tenant}.")
+        return entry
+
+    def _checkout(self, tenant):
+        entry = self._tenants.get(tenant)
+        if entry is not None:
+            self._tenants.move_to_end(tenant)
+            entry.in_use += 1
+        return entry
+
+    def _release(self, entry):
+        with self._condition:
+            entry.in_use -= 1
+            entry.last_used = self._clock()
+            self._condition.notify_all()
+
+    def _evict_lru(self, server, to_close):
+        for entry in self._tenants.values():
+            if entry.in_use == 0 and entry.ready.is_set() and (server is None or entry.server == server):
+                self._remove(entry)
+                to_close.append(entry)
+                self.evictions += 1
+                return True
+        return False
+
+    def _expired(self):
+        if self.idle_timeout is None:
+            return []
+        now = self._clock()
+        expired = [entry for entry in self._tenants.values()
+                   if entry.in_use == 0 and entry.ready.is_set() and now - entry.last_used >= self.idle_timeout]
+        for entry in expired:
+            self._remove(entry)
+        self.evictions += len(expired)
+        return expired
+
+    def _remove(self, entry):
+        if self._tenants.get(entry.tenant) is entry:
+            del self._tenants[entry.tenant]
+            self._servers[entry.server] -= 1
+            self._condition.notify_all()
+
+    def _close(self, entries):
+        for entry in entries:
+            if entry.connector is None:
+                continue
+            try:
+                entry.connector.close()
+                logger.info(f"Closed idle tenant {entry.tenant}.")
+            except Exception as e:
+                logger.warning(f"Error closing tenant {entry.tenant}: {e}")
+
+    def evict_idle(self):
+        """
+        Closes tenants that have been idle for longer than ``idle_timeout``.
+
+        :return: int, the number of tenants closed.
+        """
+        with self._condition:
+            expired = self._expired()
+        self._close(expired)
+        return len(expired)
+
+    def open_connections(self, server=None):
+        """
+        :param server: tuple or None, a server_key() to count for, or None for all servers.
+        :return: int, the number of open tenant connections.
+        """
+        with self._condition:
+            if server is None:
+                return sum(self._servers.values())
+            return self._servers.get(server, 0)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._tenants)
+
+    def close(self):
+        """Closes every idle tenant; tenants in use are closed when evicted later."""
+        with self._condition:
+            idle = [entry for entry in self._tenants.values() if entry.in_use == 0 and entry.ready.is_set()]
+            for entry in idle:
+                self._remove(entry)
+        self._close(idle)
@@ -0,0 +1,236 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+
+from .mirror import decode_value, encode_value
+
+logger = logging.getLogger(__name__)
+
+READ_OPERATIONS = ('fetch_data',)
+ALL_OPERATIONS = ('insert_data', 'fetch_data', 'update_data', 'delete_data', 'delete_all_data')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(query):
+    """
+    Normalizes a query into its shape: SQL literals and placeholder lists are collapsed,
+    MongoDB filter values are replaced while keys and operators are kept.
+
+    :param query: str or dict, the query.
+    :return: str, the normalized shape.
+    """
+    if isinstance(query, dict):
+        return json.dumps(_document_shape(query), sort_keys=True)
+    if not isinstance(query, str):
+        return type(query).__name__
+    shape = _STRING_LITERAL.sub('?', query)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _document_shape(value):
+    if isinstance(value, dict):
+        return {key: _document_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        return [_document_shape(item) for item in value]
+    return '?'
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile.
+
+    :param sorted_values: list of float, sorted ascending.
+    :param q: float, the percentile between 0 and 100.
+    :return: float or None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _dump_args(value):
+    # Parameters keep their types (ObjectId, datetime, Decimal, UUID, ...) so replayed filters match.
+    if isinstance(value, dict):
+        return {'d': {key: _dump_args(item) for key, item in value.items()}}
+    if isinstance(value, list):
+        return {'l': [_dump_args(item) for item in value]}
+    if isinstance(value, tuple):
+        return {'t': [_dump_args(item) for item in value]}
+    return encode_value(value)
+
+
+def _load_args(value):
+    if isinstance(value, list):
+        return decode_value(value)
+    if 'd' in value:
+        return {key: _load_args(item) for key, item in value['d'].items()}
+    items = [_load_args(item) for item in value.get('l', value.get('t'))]
+    return items if 'l' in value else tuple(items)
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class WorkloadRecorder:
+    """
+    Captures the operations issued through a DBConnect to a compact NDJSON file (gzip-compressed when
+    the path ends with .gz). Each query shape is written once; every operation then records only its
+    shape id, arrival offset, duration and, for the first operation of each shape and a sample of
+    the others, its parameters with their types.
+    """
+
+    def __init__(self, path, sample_rate=0.1, operations=ALL_OPERATIONS, clock=time.monotonic):
+        """
+        :param path: str, the capture file.
+        :param sample_rate: float, the share of operations whose parameters are stored (besides the first of each shape).
+        :param operations: tuple of str, the DBConnect operations to capture.
+        :param clock: callable, returns the current time in seconds.
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.operations = operations
+        self._clock = clock
+        self._start = clock()
+        self._shapes = {}
+        self._lock = threading.Lock()
+        self._file = _open(path, 'w')
+
+    def record(self, operation, args, duration, error=None):
+        """
+        Records one operation.
+
+        :param operation: str, the DBConnect method name.
+        :param args: tuple, the positional arguments of the call (query first, then parameters or data).
+        :param duration: float, the call duration in seconds.
+        :param error: Exception or None, the error raised by the call.
+        """
+        if operation not in self.operations or not args:
+            return
+        query = args[0]
+        shape = query_shape(query)
+        event = {'t': round(self._clock() - duration - self._start, 6), 'd': round(duration, 6)}
+        if error is not None:
+            event['e'] = type(error).__name__
+        sampled = random.random() < self.sample_rate
+        with self._lock:
+            if self._file is None:
+                return
+            shape_id = self._shapes.get((operation, shape))
+            if shape_id is None:
+                shape_id = self._shapes[(operation, shape)] = len(self._shapes)
+                definition = {'shape': shape_id, 'op': operation, 'text': shape}
+                self._file.write(json.dumps(definition, default=str) + '\n')
+                # Every shape gets a sample, so the replay keeps the captured mix of shapes.
+                sampled = True
+            if sampled:
+                event['p'] = _dump_args(list(args))
+            event['s'] = shape_id
+            self._file.write(json.dumps(event, default=str) + '\n')
+
+    def close(self):
+        """Flushes and closes the capture file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class WorkloadReplayer:
+    """
+    Replays a capture written by WorkloadRecorder against any Database implementation and reports
+    throughput and latency percentiles. Operations without sampled parameters reuse the most recent
+    sample for their shape.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: str, the capture file.
+        """
+        self.path = path
+
+    def load(self):
+        """
+        Reads the capture.
+
+        :return: list of tuple (offset, operation, args), ordered by arrival.
+        """
+        shapes, events = {}, []
+        with _open(self.path, 'r') as capture:
+            for line in capture:
+                record = json.loads(line)
+                if 'shape' in record:
+                    shapes[record['shape']] = record
+                    continue
+                shape = shapes[record['s']]
+                if 'p' in record:
+                    # Earlier captures stored the arguments as plain JSON.
+                    shape['args'] = record['p'] if isinstance(record['p'], list) else _load_args(record['p'])
+                if 'args' not in shape:
+                    continue
+                events.append((record['t'], shape['op'], tuple(shape['args'])))
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def replay(self, db, speed=1.0, concurrency=8, operations=READ_OPERATIONS, limit=None):
+        """
+        Replays the capture.
+
+        :param db: Database or DBConnect, the target of the replay.
+        :param speed: float or None, the replay speed relative to the capture (2.0 is twice as fast);
+            None or 0 replays as fast as possible.
+        :param concurrency: int, the maximum number of operations in flight.
+        :param operations: tuple of str, the operations to replay (reads only by default).
+        :param limit: int or None, the maximum number of operations to replay.
+        :return: dict with 'operations', 'errors', 'elapsed', 'throughput' and 'latency' (p50/p95/p99/max, seconds).
+        """
+        events = [event for event in self.load() if event[1] in operations][:limit]
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def run(operation, args):
+            start = time.perf_counter()
+            try:
+                getattr(db, operation)(*args)
+            except Exception as e:
+                logger.debug(f"Replayed {operation} failed: {e}")
+                with lock:
+                    errors[0] += 1
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for offset, operation, args in events:
+                if speed:
+                    delay = offset / speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                executor.submit(run, operation, args)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        report = {
+            'operations': len(latencies),
+            'errors': errors[0],
+            'elapsed': elapsed,
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'latency': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                        'p99': percentile(latencies, 99), 'max': latencies[-1] if latencies else None},
+        }
+        logger.info(f"Replayed {report['operations']} operations at {report['throughput']:.1f} ops/s.")
+        return report
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.admission import Bulkhead, AsyncBulkhead, CircuitBreaker
+from MultiDBLib.src.databaseconnector.exceptions import AdmissionError, CircuitOpenError
+
+
+def test_bulkhead_sheds_when_queue_full():
+    bulkhead = Bulkhead(max_concurrent=1, max_queue=0)
+    bulkhead.acquire()
+
+    with pytest.raises(AdmissionError):
+        bulkhead.acquire()
+    assert bulkhead.rejected == 1
+
+    bulkhead.release()
+    bulkhead.acquire()
+
+
+def test_bulkhead_wait_times_out():
+    bulkhead = Bulkhead(max_concurrent=1, max_queue=1, timeout=0.01)
+    bulkhead.acquire()
+
+    with pytest.raises(AdmissionError):
+        bulkhead.acquire()
+    assert bulkhead.waiting == 0
+
+
+def test_circuit_breaker_opens_on_failures_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, reset_timeout=10, clock=lambda: now[0])
+    for succeeded in (True, False, True, False):
+        breaker.allow()
+        breaker.record(succeeded, 0.01)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    now[0] = 11.0
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(slow_call_duration=1.0, slow_call_rate=0.5, window=2, min_calls=2)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record(True, 2.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_dbconnect_fast_fails_when_circuit_open():
+    db = MagicMock(spec=PostgresClient)
+    db.fetch_data.side_effect = RuntimeError("timeout")
+    connector = DBConnect(db, bulkhead=Bulkhead(2), circuit_breaker=CircuitBreaker(window=2, min_calls=2))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            connector.fetch_data("SELECT 1")
+    with pytest.raises(CircuitOpenError):
+        connector.fetch_data("SELECT 1")
+    assert db.fetch_data.call_count == 2
+
+
+def test_async_bulkhead_limits_afetch_data():
+    db = MagicMock(spec=PostgresClient)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def fetch(query):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.01)
+        with lock:
+            running[0] -= 1
+        return [(1,)]
+
+    db.fetch_data.side_effect = fetch
+    connector = DBConnect(db, async_bulkhead=AsyncBulkhead(max_concurrent=2, max_queue=10))
+
+    async def run():
+        return await asyncio.gather(*(connector.afetch_data("SELECT 1") for _ in range(6)))
+
+    assert asyncio.run(run()) == [[(1,)]] * 6
+    assert peak[0] <= 2
@@ -0,0 +1,103 @@
+import os
+import threading
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.autotune import BatchSizeTuner, batches
+
+
+def test_aimd_grows_while_fast_and_halves_when_slow():
+    tuner = BatchSizeTuner(initial=1000, step=500, target_latency=1.0)
+    assert tuner.record("orders", 1000, 0.1) == 1500
+    assert tuner.record("orders", 1500, 0.12) == 2000
+    assert tuner.record("orders", 2000, 1.5) == 1000
+    assert tuner.record("orders", 1000, 0.1, error=True) == 500
+    assert tuner.size("customers") == 1000
+
+
+def test_throughput_drop_steps_back_and_bounds_apply():
+    tuner = BatchSizeTuner(initial=1000, step=500, max_size=1500)
+    tuner.record("t", 1000, 0.1)
+    assert tuner.size("t") == 1500
+    assert tuner.record("t", 1500, 0.5) == 1000
+    assert tuner.record("t", 200, 0.01) == 1000
+
+
+def test_learned_sizes_persist_across_runs(tmp_path):
+    path = str(tmp_path / "batch_sizes.json")
+    tuner = BatchSizeTuner(initial=1000, step=500, state_path=path, save_every=1)
+    tuner.record("orders", 1000, 0.1)
+
+    assert BatchSizeTuner(initial=1000, state_path=path).size("orders") == 1500
+
+
+def test_concurrent_saves_do_not_share_a_temporary_file(tmp_path):
+    path = str(tmp_path / "batch_sizes.json")
+    tuner = BatchSizeTuner(initial=1000, state_path=path, save_every=1)
+    threads = [threading.Thread(target=lambda n=n: [tuner.record(f"t{n}", 1000, 0.1) for _ in range(20)])
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert os.listdir(tmp_path) == ["batch_sizes.json"]
+    assert BatchSizeTuner(state_path=path).size("t7") == tuner.size("t7")
+
+
+def test_batches_follow_the_tuner():
+    tuner = BatchSizeTuner(initial=2, min_size=1, step=1)
+    sizes = []
+    for batch in batches(range(10), 100, tuner, "k"):
+        sizes.append(len(batch))
+        tuner.record("k", len(batch), 0.01)
+    assert sizes == [2, 3, 4, 1]
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.execute_batch')
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_postgres_insert_many_commits_per_tuned_batch(mock_connect, mock_execute_batch):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connect()
+    tuner = BatchSizeTuner(initial=2, min_size=1, step=2)
+
+    total = client.insert_many("INSERT INTO t VALUES (%s)", [(i,) for i in range(7)], tuner=tuner, tuner_key="t")
+
+    assert total == 7
+    assert [len(call[0][2]) for call in mock_execute_batch.call_args_list] == [2, 4, 1]
+    assert mock_connect.return_value.commit.call_count == 3
+
+
+def test_mssql_iter_data_uses_tuned_fetch_size():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = MagicMock()
+    cursor = client.connection.cursor.return_value.__enter__.return_value
+    cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+    tuner = BatchSizeTuner(initial=2, min_size=1, step=3)
+
+    assert list(client.iter_data("SELECT id FROM t", tuner=tuner)) == [[(1,), (2,)], [(3,)]]
+    assert [call[0][0] for call in cursor.fetchmany.call_args_list] == [2, 5, 5]
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_insert_many_batches_documents(mock_client):
+    client = MongoDBClient("localhost", 27017, "test_db", "events")
+    client.connect()
+    client.collection.insert_many.side_effect = lambda batch: MagicMock(inserted_ids=[d["n"] for d in batch])
+
+    assert client.insert_many(({"n": i} for i in range(5)), batch_size=2) == [0, 1, 2, 3, 4]
+    assert client.collection.insert_many.call_count == 3
+
+
+def test_mongo_iter_data_requeries_each_tuned_batch_after_the_last_id():
+    client = MongoDBClient("localhost", 27017, "test_db", "events")
+    client.collection = MagicMock()
+    pages = [[{"_id": 1, "n": "a"}, {"_id": 2, "n": "b"}], [{"_id": 3, "n": "c"}]]
+    client.collection.find.return_value.sort.return_value.limit.side_effect = pages
+    tuner = BatchSizeTuner(initial=2, min_size=1, step=3)
+
+    assert list(client.iter_data({"k": 1}, {"_id": 0, "n": 1}, tuner=tuner)) == [[{"n": "a"}, {"n": "b"}], [{"n": "c"}]]
+    assert [call[0] for call in client.collection.find.call_args_list] == [
+        ({"k": 1}, {"n": 1}), ({"$and": [{"k": 1}, {"_id": {"$gt": 2}}]}, {"n": 1})]
+    assert [call[0][0] for call in client.collection.find.return_value.sort.return_value.limit.call_args_list] == [2, 5]
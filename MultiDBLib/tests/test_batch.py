@@ -0,0 +1,79 @@
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.batch import is_read_statement
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_postgres_batch_keeps_order_and_types(mock_psycopg2):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    descriptions = [[("id",), ("id",)], None, [("count",)]]
+    mock_cursor.execute.side_effect = lambda query, params: setattr(mock_cursor, 'description', descriptions.pop(0))
+    mock_cursor.fetchall.side_effect = [[(1, 1)], [(Decimal("3.50"),)]]
+    mock_cursor.rowcount = 2
+    client.connection = mock_connection
+
+    with DBConnect(client).batch() as batch:
+        batch.add("SELECT a.id, b.id FROM a JOIN b USING (id) WHERE a.id = %s", (1,))
+        batch.add("UPDATE orders SET total = total + 1")
+        batch.add("SELECT sum(total) FROM orders")
+
+    assert batch.results == [[(1, 1)], 2, [(Decimal("3.50"),)]]
+    assert [c[0][0] for c in mock_cursor.execute.call_args_list] == [
+        "SELECT a.id, b.id FROM a JOIN b USING (id) WHERE a.id = %s",
+        "UPDATE orders SET total = total + 1",
+        "SELECT sum(total) FROM orders"]
+    mock_connection.commit.assert_called_once()
+
+
+def test_data_modifying_with_is_not_a_read():
+    assert is_read_statement("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert is_read_statement("WITH t AS (SELECT id FROM a) SELECT * FROM t FOR UPDATE")
+    assert not is_read_statement("WITH moved AS (DELETE FROM a RETURNING *) INSERT INTO b SELECT * FROM moved")
+    assert not is_read_statement("with t as (update a set x = 1 returning id) select * from t")
+
+
+@patch('MultiDBLib.src.databaseconnector.mssql_client.pyodbc.connect')
+def test_mssql_batch_reads_results_with_nextset(mock_pyodbc_connect):
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.__enter__.return_value = mock_cursor
+    descriptions = iter([(("id",),), None])
+    type(mock_cursor).description = property(lambda self: next(descriptions))
+    mock_cursor.fetchall.return_value = [(1,)]
+    mock_cursor.rowcount = 2
+    mock_cursor.nextset.side_effect = [True, False]
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = mock_connection
+
+    batch = DBConnect(client).batch()
+    batch.add("SELECT id FROM users WHERE id = ?", (1,))
+    batch.add("UPDATE users SET seen = 1 WHERE team = ?", ("a",))
+    results = batch.execute()
+
+    assert results == [[(1,)], 2]
+    mock_cursor.execute.assert_called_once_with(
+        "SELECT id FROM users WHERE id = ?;\nUPDATE users SET seen = 1 WHERE team = ?", [1, "a"])
+    mock_connection.commit.assert_called_once()
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_batch_falls_back_to_sequential_fetches(mock_mongo):
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value.__getitem__.return_value = mock_collection
+    mock_collection.find.side_effect = [[{"a": 1}], []]
+    client = MongoDBClient('localhost', 27017, 'testdb', 'testcollection')
+    client.connect()
+
+    batch = DBConnect(client).batch()
+    batch.add({"a": 1})
+    batch.add({"a": 2})
+
+    assert batch.execute() == [[{"a": 1}], []]
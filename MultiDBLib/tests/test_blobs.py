@@ -0,0 +1,98 @@
+import io
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.blobs import ChunkedBlobReader, copy_in_chunks
+
+DATA = bytes(range(256)) * 40
+
+
+def test_reader_fills_caller_buffer():
+    calls = []
+
+    def read_chunk(offset, size):
+        calls.append((offset, size))
+        return DATA[offset:offset + size]
+
+    reader = ChunkedBlobReader(read_chunk, len(DATA), chunk_size=4096)
+    buffer = bytearray(4096)
+
+    chunks = [bytes(chunk) for chunk in reader.iter_chunks(buffer)]
+
+    assert b"".join(chunks) == DATA
+    assert calls == [(0, 4096), (4096, 4096), (8192, 2048)]
+
+
+def test_copy_in_chunks_reuses_buffer():
+    written = []
+    total = copy_in_chunks(io.BytesIO(DATA), lambda offset, chunk: written.append((offset, bytes(chunk))), 4000)
+
+    assert total == len(DATA)
+    assert [offset for offset, _ in written] == [0, 4000, 8000]
+    assert b"".join(chunk for _, chunk in written) == DATA
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_postgres_open_blob_reads_substrings(mock_psycopg2):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(10,)]
+    mock_cursor.fetchone.return_value = (memoryview(b"abcd"),)
+    client.connection = mock_connection
+
+    reader = client.open_blob("files", "content", "id", 7, chunk_size=4)
+    buffer = bytearray(4)
+
+    assert reader.readinto(buffer) == 4
+    assert buffer == b"abcd"
+    mock_cursor.execute.assert_called_with("SELECT substring(content FROM %s FOR %s) FROM files WHERE id = %s", (1, 4, 7))
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_postgres_write_blob_stages_in_large_object(mock_psycopg2):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connection = MagicMock()
+    staging = client.connection.lobject.return_value
+    staging.oid = 99
+    cursor = client.connection.cursor.return_value
+
+    assert client.write_blob("files", "content", "id", 7, io.BytesIO(b"abcdef"), chunk_size=4) == 6
+
+    assert [c[0][0] for c in staging.write.call_args_list] == [b"abcd", b"ef"]
+    assert cursor.execute.call_args_list[0][0] == ("UPDATE files SET content = lo_get(%s) WHERE id = %s", (99, 7))
+    assert cursor.execute.call_args_list[1][0] == ("SELECT lo_unlink(%s)", (99,))
+    client.connection.commit.assert_called_once()
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_postgres_large_object_reader_uses_own_connection(mock_psycopg2):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connection = MagicMock()
+    dedicated = mock_psycopg2.connect.return_value
+    dedicated.lobject.return_value.seek.return_value = 3
+
+    reader = client.open_large_object(42)
+    reader.close()
+
+    dedicated.lobject.assert_called_once_with(42, 'rb')
+    dedicated.close.assert_called_once()
+    client.connection.commit.assert_not_called()
+
+
+@patch('MultiDBLib.src.databaseconnector.mssql_client.pyodbc.connect')
+def test_mssql_write_blob_appends_with_write(mock_pyodbc_connect):
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.__enter__.return_value = mock_cursor
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = mock_connection
+
+    written = client.write_blob("files", "content", "id", 7, io.BytesIO(b"abcdef"), chunk_size=4)
+
+    assert written == 6
+    assert mock_cursor.execute.call_args_list[1][0] == ("UPDATE files SET content.WRITE(?, NULL, NULL) WHERE id = ?", (b"abcd", 7))
+    assert mock_cursor.execute.call_args_list[2][0][1] == (b"ef", 7)
+    mock_connection.commit.assert_called_once()
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.exceptions import FetchError
+
+
+@pytest.fixture
+def postgres():
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connection = MagicMock()
+    cursor = client.connection.cursor.return_value
+    return client, cursor
+
+
+def test_exact_count_pushes_count_to_server(postgres):
+    client, cursor = postgres
+    cursor.fetchone.return_value = (42,)
+
+    assert DBConnect(client).count("orders", "status = %s", params=("open",)) == 42
+    cursor.execute.assert_called_once_with("SELECT COUNT(*) FROM orders WHERE status = %s", ("open",))
+
+
+def test_count_wraps_queries(postgres):
+    client, cursor = postgres
+    cursor.fetchone.return_value = (3,)
+
+    client.count("SELECT DISTINCT customer FROM orders;")
+    cursor.execute.assert_called_once_with(
+        "SELECT COUNT(*) FROM (SELECT DISTINCT customer FROM orders) AS counted", None)
+
+
+def test_approximate_count_uses_reltuples_then_explain(postgres):
+    client, cursor = postgres
+    cursor.fetchone.side_effect = [(1000000,), (-1,), ([{"Plan": {"Plan Rows": 512}}],)]
+
+    assert client.count("orders", approximate=True) == 1000000
+    assert client.count("fresh_table", approximate=True) == 512
+    assert cursor.execute.call_args[0][0] == "EXPLAIN (FORMAT JSON) SELECT 1 FROM fresh_table"
+
+
+def test_count_errors_raise_fetch_error(postgres):
+    client, cursor = postgres
+    cursor.execute.side_effect = Exception("relation does not exist")
+    with pytest.raises(FetchError):
+        client.count("missing")
+
+
+def test_mssql_approximate_count_reads_partitions_and_showplan():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = MagicMock()
+    cursor = client.connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [(250,), ('<StmtSimple StatementEstRows="17.4" />',)]
+
+    assert client.count("dbo.orders", approximate=True) == 250
+    assert client.count("dbo.orders", "status = 'open'", approximate=True) == 17
+    assert [c[0][0] for c in cursor.execute.call_args_list[1:]] == [
+        "SET SHOWPLAN_XML ON", "SELECT 1 FROM dbo.orders WHERE status = 'open'", "SET SHOWPLAN_XML OFF"]
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_count(mock_client):
+    client = MongoDBClient("localhost", 27017, "test_db", "orders")
+    client.connect()
+    client.collection.estimated_document_count.return_value = 900
+    client.collection.count_documents.return_value = 12
+
+    assert client.count(approximate=True) == 900
+    assert client.count(filter={"status": "open"}, approximate=True) == 12
+    client.collection.count_documents.assert_called_once_with({"status": "open"})
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.diff import TableDiff, Difference, row_hash
+
+
+class FakeSide:
+    server_side = True
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.transferred = 0
+
+    def _range(self, lo, hi):
+        return {k: row_hash(v) for k, v in self.rows.items() if (lo is None or k >= lo) and (hi is None or k < hi)}
+
+    def bounds(self):
+        return (min(self.rows), max(self.rows)) if self.rows else (None, None)
+
+    def checksum(self, lo, hi):
+        hashes = self._range(lo, hi)
+        return len(hashes), sum(hashes.values())
+
+    def row_hashes(self, lo, hi):
+        hashes = self._range(lo, hi)
+        self.transferred += len(hashes)
+        return hashes
+
+
+def postgres():
+    return PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+
+
+def test_narrowing_finds_differences_with_small_transfer():
+    rows = {i: (i, f"name-{i}") for i in range(10000)}
+    changed = dict(rows)
+    changed[1234] = (1234, "renamed")
+    del changed[8000]
+    changed[10005] = (10005, "new")
+    diff = TableDiff(postgres(), postgres(), "id", ["id", "name"], left_table="a", right_table="b",
+                     leaf_size=50, fanout=8)
+    diff.left, diff.right = FakeSide(rows), FakeSide(changed)
+
+    assert list(diff) == [Difference(1234, "changed"), Difference(8000, "missing_right"),
+                          Difference(10005, "missing_left")]
+    assert diff.left.transferred < 200
+
+
+def test_sql_sides_hash_on_the_server():
+    pg = postgres()
+    pg.fetch_data = MagicMock(return_value=[(3, 99)])
+    mssql = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    mssql.fetch_data = MagicMock(return_value=[(3, 99)])
+    diff = TableDiff(pg, mssql, "id", ["id", "name"], left_table="users", right_table="dbo.users")
+
+    assert diff.left.checksum(1, 5) == diff.right.checksum(1, 5) == (3, 99)
+    assert pg.fetch_data.call_args[0] == (
+        "SELECT COUNT(*), SUM(('x' || substr(md5(concat_ws('|', COALESCE((id)::text, '\\N'), "
+        "COALESCE((name)::text, '\\N'))), 1, 8))::bit(32)::bigint) FROM users WHERE id >= %s AND id < %s", (1, 5))
+    assert "HASHBYTES('MD5', CONVERT(VARBINARY(MAX), CONVERT(VARCHAR(MAX), CONCAT(" \
+           "ISNULL(CONVERT(NVARCHAR(MAX), id), N'\\N'), N'|', " in mssql.fetch_data.call_args[0][0]
+
+
+def test_non_ascii_text_is_hashed_as_utf8_on_every_side():
+    mssql = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    diff = TableDiff(postgres(), mssql, "id", ["id", "name"], left_table="users", right_table="dbo.users")
+
+    # md5('7|Zoë 東京') computed over UTF-8 bytes, as PostgreSQL does with a UTF8 database.
+    assert row_hash((7, "Zoë 東京")) == int("99e78848", 16)
+    assert "N'\\N'), N'') COLLATE Latin1_General_100_CI_AS_SC_UTF8))" in diff.right.hash
+
+
+def test_mongo_against_sql_walks_chunks_and_hashes_client_side():
+    mongo = MongoDBClient("localhost", 27017, "test_db", "users")
+    mongo.collection = MagicMock()
+    documents = [{"_id": i, "name": f"n{i}"} for i in (1, 2, 3)]
+    mongo.collection.find.return_value.sort.return_value.limit.return_value = documents
+    pg = postgres()
+    hashes = {1: row_hash((1, "n1")), 2: row_hash((2, "changed"))}
+    pg.fetch_data = MagicMock(side_effect=[[(2, sum(hashes.values()))], list(hashes.items())])
+
+    diff = TableDiff(mongo, pg, "_id", ["_id", "name"], right_key="id", right_columns=["id", "name"],
+                     right_table="users", leaf_size=10)
+
+    assert list(diff) == [Difference(2, "changed"), Difference(3, "missing_right")]
@@ -0,0 +1,131 @@
+import pytest
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.partitioned import PartitionedReader
+from MultiDBLib.src.databaseconnector.export import RollingFileWriter, export_batches, numbered_path
+from MultiDBLib.src.databaseconnector.exceptions import FetchError
+
+
+def test_numbered_path_keeps_all_extensions():
+    assert numbered_path("out/orders.csv.gz", "00001") == "out/orders-00001.csv.gz"
+
+
+def test_rolling_writer_starts_new_compressed_file_with_header(tmp_path):
+    writer = RollingFileWriter(str(tmp_path / "orders.csv.gz"), compression="gzip", max_bytes=10, header=b"id\n")
+    writer.write_records(b"1\n2\n3\n4\n")
+    writer.write_records(b"5\n")
+
+    paths = writer.close()
+
+    assert [p.rsplit("/", 1)[1] for p in paths] == ["orders-00000.csv.gz", "orders-00001.csv.gz"]
+    assert gzip.open(paths[0]).read() == b"id\n1\n2\n3\n4\n"
+    assert gzip.open(paths[1]).read() == b"id\n5\n"
+
+
+def test_export_batches_writes_csv_and_ndjson(tmp_path):
+    batches = [(("id", "name"), [(1, "a"), (2, "b,c")]), (("id", "name"), [(3, None)])]
+
+    count, paths = export_batches(batches, str(tmp_path / "rows.csv"))
+    assert count == 3
+    assert open(paths[0]).read() == 'id,name\n1,a\n2,"b,c"\n3,\n'
+
+    count, paths = export_batches(batches, str(tmp_path / "rows.ndjson"), format="ndjson")
+    assert [json.loads(line) for line in open(paths[0])][2] == {"id": 3, "name": None}
+
+
+def test_failed_export_leaves_no_files(tmp_path):
+    def batches():
+        yield ("id",), [(1,), (2,)]
+        yield ("id",), [(3,)]
+        raise RuntimeError("connection lost")
+
+    for format in ("csv", "ndjson"):
+        with pytest.raises(RuntimeError):
+            export_batches(batches(), str(tmp_path / f"rows.{format}"), format=format, max_file_size=4)
+    assert os.listdir(tmp_path) == []
+
+
+def test_parquet_column_type_comes_from_first_non_null_values(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    batches = [(("id", "note"), [(1, None), (2, None)]), (("id", "note"), [(3, "late")]),
+               (("id", "note"), [(4, None)])]
+
+    count, paths = export_batches(batches, str(tmp_path / "rows.parquet"), format="parquet")
+
+    table = pyarrow.parquet.read_table(paths[0])
+    assert count == 4
+    assert str(table.schema.field("note").type) == "string"
+    assert table.column("note").to_pylist() == [None, None, "late", None]
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_postgres_csv_export_uses_copy(mock_connect, tmp_path):
+    mock_cursor = MagicMock()
+    mock_connect.return_value.cursor.return_value = mock_cursor
+    mock_cursor.mogrify.return_value = b"SELECT * FROM orders WHERE id > 5;"
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connect()
+
+    paths = client.export("SELECT * FROM orders WHERE id > %s;", str(tmp_path / "orders.csv.gz"), params=(5,))
+
+    assert paths == [str(tmp_path / "orders.csv.gz")]
+    statement, output = mock_cursor.copy_expert.call_args[0]
+    assert statement == "COPY (SELECT * FROM orders WHERE id > 5) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    assert isinstance(output, gzip.GzipFile)
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_postgres_failed_copy_cleans_up(mock_connect, tmp_path):
+    mock_cursor = MagicMock()
+    mock_connect.return_value.cursor.return_value = mock_cursor
+    mock_cursor.mogrify.return_value = b"SELECT * FROM orders"
+
+    def fail(statement, output):
+        output.write(b"id\n1\n")
+        raise RuntimeError("connection lost")
+
+    mock_cursor.copy_expert.side_effect = fail
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connect()
+    path = tmp_path / "orders.csv"
+
+    with pytest.raises(FetchError):
+        client.export("SELECT * FROM orders", str(path))
+
+    assert not path.exists()
+    mock_cursor.close.assert_called_once()
+    mock_connect.return_value.rollback.assert_called_once()
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_csv_export_uses_projection_columns(mock_client, tmp_path):
+    client = MongoDBClient("localhost", 27017, "test_db", "orders")
+    client.connect()
+    client.collection.find.return_value = iter([{"_id": 1, "total": 5}, {"_id": 2}])
+
+    paths = client.export({}, str(tmp_path / "orders.csv"), format="csv", projection={"total": 1})
+
+    client.collection.find.assert_called_once_with({}, {"total": 1}, batch_size=10000)
+    assert open(paths[0]).read() == "_id,total\n1,5\n2,\n"
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_partitioned_export_writes_one_file_per_partition(mock_connect, tmp_path):
+    mock_cursor = MagicMock()
+    mock_connect.return_value.cursor.return_value = mock_cursor
+    mock_cursor.description = [("id",)]
+    mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [], [(3,)], []]
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    reader = PartitionedReader(client, "events", partitions=2, key_column="id", lower=1, upper=3,
+                               executor=ThreadPoolExecutor(max_workers=1))
+
+    paths = reader.export(str(tmp_path / "events.ndjson"), format="ndjson")
+
+    assert [p.rsplit("/", 1)[1] for p in paths] == ["events-part-0000.ndjson", "events-part-0001.ndjson"]
+    assert sum(len(open(p).readlines()) for p in paths) == 3
@@ -0,0 +1,127 @@
+import threading
+import time
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.db import Database
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.hedging import HedgedReads
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+
+
+def make_client(rows, release=None):
+    client = MagicMock(spec=Database)
+
+    def fetch_data(*args, **kwargs):
+        if release is not None:
+            release.wait(1.0)
+        return rows
+
+    client.fetch_data.side_effect = fetch_data
+    return client
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    release = threading.Event()
+    primary = make_client([("slow",)], release)
+    primary.cancel.side_effect = release.set
+    replica = make_client([("fast",)])
+    hedging = HedgedReads([replica], initial_delay=0.01, budget=1.0, burst=1.0)
+
+    rows = DBConnect(primary, hedging=hedging).fetch_data("SELECT 1")
+
+    assert rows == [("fast",)]
+    primary.cancel.assert_called_once()
+    assert (hedging.requests, hedging.hedges, hedging.hedge_wins) == (1, 1, 1)
+    assert hedging.win_rate == 1.0
+    hedging.close()
+
+
+def test_loser_that_cannot_be_cancelled_does_not_delay_the_winner():
+    release = threading.Event()
+    primary = make_client([("slow",)], release)
+    primary.cancel.return_value = False
+    replica = make_client([("fast",)])
+    hedging = HedgedReads([replica], initial_delay=0.01, budget=1.0, burst=1.0, cancel_timeout=5.0)
+
+    start = time.monotonic()
+    assert hedging.fetch(primary, primary.fetch_data, "db.orders.find()") == [("fast",)]
+    assert time.monotonic() - start < 0.5
+    release.set()
+    hedging.close()
+
+
+def test_fast_primary_is_not_hedged():
+    primary = make_client([(1,)])
+    replica = make_client([(2,)])
+    hedging = HedgedReads([replica], initial_delay=1.0)
+
+    assert DBConnect(primary, hedging=hedging).fetch_data("SELECT 1", (5,)) == [(1,)]
+
+    primary.fetch_data.assert_called_once_with("SELECT 1", (5,))
+    replica.fetch_data.assert_not_called()
+    assert hedging.hedge_rate == 0.0
+    hedging.close()
+
+
+def test_budget_limits_hedges():
+    release = threading.Event()
+    primary = make_client([(1,)], release)
+    replica = make_client([(2,)], release)
+    hedging = HedgedReads([replica], initial_delay=0.01, budget=0.0, burst=0.0)
+
+    threading.Timer(0.05, release.set).start()
+    assert hedging.fetch(primary, primary.fetch_data, "SELECT 1") == [(1,)]
+
+    assert hedging.hedges == 0
+    assert hedging.budget_denied == 1
+    hedging.close()
+
+
+def test_delay_follows_recent_latency_percentile():
+    hedging = HedgedReads([make_client([])], percentile=50, min_samples=3, initial_delay=0.5)
+    assert hedging.delay() == 0.5
+    for latency in (0.01, 0.02, 0.03):
+        hedging._observe(latency)
+    assert hedging.delay() == 0.02
+    hedging.close()
+
+
+class QueryCanceled(Exception):
+    pass
+
+
+def test_cancelled_postgres_read_rolls_back_before_next_read():
+    primary = PostgresClient("localhost", 5432, "user", "pass", "db")
+    primary.connection = MagicMock()
+    cancelled, aborted = threading.Event(), []
+    cursor = primary.connection.cursor.return_value
+    cursor.fetchall.return_value = [("primary",)]
+
+    def execute(query, params):
+        if query == "SELECT slow" and not aborted:
+            cancelled.wait(1.0)
+            aborted.append(True)
+            raise QueryCanceled("canceling statement due to user request")
+        if aborted and not primary.connection.rollback.called:
+            raise RuntimeError("current transaction is aborted")
+
+    cursor.execute.side_effect = execute
+    primary.connection.cancel.side_effect = cancelled.set
+    hedging = HedgedReads([make_client([("replica",)])], initial_delay=0.01, budget=1.0, burst=1.0)
+    connector = DBConnect(primary, hedging=hedging)
+
+    assert connector.fetch_data("SELECT slow") == [("replica",)]
+    primary.connection.rollback.assert_called_once()
+    assert primary.fetch_data("SELECT 1") == [("primary",)]
+    hedging.close()
+
+
+def test_mssql_cancel_targets_the_calling_thread():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    mine, other = MagicMock(), MagicMock()
+    client._active_cursors = {1: mine, 2: other}
+
+    assert client.cancel(2) is True
+    other.cancel.assert_called_once()
+    mine.cancel.assert_not_called()
+    assert client.cancel(3) is False
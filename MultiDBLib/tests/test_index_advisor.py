@@ -0,0 +1,56 @@
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.index_advisor import query_shape, recommend_index, plan_stages
+
+COLLSCAN_PLAN = {'queryPlanner': {'winningPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}}
+IXSCAN_PLAN = {'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}
+
+
+def test_recommend_index_follows_equality_sort_range():
+    shape = query_shape({'status': 'open', 'age': {'$gt': 30}, '$and': [{'team': {'$in': ['a', 'b']}}]},
+                        sort=[('created', -1)])
+
+    assert shape.equality == ('status', 'team')
+    assert shape.range == ('age',)
+    assert recommend_index(shape) == [('status', 1), ('team', 1), ('created', -1), ('age', 1)]
+
+
+def test_plan_stages_walks_nested_plans():
+    assert plan_stages(COLLSCAN_PLAN) == {'SORT', 'COLLSCAN'}
+    assert plan_stages({'queryPlanner': {'winningPlan': {'queryPlan': {'stage': 'IXSCAN'}}}}) == {'IXSCAN'}
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_recommend_and_ensure_indexes(mock_mongo):
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value.__getitem__.return_value = mock_collection
+    mock_collection.find.return_value.explain.side_effect = [COLLSCAN_PLAN, IXSCAN_PLAN]
+    mock_collection.index_information.return_value = {'_id_': {'key': [('_id', 1)]}, 'email_1': {'key': [('email', 1)]}}
+    mock_collection.create_indexes.return_value = ['status_1_created_-1']
+    client = MongoDBClient('localhost', 27017, 'testdb', 'orders')
+    client.connect()
+    client.track_query_shapes()
+
+    client.fetch_data({'status': 'open'}, sort=[('created', -1)])
+    client.fetch_data({'status': 'closed'}, sort=[('created', -1)])
+    client.delete_data({'email': 'a@example.com'})
+
+    recommendations = client.recommend_indexes()
+    created = client.ensure_indexes(recommendations + [[('email', 1)]])
+
+    assert recommendations == [[('status', 1), ('created', -1)]]
+    assert created == ['status_1_created_-1']
+    models = mock_collection.create_indexes.call_args[0][0]
+    assert [list(model.document['key'].items()) for model in models] == [[('status', 1), ('created', -1)]]
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_index_usage_from_index_stats(mock_mongo):
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value.__getitem__.return_value = mock_collection
+    mock_collection.aggregate.return_value = [{'name': 'status_1', 'accesses': {'ops': 12, 'since': 'now'}}]
+    client = MongoDBClient('localhost', 27017, 'testdb', 'orders')
+    client.connect()
+
+    assert client.index_usage() == {'status_1': {'ops': 12, 'since': 'now'}}
+    mock_collection.aggregate.assert_called_once_with([{'$indexStats': {}}])
@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.joins import HashJoin, LookupJoin, scan
+
+
+CUSTOMERS = [[{"id": 1, "name": "a"}, {"id": 2, "name": "b"}], [{"id": 3, "name": "c"}]]
+ORDERS = [[{"customer": 1, "total": 10}, {"customer": 3, "total": 5}], [{"customer": 1, "total": 7}, {"customer": 9, "total": 1}]]
+
+
+def pairs(join):
+    return sorted((probe["total"], match and match["name"]) for probe, match in join)
+
+
+def test_in_memory_hash_join():
+    join = HashJoin(CUSTOMERS, ORDERS, "id", "customer")
+    assert pairs(join) == [(5, "c"), (7, "a"), (10, "a")]
+    assert not join.spilled
+
+
+def test_grace_hash_join_spills_and_matches_in_memory_result(tmp_path):
+    join = HashJoin(CUSTOMERS, ORDERS, "id", "customer", how="left", memory_budget=1, partitions=4,
+                    spill_dir=str(tmp_path))
+
+    assert pairs(join) == [(1, None), (5, "c"), (7, "a"), (10, "a")]
+    assert join.spilled
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_lookup_join_batches_keys_into_sql_in_list():
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.fetch_data = MagicMock(side_effect=[[{"id": 1, "name": "a"}, {"id": 3, "name": "c"}], []])
+
+    join = LookupJoin(ORDERS, client, "SELECT id, name FROM customers WHERE id IN {keys}", "customer", "id",
+                      batch_size=3)
+
+    assert pairs(join) == [(5, "c"), (7, "a"), (10, "a")]
+    query, params = client.fetch_data.call_args_list[0][0]
+    assert query == "SELECT id, name FROM customers WHERE id IN (%s, %s)"
+    assert params == (1, 3)
+    assert join.lookups == 2
+
+
+def test_lookup_join_uses_in_filter_for_mongo():
+    client = MongoDBClient("localhost", 27017, "test_db", "customers")
+    client.fetch_data = MagicMock(return_value=[{"id": 1, "name": "a"}])
+
+    join = LookupJoin(ORDERS, client, {"active": True}, "customer", "id", how="left")
+
+    assert pairs(join) == [(1, None), (5, None), (7, "a"), (10, "a")]
+    client.fetch_data.assert_called_once_with({"$and": [{"active": True}, {"id": {"$in": [1, 3, 9]}}]})
+
+
+def test_scan_returns_dict_rows_for_sql():
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.iter_data = MagicMock(return_value=iter([]))
+    scan(client, "SELECT * FROM t", batch_size=10)
+    row_factory = client.iter_data.call_args[1]["row_factory"]
+    assert row_factory(("a", "b"), [(1, 2)]) == [{"a": 1, "b": 2}]
@@ -0,0 +1,71 @@
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.metadata import MetadataCache, convert_rows
+
+
+def make_client():
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.metadata_cache = MetadataCache(ttl=60)
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    client.connection = mock_connection
+    return client, mock_cursor
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_table_metadata_loaded_once(mock_psycopg2):
+    client, mock_cursor = make_client()
+    mock_cursor.fetchall.side_effect = [
+        [("id", "integer"), ("price", "numeric(12,2)")],
+        [("orders_pkey", True, "id"), ("orders_price_idx", False, "price")],
+    ]
+
+    metadata = client.table_metadata("orders")
+    again = client.table_metadata("orders")
+
+    assert again is metadata
+    assert metadata.columns == ("id", "price")
+    assert metadata.types["price"] == "numeric(12,2)"
+    assert metadata.primary_key == ("id",)
+    assert metadata.indexes == {"orders_pkey": ("id",), "orders_price_idx": ("price",)}
+    assert mock_cursor.execute.call_count == 2
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_ddl_invalidates_cached_metadata(mock_psycopg2):
+    client, mock_cursor = make_client()
+    mock_cursor.fetchall.side_effect = [[("id", "integer")], [], [("id", "integer"), ("note", "text")], []]
+
+    client.table_metadata("orders")
+    client.update_data("ALTER TABLE orders ADD COLUMN note text")
+    metadata = client.table_metadata("orders")
+
+    assert metadata.columns == ("id", "note")
+
+
+def test_metadata_expires_after_ttl():
+    now = [0.0]
+    cache = MetadataCache(ttl=10, clock=lambda: now[0])
+    loader = MagicMock(side_effect=["first", "second"])
+
+    assert cache.get(("postgres", "dsn"), "orders", loader) == "first"
+    now[0] = 11.0
+    assert cache.get(("postgres", "dsn"), "orders", loader) == "second"
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_fetch_data_applies_precomputed_converters(mock_psycopg2):
+    client, mock_cursor = make_client()
+    mock_cursor.fetchall.side_effect = [
+        [("id", "integer"), ("price", "numeric(12,2)")], [],
+        [(1, "9.50"), (2, None)],
+    ]
+    mock_cursor.description = [("id",), ("price",)]
+
+    converters = client.column_converters("orders", {"numeric(12,2)": Decimal})
+    rows = client.fetch_data("SELECT id, price FROM orders", converters=converters)
+
+    assert rows == [(1, Decimal("9.50")), (2, None)]
+    assert convert_rows(("id",), [(1,)], {}) == [(1,)]
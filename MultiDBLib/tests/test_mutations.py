@@ -0,0 +1,118 @@
+import datetime
+import decimal
+import os
+import uuid
+import pytest
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.mutations import (ChunkedMutationRunner, LatencyThrottle,
+                                                        ReplicaLagThrottle)
+
+
+def postgres_client(bounds):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.fetch_data = MagicMock(side_effect=[[(bound,)] for bound in bounds])
+    client.delete_data = MagicMock(return_value=2)
+    client.update_data = MagicMock(return_value=2)
+    client.delete_all_data = MagicMock(return_value=-1)
+    return client
+
+
+def test_delete_walks_key_ranges_in_chunks():
+    client = postgres_client([2, 4, None])
+    progress = []
+
+    deleted = ChunkedMutationRunner(client, "events", "id", where="kind = %s", params=("old",), batch_size=2,
+                                    on_progress=progress.append).delete()
+
+    assert deleted == 4
+    assert client.fetch_data.call_args_list[1][0] == (
+        "SELECT MAX(id) FROM (SELECT id FROM events WHERE id > %s AND (kind = %s) ORDER BY id LIMIT %s) AS chunk",
+        (2, "old", 2))
+    assert [call[0] for call in client.delete_data.call_args_list] == [
+        ("DELETE FROM events WHERE id <= %s AND (kind = %s)", (2, "old")),
+        ("DELETE FROM events WHERE id > %s AND id <= %s AND (kind = %s)", (2, 4, "old")),
+    ]
+    assert [(p.chunks, p.last_key, p.done) for p in progress] == [(1, 2, False), (2, 4, False), (2, 4, True)]
+
+
+def test_update_uses_top_for_mssql():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.fetch_data = MagicMock(side_effect=[[(10,)], [(None,)]])
+    client.update_data = MagicMock(return_value=10)
+
+    updated = ChunkedMutationRunner(client, "events", "id", batch_size=10).update("status = ?", ("done",))
+
+    assert updated == 10
+    assert client.fetch_data.call_args_list[0][0] == (
+        "SELECT MAX(id) FROM (SELECT TOP (?) id FROM events WHERE 1 = 1 ORDER BY id) AS chunk", (10,))
+    client.update_data.assert_called_once_with("UPDATE events SET status = ? WHERE id <= ?", ("done", 10))
+
+
+def test_checkpoint_resumes_after_interruption(tmp_path):
+    checkpoint = str(tmp_path / "purge.json")
+    client = postgres_client([2, 4])
+    client.delete_data.side_effect = [2, Exception("connection lost")]
+    with pytest.raises(Exception):
+        ChunkedMutationRunner(client, "events", "id", batch_size=2, checkpoint=checkpoint).delete()
+
+    client = postgres_client([4, None])
+    deleted = ChunkedMutationRunner(client, "events", "id", batch_size=2, checkpoint=checkpoint).delete()
+
+    assert deleted == 4
+    assert client.fetch_data.call_args_list[0][0][1] == (2, 2)
+    assert not (tmp_path / "purge.json").exists()
+
+
+@pytest.mark.parametrize("first, second", [
+    (uuid.UUID(int=1), uuid.UUID(int=2)),
+    (decimal.Decimal("10.25"), decimal.Decimal("20.50")),
+    (datetime.datetime(2024, 5, 1, 12, 0, 0, 123456, tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+     datetime.datetime(2024, 5, 1, 12, 0, 0, 123457, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))),
+])
+def test_checkpoint_resumes_after_typed_keys(tmp_path, first, second):
+    checkpoint = str(tmp_path / "purge.json")
+    client = postgres_client([first, second])
+    client.delete_data.side_effect = [2, Exception("connection lost")]
+    with pytest.raises(Exception):
+        ChunkedMutationRunner(client, "events", "id", batch_size=2, checkpoint=checkpoint).delete()
+    assert os.listdir(tmp_path) == ["purge.json"]
+
+    client = postgres_client([second, None])
+    assert ChunkedMutationRunner(client, "events", "id", batch_size=2, checkpoint=checkpoint).delete() == 4
+    resumed_after = client.fetch_data.call_args_list[0][0][1][0]
+    assert resumed_after == first and type(resumed_after) is type(first)
+    if isinstance(first, datetime.datetime):
+        assert resumed_after.utcoffset() == first.utcoffset()
+
+
+def test_delete_all_truncates_without_filter():
+    client = postgres_client([])
+    assert ChunkedMutationRunner(client, "events", "id").delete_all() == -1
+    client.delete_all_data.assert_called_once_with("events", truncate=True)
+
+
+def test_mongo_runner_deletes_id_ranges():
+    client = MongoDBClient("localhost", 27017, "test_db", "events")
+    client.collection = MagicMock()
+    client.collection.find.return_value.sort.return_value.limit.side_effect = [[{"_id": 1}, {"_id": 2}], []]
+    client.collection.delete_many.return_value.deleted_count = 2
+
+    deleted = ChunkedMutationRunner(client, where={"kind": "old"}, batch_size=2).delete()
+
+    assert deleted == 2
+    client.collection.delete_many.assert_called_once_with({"$and": [{"kind": "old"}, {"_id": {"$lte": 2}}]})
+
+
+def test_throttles_pause_on_latency_and_replica_lag():
+    sleep = MagicMock()
+    assert LatencyThrottle(target=0.5, sleep=sleep)(0.2) == 0.0
+    LatencyThrottle(target=0.5, sleep=sleep)(1.5)
+    sleep.assert_called_once_with(1.0)
+
+    probe = MagicMock(side_effect=[12.0, 3.0])
+    sleep = MagicMock()
+    ReplicaLagThrottle(probe, max_lag=5.0, poll_interval=2.0, sleep=sleep)(0.1)
+    sleep.assert_called_once_with(2.0)
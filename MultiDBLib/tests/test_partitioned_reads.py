@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.partitioned import PartitionedReader
+
+
+def count_rows(batch):
+    return len(batch)
+
+
+def add(a, b):
+    return a + b
+
+
+@pytest.fixture
+def postgres_client():
+    return PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+
+
+def test_range_partition_queries_postgres(postgres_client):
+    reader = PartitionedReader(postgres_client, "events", partitions=3, key_column="id", lower=1, upper=10)
+
+    queries = reader.partition_queries()
+
+    assert queries == [
+        ("SELECT * FROM events WHERE id >= %s AND id < %s", (1, 5)),
+        ("SELECT * FROM events WHERE id >= %s AND id < %s", (5, 9)),
+        ("SELECT * FROM events WHERE id >= %s AND id <= %s", (9, 10)),
+    ]
+
+
+def test_modulo_partition_queries_mssql():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    reader = PartitionedReader(client, "events", partitions=2, strategy="modulo", key_column="id",
+                               where="kind = ?", params=("click",))
+
+    queries = reader.partition_queries()
+
+    assert queries == [
+        ("SELECT * FROM events WHERE ABS(id % ?) = ? AND (kind = ?)", (2, 0, "click")),
+        ("SELECT * FROM events WHERE ABS(id % ?) = ? AND (kind = ?)", (2, 1, "click")),
+    ]
+
+
+def test_modulo_partition_queries_postgres_escape_percent(postgres_client):
+    reader = PartitionedReader(postgres_client, "events", partitions=2, strategy="modulo", key_column="id")
+
+    queries = reader.partition_queries()
+
+    assert queries[1] == ("SELECT * FROM events WHERE ABS(id %% %s) = %s", (2, 1))
+    # psycopg2 interpolates parameters with %-formatting.
+    assert queries[1][0] % queries[1][1] == "SELECT * FROM events WHERE ABS(id % 2) = 1"
+
+
+def test_ctid_strategy_rejected_for_mssql():
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    with pytest.raises(ValueError):
+        PartitionedReader(client, "events", strategy="ctid")
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_reduce_reads_every_partition_with_own_connection(mock_connect, postgres_client):
+    mock_connection = MagicMock()
+    mock_connect.return_value = mock_connection
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [], [(3,)], []]
+
+    reader = PartitionedReader(postgres_client, "events", partitions=2, key_column="id", lower=1, upper=3,
+                               executor=ThreadPoolExecutor(max_workers=1))
+    total = reader.reduce(count_rows, add, 0)
+
+    assert total == 3
+    assert mock_connect.call_count == 2
+    assert mock_connection.close.call_count == 2
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_iter_batches_streams_spilled_partitions_and_removes_them(mock_connect, postgres_client, tmp_path):
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], [], [(4,)], []]
+
+    reader = PartitionedReader(postgres_client, "events", partitions=2, key_column="id", lower=1, upper=4,
+                               max_workers=1, executor=ThreadPoolExecutor(max_workers=1), spill_dir=str(tmp_path))
+    batches = list(reader.iter_batches())
+
+    assert batches == [[(1,), (2,)], [(3,)], [(4,)]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_partitions_in_flight_are_limited_to_max_workers(postgres_client):
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def job(n):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return n
+
+    reader = PartitionedReader(postgres_client, "events", partitions=8, key_column="id", max_workers=2,
+                               executor=ThreadPoolExecutor(max_workers=8))
+
+    assert sorted(reader._run([(job, (n,)) for n in range(8)])) == list(range(8))
+    assert peak[0] <= 2
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.profiles import resolve_options, PROFILES
+
+
+def test_profiles_resolve_for_every_backend():
+    for profile in PROFILES:
+        for backend in ('postgres', 'mssql', 'mongodb'):
+            resolve_options(backend, profile)
+
+
+def test_explicit_options_override_profile_and_are_validated():
+    settings = resolve_options('mongodb', 'analytics', {'read_concern': 'local', 'maxPoolSize': 5})
+    assert settings.connect['readConcernLevel'] == 'local'
+    assert settings.connect['compressors'] == 'zstd,zlib'
+    assert settings.connect['maxPoolSize'] == 5
+    assert settings.client == {'fetch_size': 50000}
+
+    with pytest.raises(ValueError):
+        resolve_options('postgres', options={'compressors': 'zstd'})
+    with pytest.raises(ValueError):
+        resolve_options('mssql', options={'packet_size': '4096'})
+    with pytest.raises(ValueError):
+        resolve_options('postgres', 'fastest')
+
+
+@patch('psycopg2.connect')
+def test_postgres_profile_extends_connection_string(mock_connect):
+    client = PostgresClient("localhost", 5432, "user", "pw", "db", profile='oltp-low-latency',
+                            options={'application_name': 'orders api'})
+    client.connect()
+
+    mock_connect.assert_called_once_with(
+        "host=localhost port=5432 user=user password=pw dbname=db application_name='orders api' "
+        "connect_timeout=5 options='-c statement_timeout=2000' keepalives=1 keepalives_idle=30")
+    assert client.clone().connection_string == client.connection_string
+    assert PostgresClient("localhost", 5432, "user", "pw", "db").connection_string == \
+        "host=localhost port=5432 user=user password=pw dbname=db"
+
+
+@patch('pyodbc.connect')
+def test_mssql_profile_sets_attributes_and_client_options(mock_connect):
+    client = MSSQLClient("localhost", 1433, "sa", "pw", "db", "ODBC Driver 18 for SQL Server",
+                         profile='oltp-low-latency', options={'fast_executemany': False})
+    client.connect()
+
+    mock_connect.assert_called_once_with(
+        "DRIVER=ODBC Driver 18 for SQL Server;SERVER=localhost,1433;DATABASE=db;UID=sa;PWD=pw;"
+        "APP=multidb-oltp;KeepAlive=30;Packet Size=4096", timeout=5)
+    assert mock_connect.return_value.timeout == 2
+    assert client.fast_executemany is False
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongodb_profile_passes_client_options_and_batch_size(mock_mongo):
+    client = MongoDBClient("localhost", 27017, "db", "events", profile='bulk-load')
+    client.connect()
+
+    mock_mongo.assert_called_once_with("localhost", 27017, appname='multidb-bulk-load',
+                                       compressors='zstd,snappy,zlib', maxPoolSize=16, w=1)
+    collection = MagicMock()
+    collection.find.return_value = []
+    client.collection = collection
+    client.fetch_data({'kind': 'a'})
+    collection.find.assert_called_once_with({'kind': 'a'}, batch_size=10000)
@@ -0,0 +1,114 @@
+import threading
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.registry import ClientRegistry
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_clients_share_one_mongoclient(mock_mongo_client):
+    registry = ClientRegistry()
+    orders = MongoDBClient('localhost', 27017, 'testdb', 'orders', registry=registry)
+    users = MongoDBClient('localhost', 27017, 'testdb', 'users', registry=registry)
+
+    orders.connect()
+    users.connect()
+
+    mock_mongo_client.assert_called_once_with('localhost', 27017)
+    assert orders.client is users.client
+    assert registry.refcount(orders.registry_key) == 2
+
+    orders.close()
+    mock_mongo_client.return_value.close.assert_not_called()
+    users.close()
+    mock_mongo_client.return_value.close.assert_called_once()
+    assert len(registry) == 0
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_for_collection_handle_reuses_client(mock_mongo_client):
+    registry = ClientRegistry()
+    orders = MongoDBClient('localhost', 27017, 'testdb', 'orders', registry=registry)
+    orders.connect()
+
+    users = orders.for_collection('users')
+
+    assert users.collection_name == 'users'
+    assert users.client is orders.client
+    assert mock_mongo_client.call_count == 1
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_for_collection_without_registry_borrows_client(mock_mongo_client):
+    orders = MongoDBClient('localhost', 27017, 'testdb', 'orders')
+    orders.connect()
+
+    users = orders.for_collection('users')
+    users.close()
+
+    assert users.collection_name == 'users'
+    assert mock_mongo_client.call_count == 1
+    mock_mongo_client.return_value.close.assert_not_called()
+
+
+def test_acquire_runs_factory_outside_lock():
+    registry = ClientRegistry()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_factory():
+        started.set()
+        release.wait(5)
+        return MagicMock()
+
+    worker = threading.Thread(target=registry.acquire, args=(('slow',), slow_factory))
+    worker.start()
+    started.wait(5)
+    fast = registry.acquire(('fast',), MagicMock)
+    assert registry.refcount(('fast',)) == 1 and fast is not None
+    release.set()
+    worker.join(5)
+    assert registry.refcount(('slow',)) == 1
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_postgres_clients_share_connection_by_identity(mock_connect):
+    mock_connect.side_effect = lambda dsn: MagicMock(dsn=dsn)
+    registry = ClientRegistry()
+    first = PostgresClient('localhost', 5432, 'user', 'password', 'testdb', registry=registry)
+    second = PostgresClient('localhost', 5432, 'user', 'password', 'testdb', registry=registry)
+    other = PostgresClient('localhost', 5432, 'user', 'password', 'otherdb', registry=registry)
+
+    for client in (first, second, other):
+        client.connect()
+
+    assert first.connection is second.connection
+    assert other.connection is not first.connection
+    assert mock_connect.call_count == 2
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_mongo_list_options_are_part_of_the_identity(mock_mongo_client):
+    registry = ClientRegistry()
+    first = MongoDBClient('localhost', 27017, 'testdb', 'orders', registry=registry,
+                          options={'compressors': ['zstd', 'zlib']})
+    second = MongoDBClient('localhost', 27017, 'testdb', 'users', registry=registry,
+                           options={'compressors': ['zstd', 'zlib']})
+    other = MongoDBClient('localhost', 27017, 'testdb', 'users', registry=registry, options={'compressors': ['zlib']})
+
+    for client in (first, second, other):
+        client.connect()
+
+    assert first.client is second.client
+    assert mock_mongo_client.call_count == 2
+
+
+def test_mssql_identity_includes_client_side_settings():
+    def client(**options):
+        return MSSQLClient('localhost', 1433, 'user', 'password', 'testdb', 'ODBC Driver 17 for SQL Server',
+                           options=options or None)
+
+    assert client().registry_key == client().registry_key
+    assert client(query_timeout=5).registry_key != client(query_timeout=30).registry_key
+    assert client(login_timeout=5).registry_key != client().registry_key
+    assert client(fast_executemany=False).registry_key != client().registry_key
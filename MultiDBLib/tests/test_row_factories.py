@@ -0,0 +1,77 @@
+import pytest
+from array import array
+from unittest.mock import patch, MagicMock
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.rows import build_rows, ColumnarResult
+
+
+def test_record_rows_share_one_header():
+    rows = build_rows(("id", "name"), [(1, "a"), (2, "b")], "record")
+
+    assert rows[0].id == 1 and rows[1].name == "b"
+    assert type(rows[0]) is type(rows[1])
+    assert rows[0] == (1, "a")
+
+
+def test_columns_packs_numeric_columns():
+    result = build_rows(("id", "score", "name"), [(1, 0.5, "a"), (2, 1.5, "b")], "columns")
+
+    assert isinstance(result, ColumnarResult)
+    assert result["id"] == array('q', [1, 2])
+    assert result["score"] == array('d', [0.5, 1.5])
+    assert result["name"] == ["a", "b"]
+    assert list(result) == [(1, 0.5, "a"), (2, 1.5, "b")]
+
+
+def test_unknown_row_factory_rejected():
+    with pytest.raises(ValueError):
+        build_rows(("id",), [(1,)], "dict")
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2')
+def test_fetch_data_postgres_record_rows_via_dbconnect(mock_psycopg2):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [("Test", 123)]
+    mock_cursor.description = [("name",), ("value",)]
+    client.connection = mock_connection
+
+    rows = DBConnect(client).fetch_data("SELECT name, value FROM test_table", row_factory="record")
+
+    assert rows[0].name == "Test" and rows[0].value == 123
+    mock_cursor.execute.assert_called_once_with("SELECT name, value FROM test_table", None)
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_fetch_data_mongo_columns(mock_mongo):
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value.__getitem__.return_value = mock_collection
+    mock_collection.find.return_value = [{"name": "a", "value": 1}, {"name": "b"}]
+    client = MongoDBClient(host="localhost", port=27017, database="test_db", collection_name="test_collection")
+    client.connect()
+
+    result = client.fetch_data({}, row_factory="columns")
+
+    assert result.columns == ("name", "value")
+    assert result["value"] == [1, None]
+
+
+def test_unknown_row_factory_rejected_before_opening_a_cursor():
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.connection = MagicMock()
+
+    with pytest.raises(ValueError):
+        client.fetch_data("SELECT 1", row_factory="dict")
+    client.connection.cursor.assert_not_called()
+
+
+def test_mongo_fetch_data_options_are_keyword_only():
+    client = MongoDBClient(host="localhost", port=27017, database="test_db", collection_name="test_collection")
+    client.collection = MagicMock()
+
+    with pytest.raises(TypeError):
+        client.fetch_data({}, "columns")
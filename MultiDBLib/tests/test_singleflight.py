@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from bson import ObjectId
+from MultiDBLib.src.databaseconnector.db import Database
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.singleflight import SingleFlight, AsyncSingleFlight, request_key
+
+
+def test_request_key_normalizes_sql_and_filters():
+    assert request_key("SELECT *\n  FROM t WHERE id = %s", (1,)) == request_key("SELECT * FROM t WHERE id = %s", (1,))
+    assert request_key({"a": 1, "b": {"$gt": 2}}) == request_key({"b": {"$gt": 2}, "a": 1})
+    assert request_key({"_id": ObjectId("5f0000000000000000000001")}) != request_key({"_id": "5f0000000000000000000001"})
+    # Embedded documents match field by field in order, so their key order is significant.
+    assert request_key({"a": {"x": 1, "y": 2}}) != request_key({"a": {"y": 2, "x": 1}})
+
+
+def test_concurrent_identical_reads_run_once_with_copied_results():
+    release = threading.Event()
+    db = MagicMock(spec=Database)
+
+    def fetch_data(*args):
+        release.wait(1.0)
+        return [[1, 2]]
+
+    db.fetch_data.side_effect = fetch_data
+    flight = SingleFlight()
+    connector = DBConnect(db, single_flight=flight)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(connector.fetch_data, "SELECT 1") for _ in range(5)]
+        deadline = time.monotonic() + 1.0
+        while flight.coalesced < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert db.fetch_data.call_count == 1
+    assert flight.executions == 1
+    results[0][0].append(3)
+    assert all(result == [[1, 2]] for result in results[1:])
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    func = MagicMock(side_effect=[ValueError("boom"), "ok"])
+    try:
+        flight.do("k", func)
+    except ValueError:
+        pass
+    assert flight.do("k", func) == "ok"
+    assert func.call_count == 2
+
+
+def test_async_single_flight_coalesces_afetch_data():
+    db = MagicMock(spec=Database)
+    db.fetch_data.return_value = [{"a": 1}]
+    flight = AsyncSingleFlight()
+    connector = DBConnect(db, async_single_flight=flight)
+
+    async def run():
+        return await asyncio.gather(*(connector.afetch_data({"a": 1}) for _ in range(4)))
+
+    results = asyncio.run(run())
+
+    assert db.fetch_data.call_count == 1
+    assert flight.coalesced == 3
+    assert results[0] == results[3] and results[0] is not results[3]
+
+
+def test_cancelling_async_leader_does_not_cancel_waiters():
+    flight = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return [1]
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter, leader.cancelled()
+
+    assert asyncio.run(run()) == ([1], True)
+    assert flight.executions == 1
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.snapshot import Snapshot, SnapshotPublisher, write_snapshot
+
+
+def test_snapshot_lookups_by_key(tmp_path):
+    path = str(tmp_path / "countries.snap")
+    rows = [[("DE", "Germany"), ("FR", "France")], [("IT", "Italy")]]
+
+    assert write_snapshot(path, rows, "code", fields=("code", "name")) == 3
+    snapshot = Snapshot(path)
+
+    assert snapshot.fields == ["code", "name"]
+    assert snapshot["FR"] == ("FR", "France")
+    assert snapshot.get("ES") is None
+    assert "IT" in snapshot and len(snapshot) == 3
+    assert list(snapshot) == [("DE", "Germany"), ("FR", "France"), ("IT", "Italy")]
+
+
+def test_failed_snapshot_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "countries.snap")
+    write_snapshot(path, [[("DE", "Germany")]], 0)
+
+    def broken():
+        yield [("FR", "France")]
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        write_snapshot(path, broken(), 0)
+    assert os.listdir(tmp_path) == ["countries.snap"]
+    assert Snapshot(path)["DE"] == ("DE", "Germany")
+
+
+def test_snapshot_remaps_after_atomic_refresh(tmp_path):
+    path = str(tmp_path / "rates.snap")
+    now = [0.0]
+    write_snapshot(path, [[{"_id": 1, "rate": 0.1}]], "_id")
+    snapshot = Snapshot(path, check_interval=10.0, clock=lambda: now[0])
+
+    write_snapshot(path, [[{"_id": 1, "rate": 0.2}, {"_id": 2, "rate": 0.3}]], "_id")
+    assert snapshot[1]["rate"] == 0.1
+    now[0] = 10.0
+    assert snapshot[1]["rate"] == 0.2
+    assert snapshot.get(2) == {"_id": 2, "rate": 0.3}
+
+
+def test_publisher_builds_snapshot_from_sql_client(tmp_path):
+    client = PostgresClient(host="localhost", port=5432, user="user", password="pass", database="test_db")
+    client.iter_data = MagicMock(return_value=iter([(("id", "label"), [(1, "a"), (2, "b")])]))
+    path = str(tmp_path / "labels.snap")
+
+    assert SnapshotPublisher(client, "SELECT id, label FROM labels", path, "id").refresh() == 2
+    assert Snapshot(path)[2] == (2, "b")
+
+
+def test_publisher_follows_change_events(tmp_path):
+    client = MongoDBClient("localhost", 27017, "test_db", "labels")
+    client.iter_data = MagicMock(side_effect=lambda *args, **kwargs: iter([[{"_id": "x"}]]))
+    publisher = SnapshotPublisher(client, {}, str(tmp_path / "labels.snap"), "_id")
+
+    def events():
+        yield object()
+        while publisher.refreshes < 1:
+            time.sleep(0.001)
+        for _ in range(3):
+            yield object()
+
+    publisher.follow(events(), min_interval=0.2)
+
+    # The burst arriving within the interval is coalesced into one refresh.
+    assert publisher.refreshes == 2
+
+
+def test_stop_interrupts_follow_waiting_for_events(tmp_path):
+    client = MongoDBClient("localhost", 27017, "test_db", "labels")
+    publisher = SnapshotPublisher(client, {}, str(tmp_path / "labels.snap"), "_id")
+    never = threading.Event()
+
+    def events():
+        never.wait(5)
+        yield from ()
+
+    threading.Timer(0.05, publisher.stop).start()
+    start = time.monotonic()
+    publisher.follow(events())
+
+    assert time.monotonic() - start < 1.0
+    assert publisher.refreshes == 0
+    never.set()
@@ -0,0 +1,114 @@
+import datetime
+import uuid
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.sqlite_client import SQLiteClient
+from MultiDBLib.src.databaseconnector.mirror import TableMirror
+
+
+class PostgresLike:
+    """Runs a SQLite database behind the PostgreSQL placeholder style."""
+
+    placeholder = '%s'
+
+    def __init__(self, client):
+        self.client = client
+
+    def fetch_data(self, query, params=None, row_factory=None):
+        return self.client.fetch_data(query.replace('%s', '?'), params, row_factory)
+
+
+def test_sqlite_client_crud_through_dbconnect(tmp_path):
+    client = SQLiteClient(str(tmp_path / "edge.db"))
+    client.connect()
+    db = DBConnect(client)
+    db.insert_data("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    assert client.insert_many("INSERT INTO items VALUES (?, ?)", [(1, 'a'), (2, 'b'), (3, 'c')], batch_size=2) == 3
+    assert db.update_data("UPDATE items SET name = ? WHERE id = ?", ('z', 3)) == 1
+    assert db.delete_data("DELETE FROM items WHERE id = 1") == 1
+    assert db.fetch_data("SELECT id, name FROM items ORDER BY id") == [(2, 'b'), (3, 'z')]
+    assert client.count("items") == 2
+    assert client.fetch_data("PRAGMA journal_mode")[0][0] == 'wal'
+    client.close()
+
+
+def test_mirror_copies_changes_incrementally_and_resumes(tmp_path):
+    remote = SQLiteClient()
+    remote.connect()
+    remote.insert_data("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT, version INTEGER, deleted INTEGER)")
+    remote.insert_many("INSERT INTO orders VALUES (?, ?, ?, 0)", [(i, 'new', 1) for i in range(1, 6)])
+    local = SQLiteClient(str(tmp_path / "edge.db"))
+    local.connect()
+
+    mirror = TableMirror(PostgresLike(remote), local, 'orders', 'id', 'version', deleted_column='deleted', batch_size=2)
+    assert mirror.sync(max_batches=1) == 2
+    assert mirror.position() == (1, 2)
+    assert mirror.sync() == 3
+    assert local.count("orders") == 5
+
+    remote.update_data("UPDATE orders SET status = 'paid', version = 2 WHERE id = 3")
+    remote.update_data("UPDATE orders SET deleted = 1, version = 3 WHERE id = 4")
+    resumed = TableMirror(PostgresLike(remote), local, 'orders', 'id', 'version', deleted_column='deleted',
+                          batch_size=2)
+    assert resumed.sync() == 2
+    assert local.fetch_data("SELECT id, status FROM orders ORDER BY id") == \
+        [(1, 'new'), (2, 'new'), (3, 'paid'), (5, 'new')]
+    assert resumed.sync() == 0
+
+
+class ChangedRows:
+    """A PostgreSQL-style source returning typed rows in watermark order, like psycopg2 would."""
+
+    placeholder = '%s'
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def fetch_data(self, query, params=None, row_factory=None):
+        self.calls.append(params)
+        rows = self.rows
+        if len(params) == 4:
+            watermark, _, key, _ = params
+            rows = [row for row in rows if (row[2], row[0]) > (watermark, key)]
+        return row_factory(['id', 'name', 'updated_at'], rows[:params[-1]])
+
+
+def test_mirror_position_keeps_timestamptz_and_uuid_values():
+    zone = datetime.timezone(datetime.timedelta(hours=2))
+    updated = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=zone)
+    first, second = uuid.UUID(int=1), uuid.UUID(int=2)
+    source = ChangedRows([(first, 'a', updated), (second, 'b', updated)])
+    local = SQLiteClient()
+    local.connect()
+
+    mirror = TableMirror(source, local, 'users', 'id', 'updated_at', batch_size=1)
+    assert mirror.sync(max_batches=1) == 1
+    assert mirror.position() == (updated, first)
+    assert mirror.position()[0].utcoffset() == datetime.timedelta(hours=2)
+
+    assert mirror.sync() == 1
+    assert source.calls[1][:3] == (updated, updated, first)
+    assert mirror.position() == (updated, second)
+    assert local.fetch_data("SELECT id, updated_at FROM users ORDER BY id") == \
+        [(str(first), updated.isoformat()), (str(second), updated.isoformat())]
+
+
+def test_overlap_picks_up_rows_committed_behind_the_watermark():
+    remote = SQLiteClient()
+    remote.connect()
+    remote.insert_data("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, changed INTEGER)")
+    remote.insert_many("INSERT INTO events VALUES (?, ?, ?)", [(1, 'a', 10), (2, 'b', 30)])
+    local = SQLiteClient()
+    local.connect()
+    strict = TableMirror(PostgresLike(remote), local, 'events', 'id', 'changed', target_table='strict')
+    overlapping = TableMirror(PostgresLike(remote), local, 'events', 'id', 'changed', target_table='overlapping',
+                              overlap=15, batch_size=1)
+    assert strict.sync() == overlapping.sync() == 2
+
+    # A transaction that started before row 2 was written commits its row afterwards.
+    remote.insert_data("INSERT INTO events VALUES (3, 'late', 20)")
+    assert strict.sync() == 0
+    assert overlapping.sync() == 2
+    assert overlapping.position() == (30, 2)
+    assert local.fetch_data("SELECT id FROM overlapping ORDER BY id") == [(1,), (2,), (3,)]
+    assert local.fetch_data("SELECT id FROM strict ORDER BY id") == [(1,), (2,)]
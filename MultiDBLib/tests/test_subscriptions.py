@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+from psycopg2 import sql
+from MultiDBLib.src.databaseconnector.mongodb_client import MongoDBClient
+from MultiDBLib.src.databaseconnector.mssql_client import MSSQLClient
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.subscriptions import ChangeEvent, parse_notification
+
+
+@patch('MultiDBLib.src.databaseconnector.mongodb_client.MongoClient')
+def test_subscribe_mongo_change_stream(mock_mongo):
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value.__getitem__.return_value = mock_collection
+    stream = MagicMock()
+    stream.__enter__.return_value = stream
+    stream.__iter__.return_value = iter([
+        {'_id': {'_data': 'token-1'}, 'operationType': 'insert', 'documentKey': {'_id': 1}, 'fullDocument': {'_id': 1}},
+    ])
+    mock_collection.watch.return_value = stream
+    client = MongoDBClient('localhost', 27017, 'testdb', 'testcollection')
+    client.connect()
+
+    events = list(DBConnect(client).subscribe(resume_token={'_data': 'token-0'}))
+
+    assert events == [ChangeEvent('mongodb', 'insert', 1, {'_id': 1}, {'_data': 'token-1'})]
+    assert mock_collection.watch.call_args[1]['resume_after'] == {'_data': 'token-0'}
+
+
+def test_parse_postgres_notification():
+    event = parse_notification('orders', '{"operation": "update", "key": 7}', 3)
+    assert event == ChangeEvent('postgres', 'update', 7, None, 3)
+
+    event = parse_notification('orders', 'refresh', 4)
+    assert event == ChangeEvent('postgres', 'orders', None, 'refresh', 4)
+
+
+@patch('MultiDBLib.src.databaseconnector.mssql_client.pyodbc.connect')
+def test_subscribe_mssql_change_tracking(mock_pyodbc_connect):
+    mock_connection = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connection.cursor.return_value = mock_cursor
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [[(5,)], [(11, 'U', 42), (12, 'D', 43)]]
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = mock_connection
+
+    events = client.subscribe('orders', 'id', resume_token=10)
+    first, second = next(events), next(events)
+
+    assert first == ChangeEvent('mssql', 'update', 42, None, 11)
+    assert second == ChangeEvent('mssql', 'delete', 43, None, 12)
+    assert mock_cursor.execute.call_args[0][1] == (10,)
+
+
+@patch('MultiDBLib.src.databaseconnector.mssql_client.pyodbc.connect')
+def test_subscribe_mssql_resume_token_waits_for_last_row_of_version(mock_pyodbc_connect):
+    mock_cursor = MagicMock()
+    mock_cursor.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [[(5,)], [(11, 'U', 1), (11, 'U', 2), (12, 'I', 3)]]
+    client = MSSQLClient('localhost', 1433, 'user', 'password', 'test_db', 'ODBC Driver 17 for SQL Server')
+    client.connection = MagicMock()
+    client.connection.cursor.return_value = mock_cursor
+
+    events = client.subscribe('orders', 'id', resume_token=10)
+
+    assert [next(events).resume_token for _ in range(3)] == [10, 11, 12]
+
+
+def test_asubscribe_yields_events():
+    db = MagicMock(spec=MongoDBClient)
+    db.subscribe.return_value = iter([ChangeEvent('mongodb', 'insert', 1, None, 't1')])
+
+    async def collect():
+        return [event async for event in DBConnect(db).asubscribe()]
+
+    assert asyncio.run(collect()) == [ChangeEvent('mongodb', 'insert', 1, None, 't1')]
+
+
+@patch('MultiDBLib.src.databaseconnector.postgres_client.select.select')
+@patch('MultiDBLib.src.databaseconnector.postgres_client.psycopg2.connect')
+def test_subscribe_postgres_quotes_channel_names(mock_connect, mock_select):
+    connection = mock_connect.return_value
+    mock_select.return_value = ([connection], [], [])
+    connection.notifies = [MagicMock(channel='orders"; DROP TABLE orders; --', payload='{"id": 1}')]
+    client = PostgresClient("localhost", 5432, "user", "pass", "db")
+
+    events = client.subscribe('orders"; DROP TABLE orders; --')
+    next(events)
+    events.close()
+
+    connection.cursor.return_value.execute.assert_called_once_with(
+        sql.SQL("LISTEN {}").format(sql.Identifier('orders"; DROP TABLE orders; --')))
+    connection.close.assert_called_once()
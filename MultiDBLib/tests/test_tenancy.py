@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.tenancy import TenantRouter
+from MultiDBLib.src.databaseconnector.exceptions import AdmissionError
+
+
+def make_router(**kwargs):
+    clients = {}
+
+    def resolve(tenant):
+        client = PostgresClient(host=f"db{tenant % 2}", port=5432, user="user", password="pass",
+                                database=f"tenant_{tenant}")
+        client.connect = MagicMock()
+        client.close = MagicMock()
+        clients.setdefault(tenant, []).append(client)
+        return client
+
+    return TenantRouter(resolve, **kwargs), clients
+
+
+def test_tenants_are_connected_once_and_reused():
+    router, clients = make_router()
+    with router.tenant(1) as first:
+        pass
+    with router.tenant(1) as second:
+        assert second is first
+    assert first.db.database == "tenant_1"
+    clients[1][0].connect.assert_called_once_with()
+    assert router.open_connections() == 1
+
+
+def test_lru_tenant_evicted_when_server_is_at_cap():
+    router, clients = make_router(max_connections_per_server=2)
+    for tenant in (0, 2, 4):
+        with router.tenant(tenant):
+            pass
+    assert len(router) == 2
+    clients[0][0].close.assert_called_once_with()
+    assert router.evictions == 1
+    assert router.open_connections(("PostgresClient", "db0", 5432)) == 2
+
+
+def test_busy_server_rejects_after_timeout():
+    router, _ = make_router(max_connections_per_server=1, acquire_timeout=0.01)
+    with router.tenant(0):
+        with pytest.raises(AdmissionError):
+            with router.tenant(2):
+                pass
+        with router.tenant(1):
+            pass
+
+
+def test_idle_tenants_are_closed():
+    now = [0.0]
+    router, clients = make_router(idle_timeout=60, clock=lambda: now[0])
+    with router.tenant(1):
+        pass
+    now[0] = 61.0
+    assert router.evict_idle() == 1
+    clients[1][0].close.assert_called_once_with()
+    assert router.open_connections() == 0
+
+
+def test_on_checkout_prepares_shared_connections():
+    on_checkout = MagicMock()
+    router, _ = make_router(on_checkout=on_checkout)
+    with router.tenant(3) as db:
+        on_checkout.assert_called_once_with(db, 3)
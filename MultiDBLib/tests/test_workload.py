@@ -0,0 +1,72 @@
+import datetime
+from unittest.mock import MagicMock
+from bson import ObjectId
+from MultiDBLib.src.databaseconnector.postgres_client import PostgresClient
+from MultiDBLib.src.databaseconnector.dbconnect import DBConnect
+from MultiDBLib.src.databaseconnector.workload import (WorkloadRecorder, WorkloadReplayer, query_shape,
+                                                       percentile)
+
+
+def test_query_shape_normalizes_literals():
+    assert query_shape("SELECT * FROM t WHERE id = 42 AND name = 'bob'") == "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert query_shape("SELECT * FROM t WHERE id IN (%s, %s,%s)") == "SELECT * FROM t WHERE id IN (?)"
+    assert query_shape({"age": {"$gt": 30}, "name": "bob"}) == '{"age": {"$gt": "?"}, "name": "?"}'
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_record_and_replay_roundtrip(tmp_path):
+    path = str(tmp_path / "capture.ndjson.gz")
+    source = MagicMock(spec=PostgresClient)
+    source.fetch_data.return_value = [(1,)]
+    recorder = WorkloadRecorder(path, sample_rate=1.0)
+    connector = DBConnect(source, recorder=recorder)
+    connector.fetch_data("SELECT * FROM t WHERE id = %s", (1,))
+    connector.fetch_data("SELECT * FROM t WHERE id = %s", (2,))
+    connector.update_data("UPDATE t SET seen = true WHERE id = %s", (2,))
+    recorder.close()
+
+    target = MagicMock(spec=PostgresClient)
+    report = WorkloadReplayer(path).replay(target, speed=None, concurrency=2)
+
+    assert report['operations'] == 2
+    assert report['errors'] == 0
+    assert report['latency']['p99'] is not None
+    target.fetch_data.assert_any_call("SELECT * FROM t WHERE id = %s", (2,))
+    target.update_data.assert_not_called()
+
+
+def test_unsampled_calls_store_parameters_only_for_a_new_shape(tmp_path):
+    path = str(tmp_path / "capture.ndjson")
+    recorder = WorkloadRecorder(path, sample_rate=0.0)
+    connector = DBConnect(MagicMock(spec=PostgresClient), recorder=recorder)
+    connector.fetch_data("SELECT * FROM users WHERE email = %s", ("first@example.com",))
+    connector.fetch_data("SELECT * FROM users WHERE email = %s", ("secret@example.com",))
+    recorder.close()
+
+    with open(path) as capture:
+        assert "secret@example.com" not in capture.read()
+    assert [args for _, _, args in WorkloadReplayer(path).load()] == \
+        [("SELECT * FROM users WHERE email = %s", ("first@example.com",))] * 2
+
+
+def test_replayed_parameters_keep_their_types(tmp_path):
+    path = str(tmp_path / "capture.ndjson")
+    recorder = WorkloadRecorder(path, sample_rate=1.0)
+    connector = DBConnect(MagicMock(spec=PostgresClient), recorder=recorder)
+    since = datetime.datetime(2024, 5, 1, 8, 30, 0, 250001, tzinfo=datetime.timezone.utc)
+    owner = ObjectId("5f0000000000000000000001")
+    connector.fetch_data({"owner": owner, "created": {"$gte": since}, "tags": ["a", "b"]})
+    connector.fetch_data("SELECT * FROM t WHERE created >= %s", (since,))
+    recorder.close()
+
+    target = MagicMock(spec=PostgresClient)
+    WorkloadReplayer(path).replay(target, speed=None, concurrency=1)
+
+    target.fetch_data.assert_any_call({"owner": owner, "created": {"$gte": since}, "tags": ["a", "b"]})
+    target.fetch_data.assert_any_call("SELECT * FROM t WHERE created >= %s", (since,))